@@ -6,6 +6,7 @@ from abc import abstractmethod
 # from amd64.nvme import AMD64NVMe
 from system.amd64 import BaseOS
 from interface.application import BaseInterface
+from storage.volume_cache import VolumeMapCache
 from unit.log_handler import get_logger
 
 logger = get_logger(__name__, logging.INFO)
@@ -16,6 +17,7 @@ class BaseReboot(ABC):
     # def __init__(self, platform: AMD64NVMe):
     def __init__(self, platform: BaseOS):
         self._api = platform.api
+        self._volume_cache = VolumeMapCache(self._api.remote_ip)
 
     @abstractmethod
     def warm_reset(self) -> bool:
@@ -32,6 +34,8 @@ class WindowsReboot(BaseReboot):
     def warm_reset(self) -> bool:
         logger.info("Executing warm boot for Windows...")
         try:
+            # The volumes are enumerated again after the boot
+            self._volume_cache.invalidate()
             # Execute the warm boot command
             self._api.command_line.original(self._api, 'shutdown /r /t 0')
             logger.info("Warm boot executed successfully for Windows.")
@@ -44,6 +48,8 @@ class WindowsReboot(BaseReboot):
     def cold_reset(self) -> bool:
         logger.info("Executing warm boot for Windows...")
         try:
+            # The volumes are enumerated again after the boot
+            self._volume_cache.invalidate()
             # Execute the warm boot command
             self._api.command_line.original(self._api, 'shutdown /s /t 0')
             logger.info("Cold boot executed successfully for Windows.")
@@ -60,6 +66,8 @@ class LinuxReboot(BaseReboot):
     def warm_reset(self) -> bool:
         logger.info("Executing warm boot for Linux...")
         try:
+            # The volumes are enumerated again after the boot
+            self._volume_cache.invalidate()
             # Execute the warm boot command
             self._api.command_line(self._api, 'sudo shutdown -r now')
             logger.info("Warm boot executed successfully for Linux.")
@@ -72,6 +80,8 @@ class LinuxReboot(BaseReboot):
     def cold_reset(self) -> bool:
         logger.info("Executing warm boot for Linux...")
         try:
+            # The volumes are enumerated again after the boot
+            self._volume_cache.invalidate()
             # Execute the warm boot command
             self._api.command_line(self._api, 'sudo shutdown -h now')
             logger.info("Cold boot executed successfully for Linux.")
@@ -0,0 +1,163 @@
+# Contents of commandline/cli_session.py
+'''Copyright (c) 2024 Jaron Cheng'''
+import codecs
+import logging
+import re
+import threading
+import time
+from typing import List
+
+import paramiko
+
+from unit.log_handler import get_logger
+
+logger = get_logger(__name__, logging.INFO)
+
+
+class CLISession(object):
+    """
+    Long-lived remote shell running CLI commands over one SSH channel.
+
+    Every command is wrapped between two echoed markers, and its output is
+    framed by the lines holding exactly those markers, so the shell prompt
+    and the echo of the command line itself are never mistaken for output.
+    The markers are echoed through a shell variable defined when the shell
+    opens, so the echoed command line never holds a marker itself, not even
+    where the terminal wraps it onto a line of its own.
+    The lines are normalized the same way as BaseInterface.my_command, so
+    interpret returns the same list as without a session: whitespace runs
+    collapse to one space, and blank lines stay as '' where the spawned
+    command keeps them.
+
+    Attributes:
+        separator (str): Command separator of the remote shell.
+        change_dir (str): Command changing to the remote directory.
+        null_device (str): Input of the commands, so a CLI prompting for a
+            confirmation reads EOF as it does without a terminal.
+        define (str): Command setting the shell variable {name} to {value}.
+        expand (str): Expansion of the shell variable {name}.
+        timeout (float): Seconds to wait for the output of a command.
+        blank_lines (bool): Keep blank lines, as the CRLF output of a
+            Windows SUT does through command_line; a Linux SUT prints bare
+            LF blank lines, which command_line drops.
+    """
+    MARKER = '__MNV_CLI_'
+    VARIABLE = 'MNV_CLI_MARK'
+    TIMEOUT = 120
+    # Cursor and title sequences of the pseudo terminal
+    ANSI = re.compile(r'\x1b\[[0-9;?]*[A-Za-z]|\x1b\][^\x07]*\x07')
+
+    def __init__(self, api, separator: str = ' & ',
+                 change_dir: str = 'cd /d', null_device: str = 'nul',
+                 timeout: float = None, blank_lines: bool = True,
+                 define: str = 'set {name}={value}',
+                 expand: str = '%{name}%'):
+        self._api = api
+        self.separator = separator
+        self.change_dir = change_dir
+        self.null_device = null_device
+        self.timeout = timeout or self.TIMEOUT
+        self.blank_lines = blank_lines
+        self.define = define
+        self.expand = expand
+        self._client = None
+        self._channel = None
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def open(self) -> 'CLISession':
+        """
+        Opens the shell and checks that the output can be framed.
+
+        Returns:
+            CLISession: The opened session.
+
+        Raises:
+            Exception: If the shell cannot be opened or does not echo the
+            markers back, the session is closed again.
+        """
+        try:
+            self._client = paramiko.SSHClient()
+            self._client.set_missing_host_key_policy(
+                paramiko.AutoAddPolicy())
+            self._client.connect(self._api.remote_ip,
+                                 username=self._api.account,
+                                 password=self._api.password)
+            self._channel = self._client.invoke_shell(width=512)
+            self._channel.send(self.define.format(
+                name=self.VARIABLE, value=self.MARKER) + '\n')
+            self._execute(f'{self.change_dir} {self._api.remote_dir}')
+        except Exception as e:
+            logger.error("Error occurred in opening CLI session: %s", e)
+            self.close()
+            raise
+        logger.info('CLI session opened on %s', self._api.remote_ip)
+        return self
+
+    @property
+    def is_open(self) -> bool:
+        return self._channel is not None and not self._channel.closed
+
+    def run(self, command: str) -> List[str]:
+        """
+        Runs one command line in the session.
+
+        Args:
+            command (str): The complete command line, e.g. 'mnv_cli.exe info
+            -o vd'.
+
+        Returns:
+            List[str]: The output lines, see blank_lines.
+
+        Raises:
+            TimeoutError: If the output is not complete in time.
+            ConnectionError: If the shell is gone.
+        """
+        return self._execute(f'{command} < {self.null_device}')
+
+    def _execute(self, command: str) -> List[str]:
+        with self._lock:
+            self._count += 1
+            begin = f'{self.MARKER}{self._count}B'
+            end = f'{self.MARKER}{self._count}E'
+            marker = self.expand.format(name=self.VARIABLE)
+            self._channel.send(
+                f'echo {marker}{self._count}B{self.separator}{command}'
+                f'{self.separator}echo {marker}{self._count}E\n')
+            # The pty ends lines with CRLF, a stray CR must not split a line
+            lines = [self.ANSI.sub('', line).rstrip('\r').replace('\x08', '')
+                     for line in self._receive(end).split('\n')]
+        stripped = [line.strip() for line in lines]
+        start = stripped.index(begin) + 1
+        stop = stripped.index(end, start)
+        return [' '.join(line.split()) for line in lines[start:stop]
+                if self.blank_lines or line.strip()]
+
+    def _receive(self, end: str) -> str:
+        '''Read until the end marker appears on a line of its own'''
+        pattern = re.compile(rf'^[ \t]*{re.escape(end)}[ \t]*\r?$', re.M)
+        deadline = time.monotonic() + self.timeout
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        buffer = ''
+        while not pattern.search(self.ANSI.sub('', buffer)):
+            if self._channel.recv_ready():
+                buffer += decoder.decode(self._channel.recv(65536))
+            elif self._channel.exit_status_ready():
+                raise ConnectionError("CLI session closed by the SUT.")
+            elif time.monotonic() > deadline:
+                raise TimeoutError(f"No {end} within {self.timeout} s.")
+            else:
+                time.sleep(0.01)
+        return buffer
+
+    def close(self) -> None:
+        '''Close the shell and its SSH connection'''
+        if self._client:
+            self._client.close()
+        self._client = self._channel = None
+
+    def __enter__(self) -> 'CLISession':
+        return self.open()
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -7,6 +7,13 @@ from abc import ABC
 from abc import abstractmethod
 from system.amd64 import BaseOS
 from dataclasses import dataclass
+from dataclasses import fields
+from typing import Dict, List, Optional, Set, Type
+from commandline.cli_session import CLISession
+from commandline.smart_limits import Limit
+from commandline.smart_limits import SMARTLimits
+from commandline.smart_poller import SMARTPoller
+from storage.volume_cache import VolumeMapCache
 from unit.log_handler import get_logger
 
 logger = get_logger(__name__, logging.INFO)
@@ -43,11 +50,117 @@ class BackendSMARTInfo(SMARTInfo):
     total_time_for_tmp2: int
 
 
+class SMARTParser(object):
+    """
+    One-pass parser of the 'Key : Value' lines of mnv_cli smart.
+
+    Every line is split once at its colon into a map keyed by the SMARTInfo
+    and BackendSMARTInfo field names, only the values of known fields go
+    through a precompiled pattern, and they are converted to the field types
+    up front. The controller ('smart -o hba') and per-PD ('smart -i <id>')
+    outputs share the same parser.
+    """
+    VALUE = re.compile(r'\s*(0x[0-9A-Fa-f]+|[0-9]+)')
+    FIELDS = {
+        'critical warning': 'critical_warning',
+        'composite temperature': 'composite_temp',
+        'available spare': 'available_spare',
+        'available spare threshold': 'available_spare_threshold',
+        'percentage used': 'percentage_used',
+        'data units read': 'data_units_read',
+        'data units written': 'data_units_written',
+        'host read commands': 'host_read_commands',
+        'host write commands': 'host_write_commands',
+        'controller busy time': 'controller_busy_time',
+        'power cycles': 'power_cycles',
+        'power on hours': 'power_on_hours',
+        'unsafe shutdowns': 'unsafe_shutdowns',
+        'media and data integrity errors': 'media_and_data_integrity_errors',
+        'num err log entries': 'num_err_log_entries',
+        'warning composite temperature time': 'warning_composite_temp_time',
+        'critical composite temperature time':
+            'critical_composite_temp_time',
+        'temperature 1 transition count': 'tmp_1_transition_count',
+        'temperature 2 transition count': 'tmp_2_transition_count',
+        'total time for thermal management temperature 1':
+            'total_time_for_tmp1',
+        'total time for thermal management temperature 2':
+            'total_time_for_tmp2',
+    }
+    # Field names and types of every record, read once
+    _types = {}
+
+    @classmethod
+    def tokenize(cls, lines, names: Optional[Set[str]] = None
+                 ) -> Dict[str, str]:
+        """
+        Splits the output into a field map.
+
+        Args:
+            lines (list or str): The command output.
+            names (set, optional): The wanted fields, the output is only
+            read until all of them are found. All fields by default.
+
+        Returns:
+            dict: The raw values by field name, unknown keys are dropped and
+            the first occurrence of a key wins.
+        """
+        names = names or set(cls.FIELDS.values())
+        if isinstance(lines, str):
+            lines = lines.splitlines()
+        tokens = {}
+        for line in lines:
+            key, colon, value = line.partition(':')
+            if not colon:
+                continue
+            field = cls.FIELDS.get(' '.join(key.lower().split()))
+            if field in names and field not in tokens:
+                match = cls.VALUE.match(value)
+                if match:
+                    tokens[field] = match.group(1)
+                    if len(tokens) == len(names):
+                        break
+        return tokens
+
+    @classmethod
+    def parse(cls, lines, record: Type[SMARTInfo]) -> SMARTInfo:
+        """
+        Parses the output into a SMART record.
+
+        Args:
+            lines (list or str): The command output.
+            record (type): SMARTInfo or BackendSMARTInfo.
+
+        Returns:
+            SMARTInfo: The record, every value converted to its field type.
+
+        Raises:
+            ValueError: If a field of the record is missing.
+        """
+        if record not in cls._types:
+            cls._types[record] = (
+                [(field.name, field.type) for field in fields(record)],
+                {field.name for field in fields(record)})
+        types, names = cls._types[record]
+        tokens = cls.tokenize(lines, names)
+        result = {}
+        for name, convert in types:
+            if name not in tokens:
+                logger.warning("Pattern not matched in the command output.")
+                raise ValueError(f"No matching {name} found.")
+            result[name] = convert(tokens[name])
+        logger.debug("SMART = %s", result)
+        return record(**result)
+
+
 class BaseCLI(ABC):
     '''This is a docstring'''
     def __init__(self, platform: BaseOS):
         '''This is a docstring'''
         self.api = platform.api
+        self._session = None
+        # Per-PD errors of the last bulk query
+        self.pd_errors = {}
 
     @abstractmethod
     def interpret(self, command: str) -> str:
@@ -57,6 +170,56 @@ class BaseCLI(ABC):
 class WindowsCLI(BaseCLI):
     '''This is a docstring'''
     PREFIX = 'mnv_cli.exe'
+    SEPARATOR = ' & '
+    CHANGE_DIR = 'cd /d'
+    NULL_DEVICE = 'nul'
+    DEFINE = 'set {name}={value}'
+    EXPAND = '%{name}%'
+    # Whether command_line keeps the blank output lines, see CLISession
+    BLANK_LINES = True
+    BATCH_MARKER = '__MNV_CLI_NEXT__'
+    SESSION = False
+
+    @classmethod
+    def set_session(cls, enabled: bool):
+        """
+        Sets whether commands run in a persistent CLI session.
+
+        Args:
+            enabled (bool): True to keep one remote shell open for all
+            commands instead of logging in and spawning the CLI per command.
+        """
+        cls.SESSION = enabled
+        logger.info("Manually set SESSION: %s", cls.SESSION)
+
+    def _session_output(self, composed_cmd: str) -> Optional[List[str]]:
+        '''Run a command line in the persistent session, None to spawn it'''
+        if not self.SESSION or getattr(self.api, 'mode', None) != 'remote':
+            return None
+        if self._session is None:
+            try:
+                self._session = CLISession(
+                    self.api, self.SEPARATOR, self.CHANGE_DIR,
+                    self.NULL_DEVICE, blank_lines=self.BLANK_LINES,
+                    define=self.DEFINE, expand=self.EXPAND).open()
+            except Exception as e:
+                # The remote shell cannot frame the output, stay per call
+                logger.warning("Spawning the CLI per command: %s", e)
+                self._session = False
+        if not self._session:
+            return None
+        try:
+            return self._session.run(composed_cmd)
+        except Exception:
+            # The next command opens a fresh session
+            self.close_session()
+            raise
+
+    def close_session(self) -> None:
+        '''Close the persistent CLI session if there is one'''
+        if self._session:
+            self._session.close()
+        self._session = None
 
     def interpret(self, command: str):
         '''placeholder'''
@@ -64,158 +227,190 @@ class WindowsCLI(BaseCLI):
         try:
             composed_cmd = f'{self.PREFIX} {command}'
             logger.debug('composed_cmd = %s', composed_cmd)
-            cmd_output = self.api.command_line.original(
-                self.api,
-                composed_cmd
-            )
+            cmd_output = self._session_output(composed_cmd)
+            if cmd_output is None:
+                cmd_output = self.api.command_line.original(
+                    self.api,
+                    composed_cmd
+                )
         except Exception as e:
             logger.error('Error occurred in interpretation: %s', str(e))
             raise
+        finally:
+            # Even a failed command may have changed the VD topology
+            if VolumeMapCache.changes_topology(command):
+                VolumeMapCache(self.api.remote_ip).invalidate()
         return cmd_output
 
-    def get_controller_smart_info(self) -> SMARTInfo:
+    def interpret_batch(self, commands: List[str]) -> List[List[str]]:
+        """
+        Runs several CLI commands in one remote invocation.
+
+        The commands run in order in one group, each followed by an echoed
+        marker which splits the output again.
+
+        Args:
+            commands (List[str]): The CLI commands without the prefix.
+
+        Returns:
+            List[List[str]]: The output lines of every command, empty for a
+            command whose output is missing.
+        """
+        script = self.SEPARATOR.join(
+            f'{self.PREFIX} {command}{self.SEPARATOR}echo {self.BATCH_MARKER}'
+            for command in commands)
+        composed_cmd = f'({script})'
+        logger.debug('composed_cmd = %s', composed_cmd)
         try:
-            smart_info = self.interpret('smart -o hba')
-            string = ' '.join(smart_info)
-
-            patterns = {
-                "critical_warning": r"Critical Warning\s*:\s*(0x[0-9A-Fa-f]+)",
-                "composite_temp": r"Composite Temperature\s*:\s*([0-9]+)",
-                "available_spare": r"Available Spare\s*:\s*([0-9]+)",
-                "available_spare_threshold": (
-                    r"Available Spare Threshold\s*:\s*([0-9]+)"
-                ),
-                "percentage_used": r"Percentage Used\s*:\s*([0-9]+)"
-            }
-            result = {}
-
-            for key, pattern in patterns.items():
-                match = re.search(pattern, string)
-                if match:
-                    result[key] = match.group(1)
-                    logger.debug(f"{key}: {result[key]}")
-                else:
-                    logger.warning(
-                        "Pattern not matched in the command output.")
-                    raise ValueError(f"No matching {key} found.")
-            return SMARTInfo(**result)
-
-        except re.error as e:
-            logger.error("Error occurred in interpretation: %s", str(e))
+            cmd_output = self._session_output(composed_cmd)
+            if cmd_output is None:
+                cmd_output = self.api.command_line.original(self.api,
+                                                            composed_cmd)
+        except Exception as e:
+            logger.error('Error occurred in batch interpretation: %s', e)
             raise
+        finally:
+            if any(map(VolumeMapCache.changes_topology, commands)):
+                VolumeMapCache(self.api.remote_ip).invalidate()
+
+        outputs = [[]]
+        for line in cmd_output:
+            if line.strip() == self.BATCH_MARKER:
+                outputs.append([])
+            else:
+                outputs[-1].append(line)
+        outputs = outputs[:len(commands)]
+        return outputs + [[] for _ in range(len(commands) - len(outputs))]
+
+    def get_pd_info(self) -> Dict[str, Dict[str, str]]:
+        """
+        Gets the information of every PD with one 'info -o pd'.
+
+        Returns:
+            dict: The 'Key: Value' fields of every PD keyed by PD ID, e.g.
+            {'1': {'Model': 'Samsung SSD 970 EVO Plus 1TB', ...}}.
+        """
+        pds = {}
+        fields_of_pd = None
+        for line in self.interpret('info -o pd'):
+            key, colon, value = line.partition(':')
+            if not colon:
+                continue
+            key, value = key.strip(), value.strip()
+            if key == 'PD ID':
+                fields_of_pd = pds.setdefault(value, {})
+            elif key.startswith('Total #'):
+                fields_of_pd = None
+            elif fields_of_pd is not None:
+                fields_of_pd[key] = value
+        return pds
+
+    def pd_ids(self) -> List[str]:
+        '''PDs of the virtual drives, or all PDs if there is no VD'''
+        pd_ids = sorted({str(pd) for vd in self.api.virtual_drive or []
+                         for pd in vd.pds}, key=int)
+        return pd_ids or list(self.get_pd_info())
+
+    def get_all_backend_smart_info(self, pd_ids: List[str] = None
+                                   ) -> Dict[str, BackendSMARTInfo]:
+        """
+        Gets the SMART of several PDs with one remote invocation.
+
+        A PD whose query fails does not fail the others, its error is kept
+        in pd_errors instead.
+
+        Args:
+            pd_ids (List[str], optional): The PDs, those of the virtual
+            drives by default, see pd_ids.
+
+        Returns:
+            dict: The SMART of every PD answering, keyed by PD ID.
+        """
+        pd_ids = [str(pd_id) for pd_id in pd_ids or self.pd_ids()]
+        outputs = self.interpret_batch([f'smart -i {pd_id}'
+                                        for pd_id in pd_ids])
+        results = {}
+        self.pd_errors = {}
+        for pd_id, output in zip(pd_ids, outputs):
+            try:
+                results[pd_id] = SMARTParser.parse(output, BackendSMARTInfo)
+            except Exception as e:
+                logger.warning("Failed to get SMART of PD %s: %s", pd_id, e)
+                self.pd_errors[pd_id] = e
+        return results
+
+    def get_controller_smart_info(self) -> SMARTInfo:
+        try:
+            return SMARTParser.parse(self.interpret('smart -o hba'),
+                                     SMARTInfo)
         except Exception as e:
             logger.error("Error during write script execution: %s", e)
             raise
 
     def get_backend_smart_info(self, pd_id: str) -> BackendSMARTInfo:
         try:
-            smart_info = self.interpret(f'smart -i {pd_id}')
-            string = ' '.join(smart_info)
-
-            patterns = {
-                "critical_warning": r"Critical Warning\s*:\s*(0x[0-9A-Fa-f]+)",
-                "composite_temp": r"Composite Temperature\s*:\s*([0-9]+)",
-                "available_spare": r"Available Spare\s*:\s*([0-9]+)",
-                "available_spare_threshold": (
-                    r"Available Spare Threshold\s*:\s*([0-9]+)"
-                ),
-                "percentage_used": r"Percentage Used\s*:\s*([0-9]+)",
-                "data_units_read": r"Data Units Read\s*:\s*([0-9]+)",
-                "data_units_written": r"Data Units Written\s*:\s*([0-9]+)",
-                "host_read_commands": r"Host Read Commands\s*:\s*([0-9]+)",
-                "host_write_commands": r"Host Write Commands\s*:\s*([0-9]+)",
-                "controller_busy_time": r"Controller Busy Time\s*:\s*([0-9]+)",
-                "power_cycles": r"Power Cycles\s*:\s*([0-9]+)",
-                "power_on_hours": r"Power On Hours\s*:\s*([0-9]+)",
-                "unsafe_shutdowns": r"Unsafe Shutdowns\s*:\s*([0-9]+)",
-                "media_and_data_integrity_errors": (
-                    r"Media and Data Integrity Errors\s*:\s*([0-9]+)"
-                ),
-                "num_err_log_entries": r"Num Err Log Entries\s*:\s*([0-9]+)",
-                "warning_composite_temp_time": (
-                    r"Warning Composite Temperature Time\s*:\s*([0-9]+)"
-                ),
-                "critical_composite_temp_time": (
-                    r"Critical Composite Temperature Time\s*:\s*([0-9]+)"
-                ),
-                "tmp_1_transition_count": (
-                    r"Temperature 1 Transition Count\s*:\s*([0-9]+)"
-                ),
-                "tmp_2_transition_count": (
-                    r"Temperature 2 Transition Count\s*:\s*([0-9]+)"
-                ),
-                "total_time_for_tmp1": (
-                    r"Total Time For Thermal Management Temperature "
-                    r"1\s*:\s*([0-9]+)"
-                ),
-                "total_time_for_tmp2": (
-                    r"Total Time For Thermal Management Temperature "
-                    r"2\s*:\s*([0-9]+)"
-                )
-            }
-            result = {}
-
-            for key, pattern in patterns.items():
-                match = re.search(pattern, string)
-                if match:
-                    result[key] = match.group(1)
-                    logger.debug(f"{key}: {result[key]}")
-                else:
-                    logger.warning(
-                        "Pattern not matched in the command output.")
-                    raise ValueError(f"No matching {key} found.")
-            return BackendSMARTInfo(**result)
-
-        except re.error as e:
-            logger.error("Error occurred in interpretation: %s", str(e))
-            raise
+            return SMARTParser.parse(self.interpret(f'smart -i {pd_id}'),
+                                     BackendSMARTInfo)
         except Exception as e:
             logger.error("Error during write script execution: %s", e)
             raise
 
+    def smart_poller(self, pd_ids: List[str],
+                     interval: float = 10) -> SMARTPoller:
+        """
+        Creates a poller sampling the controller and per-PD SMART.
+
+        Args:
+            pd_ids (List[str]): The PDs to sample, e.g. ['1', '2'].
+            interval (float): Seconds between two samples.
+
+        Returns:
+            SMARTPoller: The poller, not yet started. It can be passed to
+            run_with_telemetry of a stress engine.
+        """
+        return SMARTPoller(self, pd_ids, interval)
+
     @staticmethod
     def export_smart_limits(file_path: str):
+        counter = {"ge": 0}
         limits_dict = {
-            "critical_warning": "lambda x: 0x00 <= int(x, 16) <= 0x05",
-            "composite_temp": "lambda x: int(x) < 70",
-            "available_spare": "lambda x: int(x) > 10",
-            "available_spare_threshold": "lambda x: int(x) > 0",
-            "percentage_used": "lambda x: int(x) < 100",
-            "data_units_read": "lambda x: int(x) >= 0",
-            "data_units_written": "lambda x: int(x) >= 0",
-            "host_read_commands": "lambda x: int(x) >= 0",
-            "host_write_commands": "lambda x: int(x) >= 0",
-            "controller_busy_time": "lambda x: int(x) >= 0",
-            "power_cycles": "lambda x: int(x) >= 0",
-            "power_on_hours": "lambda x: int(x) >= 0",
-            "unsafe_shutdowns": "lambda x: int(x) >= 0",
-            "media_and_data_integrity_errors": "lambda x: int(x) == 0",
-            "num_err_log_entries": "lambda x: int(x) == 0",
-            "warning_composite_temp_time": "lambda x: int(x) >= 0",
-            "critical_composite_temp_time": "lambda x: int(x) >= 0",
-            "tmp_1_transition_count": "lambda x: int(x) >= 0",
-            "tmp_2_transition_count": "lambda x: int(x) >= 0",
-            "total_time_for_tmp1": "lambda x: int(x) >= 0",
-            "total_time_for_tmp2": "lambda x: int(x) >= 0",
+            "critical_warning": {"type": "hex", "range": [0, 5]},
+            "composite_temp": {"lt": 70},
+            "available_spare": {"gt": 10},
+            "available_spare_threshold": {"gt": 0},
+            "percentage_used": {"lt": 100},
+            "data_units_read": counter,
+            "data_units_written": counter,
+            "host_read_commands": counter,
+            "host_write_commands": counter,
+            "controller_busy_time": counter,
+            "power_cycles": counter,
+            "power_on_hours": counter,
+            "unsafe_shutdowns": counter,
+            "media_and_data_integrity_errors": {"eq": 0},
+            "num_err_log_entries": {"eq": 0},
+            "warning_composite_temp_time": counter,
+            "critical_composite_temp_time": counter,
+            "tmp_1_transition_count": counter,
+            "tmp_2_transition_count": counter,
+            "total_time_for_tmp1": counter,
+            "total_time_for_tmp2": counter,
         }
 
         with open(file_path, "w") as file:
             json.dump(limits_dict, file, indent=4)
+            file.write('\n')
 
     @staticmethod
-    def import_limits(file_path):
+    def import_limits(file_path) -> Dict[str, Limit]:
         """
-        Load limits from a JSON file and convert expressions to functions.
+        Load the limit declarations of a JSON file, see SMARTLimits.
 
         :param file_path: Path to the JSON file containing limit definitions
-        :return: A dictionary with field names as keys and lambda functions as
-        values
+        :return: A dictionary with field names as keys and compiled limits,
+        callable with a raw SMART value, as values
         """
-        with open(file_path, "r") as file:
-            limits_data = json.load(file)
-
-        # 將字串表達式轉換為 Lambda 函數
-        return {key: eval(value) for key, value in limits_data.items()}
+        return SMARTLimits.load(file_path).limits
 
     def compare_file(self, file_name: str) -> bool:
         """
@@ -258,6 +453,12 @@ class WindowsCLI(BaseCLI):
 class LinuxCLI(WindowsCLI):
     '''This is a docstring'''
     PREFIX = 'mnv_cli'
+    SEPARATOR = '; '
+    CHANGE_DIR = 'cd'
+    NULL_DEVICE = '/dev/null'
+    DEFINE = '{name}={value}'
+    EXPAND = '${{{name}}}'
+    BLANK_LINES = False
 
 
 class BaseCLIFactory(ABC):
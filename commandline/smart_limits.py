@@ -0,0 +1,183 @@
+# Contents of commandline/smart_limits.py
+'''Copyright (c) 2024 Jaron Cheng'''
+import json
+import logging
+import operator
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from unit.log_handler import get_logger
+
+logger = get_logger(__name__, logging.INFO)
+
+
+@dataclass
+class LimitViolation:
+    """A SMART value out of its limit.
+
+    Attributes:
+        index: Position of the record in the checked batch.
+        label: Label of the record, e.g. 'PD 1'.
+        field: The SMART field.
+        value: The converted value.
+        limit: The violated limit, e.g. 'x < 70'.
+    """
+    index: int
+    label: str
+    field: str
+    value: int
+    limit: str
+
+
+class Limit(object):
+    """
+    One compiled limit of a SMART field.
+
+    A limit is declared as a dict of comparators and an optional value type,
+    e.g. {"type": "hex", "range": [0, 5]} or {"lt": 70}. Comparators are
+    'lt', 'le', 'gt', 'ge', 'eq', 'ne' and the inclusive 'range', all of
+    which must hold. Values are converted from decimal ('int', the default)
+    or hexadecimal ('hex') strings.
+
+    Attributes:
+        field (str): The SMART field.
+        base (int): 16 for hex values, 10 otherwise.
+        conditions (List[Tuple]): The comparator names and bounds.
+    """
+    OPERATORS = {'lt': operator.lt, 'le': operator.le, 'gt': operator.gt,
+                 'ge': operator.ge, 'eq': operator.eq, 'ne': operator.ne}
+    SYMBOLS = {'lt': '<', 'le': '<=', 'gt': '>', 'ge': '>=', 'eq': '==',
+               'ne': '!='}
+    TYPES = {'int': 10, 'hex': 16}
+
+    def __init__(self, field: str, spec: dict):
+        if not isinstance(spec, dict):
+            raise ValueError(f"Invalid limit of {field}: {spec!r}")
+        spec = dict(spec)
+        value_type = spec.pop('type', 'int')
+        if value_type not in self.TYPES:
+            raise ValueError(f"Invalid type of {field}: {value_type}")
+        self.field = field
+        self.base = self.TYPES[value_type]
+        self.conditions = []
+        if 'range' in spec:
+            low, high = spec.pop('range')
+            self.conditions += [('ge', self._bound(low)),
+                                ('le', self._bound(high))]
+        for name, bound in spec.items():
+            if name not in self.OPERATORS:
+                raise ValueError(f"Invalid comparator of {field}: {name}")
+            self.conditions.append((name, self._bound(bound)))
+        if not self.conditions:
+            raise ValueError(f"No comparator of {field}")
+
+    def _bound(self, bound) -> int:
+        return int(bound, 0) if isinstance(bound, str) else int(bound)
+
+    def convert(self, value) -> int:
+        '''Convert a raw SMART value, ints are taken as they are'''
+        return value if isinstance(value, int) else int(value, self.base)
+
+    def __call__(self, value) -> bool:
+        value = self.convert(value)
+        return all(self.OPERATORS[name](value, bound)
+                   for name, bound in self.conditions)
+
+    def evaluate(self, values: np.ndarray) -> np.ndarray:
+        """
+        Checks a column of converted values at once.
+
+        Args:
+            values (np.ndarray): The values of the field.
+
+        Returns:
+            np.ndarray: True where the value is within the limit.
+        """
+        passed = np.ones(len(values), dtype=bool)
+        for name, bound in self.conditions:
+            passed &= self.OPERATORS[name](values, bound)
+        return passed
+
+    def __str__(self) -> str:
+        return ' and '.join(f'x {self.SYMBOLS[name]} {bound}'
+                            for name, bound in self.conditions)
+
+    def __repr__(self) -> str:
+        return f'Limit({self.field}: {self})'
+
+
+class SMARTLimits(object):
+    """
+    SMART limits compiled once from their declarations.
+
+    Attributes:
+        limits (Dict[str, Limit]): The compiled limit of every field.
+    """
+    def __init__(self, spec: Dict[str, dict]):
+        self.limits = {field: Limit(field, limit)
+                       for field, limit in spec.items()}
+
+    @classmethod
+    def load(cls, file_path: str) -> 'SMARTLimits':
+        """
+        Loads and compiles the limits of a JSON file.
+
+        Args:
+            file_path (str): Path to the JSON file of field declarations.
+
+        Returns:
+            SMARTLimits: The compiled limits.
+
+        Raises:
+            ValueError: If a declaration is invalid, e.g. a legacy lambda
+            string.
+        """
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def check(self, records: Sequence,
+              labels: Optional[Sequence[str]] = None
+              ) -> List[LimitViolation]:
+        """
+        Checks a batch of SMART records, e.g. every PD over many samples.
+
+        Every value is converted once and each limit is evaluated over the
+        whole column of its field.
+
+        Args:
+            records (Sequence): SMARTInfo or BackendSMARTInfo records, or
+            dicts of the same fields.
+            labels (Sequence[str], optional): A label per record, its index
+            by default.
+
+        Returns:
+            List[LimitViolation]: The violations ordered by field, empty if
+            every record is within its limits. Fields the records do not
+            have are skipped.
+        """
+        rows = [record if isinstance(record, dict) else vars(record)
+                for record in records]
+        if not rows:
+            return []
+        if labels is None:
+            labels = [str(index) for index in range(len(rows))]
+        violations = []
+        for field, limit in self.limits.items():
+            if field not in rows[0]:
+                continue
+            converted = [limit.convert(row[field]) for row in rows]
+            try:
+                values = np.array(converted, dtype=np.int64)
+            except OverflowError:
+                values = np.array(converted, dtype=object)
+            for index in np.flatnonzero(~limit.evaluate(values)):
+                violations.append(LimitViolation(
+                    int(index), labels[index], field, converted[index],
+                    str(limit)))
+        for violation in violations:
+            logger.warning('%s %s = %s is out of range (%s)',
+                           violation.label, violation.field,
+                           violation.value, violation.limit)
+        return violations
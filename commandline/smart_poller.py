@@ -0,0 +1,188 @@
+# Contents of commandline/smart_poller.py
+'''Copyright (c) 2024 Jaron Cheng'''
+import logging
+import math
+import threading
+import time
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from unit.log_handler import get_logger
+from unit.ring_buffer import ColumnarRingBuffer
+
+logger = get_logger(__name__, logging.INFO)
+
+
+class SMARTPoller(object):
+    """
+    SMART time series of the controller and every PD.
+
+    The controller and per-PD SMART are sampled at a fixed interval into a
+    columnar ring buffer, one column per PD and field, so the cumulative
+    counters can be turned into per-interval deltas and rates with array
+    operations once the run is over.
+
+    Attributes:
+        pd_ids (List[str]): The sampled PDs.
+        interval (float): Seconds between two samples.
+        ring (ColumnarRingBuffer): The recorded samples.
+    """
+    COUNTERS = ('data_units_read', 'data_units_written',
+                'host_read_commands', 'host_write_commands',
+                'controller_busy_time', 'power_on_hours')
+    # A data unit is 1000 sectors of 512 bytes
+    DATA_UNIT = 512000
+
+    def __init__(self, cli, pd_ids: Sequence, interval: float = 10,
+                 capacity: int = 8640):
+        self.cli = cli
+        self.pd_ids = [str(pd_id) for pd_id in pd_ids]
+        self.interval = interval
+        columns = ['timestamp', 'controller.composite_temp']
+        for pd_id in self.pd_ids:
+            columns += [f'{pd_id}.{field}'
+                        for field in self.COUNTERS + ('composite_temp',)]
+        self.ring = ColumnarRingBuffer(columns, capacity)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sample(self) -> None:
+        '''Record one sample, a failed query leaves its columns NaN'''
+        row = {'timestamp': time.time()}
+        try:
+            row['controller.composite_temp'] = float(
+                self.cli.get_controller_smart_info().composite_temp)
+        except Exception as e:
+            logger.warning("Failed to poll controller SMART: %s", e)
+        try:
+            # One round trip for all PDs, a failed PD is just left out
+            smart_of_pd = self.cli.get_all_backend_smart_info(self.pd_ids)
+        except Exception as e:
+            logger.warning("Failed to poll SMART of PD %s: %s", self.pd_ids,
+                           e)
+            smart_of_pd = {}
+        for pd_id, smart in smart_of_pd.items():
+            for field in self.COUNTERS + ('composite_temp',):
+                row[f'{pd_id}.{field}'] = float(getattr(smart, field))
+        self.ring.append(**row)
+
+    def start(self, duration: int = None) -> None:
+        """
+        Starts sampling in the background.
+
+        Args:
+            duration (int, optional): Seconds to sample, until stop is called
+            by default.
+        """
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._poll, args=(duration,),
+                                        daemon=True)
+        self._thread.start()
+        logger.info('SMART poller started on PD %s', self.pd_ids)
+
+    def stop(self, timeout: float = 60) -> None:
+        """
+        Stops sampling and takes a last sample closing the run.
+
+        Args:
+            timeout (float): Seconds to wait for the poller thread.
+        """
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self.sample()
+        logger.info('SMART poller stopped with %d samples', len(self.ring))
+
+    def _poll(self, duration: Optional[int]) -> None:
+        end = math.inf if duration is None else time.monotonic() + duration
+        while not self._stop.is_set() and time.monotonic() < end:
+            self.sample()
+            self._stop.wait(self.interval)
+
+    def deltas(self) -> Dict[str, np.ndarray]:
+        """
+        Computes the change of every counter over each interval.
+
+        Returns:
+            dict: 'interval' holds the seconds of each interval and
+            '<pd>.<counter>' the counter deltas, NaN where a sample failed.
+        """
+        data = self.ring.to_dict()
+        result = {'interval': np.diff(data['timestamp'])}
+        for pd_id in self.pd_ids:
+            for field in self.COUNTERS:
+                column = f'{pd_id}.{field}'
+                result[column] = np.diff(data[column])
+        return result
+
+    def rates(self) -> Dict[str, np.ndarray]:
+        """
+        Computes the per-interval rates of every PD.
+
+        Returns:
+            dict: '<pd>.read_bw' and '<pd>.write_bw' in MBps from the data
+            units, '<pd>.read_iops' and '<pd>.write_iops' from the host
+            commands, and '<pd>.busy' as the busy fraction of the interval.
+        """
+        deltas = self.deltas()
+        seconds = deltas['interval']
+        result = {}
+        with np.errstate(divide='ignore', invalid='ignore'):
+            units = self.DATA_UNIT / 1024 ** 2 / seconds
+            for pd_id in self.pd_ids:
+                result[f'{pd_id}.read_bw'] = (
+                    deltas[f'{pd_id}.data_units_read'] * units)
+                result[f'{pd_id}.write_bw'] = (
+                    deltas[f'{pd_id}.data_units_written'] * units)
+                result[f'{pd_id}.read_iops'] = (
+                    deltas[f'{pd_id}.host_read_commands'] / seconds)
+                result[f'{pd_id}.write_iops'] = (
+                    deltas[f'{pd_id}.host_write_commands'] / seconds)
+                # Controller busy time is reported in minutes
+                result[f'{pd_id}.busy'] = (
+                    deltas[f'{pd_id}.controller_busy_time'] * 60 / seconds)
+        return result
+
+    def summary(self, engine_result: Optional[Sequence] = None) -> Dict:
+        """
+        Summarizes the run next to the throughput of the I/O engine.
+
+        Args:
+            engine_result (Sequence, optional): (read_bw, read_iops,
+            write_bw, write_iops, ...) as returned by run_io_operation.
+
+        Returns:
+            dict: The mean rates of every PD over the whole run, the summed
+            backend 'read_bw' and 'write_bw', and with an engine result its
+            'host_read_bw' and 'host_write_bw' plus the 'write_amplification'
+            (backend over host writes), NaN if nothing was written.
+        """
+        rates = self.rates()
+        seconds = self.deltas()['interval']
+        total = np.nansum(seconds)
+        result = {}
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for name, values in rates.items():
+                valid = ~np.isnan(values)
+                result[name] = (float(np.sum(values[valid] * seconds[valid])
+                                      / np.sum(seconds[valid]))
+                                if total and valid.any() else math.nan)
+        for metric in ('read_bw', 'write_bw'):
+            result[metric] = sum(result[f'{pd_id}.{metric}']
+                                 for pd_id in self.pd_ids)
+        if engine_result is not None:
+            result['host_read_bw'] = float(engine_result[0])
+            result['host_write_bw'] = float(engine_result[2])
+            result['write_amplification'] = (
+                result['write_bw'] / result['host_write_bw']
+                if result['host_write_bw'] else math.nan)
+            logger.info('host write = %.2f MBps, backend write = %.2f MBps, '
+                        'write amplification = %.2f',
+                        result['host_write_bw'], result['write_bw'],
+                        result['write_amplification'])
+        return result
+
+    def save(self, path: str) -> None:
+        '''Persist the recorded samples, see ColumnarRingBuffer.save'''
+        self.ring.save(path)
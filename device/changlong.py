@@ -1,8 +1,10 @@
 # Contents of device/beidou.py
 '''Copyright (c) 2025 Jaron Cheng'''
 # import json
+import hashlib
 import logging
 import re
+from typing import Dict, List, Optional
 from abc import ABC
 from abc import abstractmethod
 from commandline.mnv_cli import BaseCLI
@@ -11,6 +13,7 @@ from interface.application import NVMeController
 from interface.application import RootComplex
 from interface.application import EndPoint
 from interface.application import VirtualDrive
+from device.rebuild_monitor import RebuildMonitor
 from unit.log_handler import get_logger
 
 logger = get_logger(__name__, logging.INFO)
@@ -22,187 +25,259 @@ class BasePCIeSwitch(ABC):
         '''This is a docstring'''
         self.cmd = command
         self._controller_info = None
+        self._controller_hash = None
         self._virtual_drive_info = []
+        self._virtual_drives = {}
+        self._virtual_drive_hash = None
+
+    def rebuild_monitor(self, vd_id: int = 1, **kwargs) -> RebuildMonitor:
+        """
+        Creates a monitor of the background activity of a VD.
+
+        Args:
+            vd_id (int): The monitored VD.
+            **kwargs: Poll intervals and window, see RebuildMonitor.
+
+        Returns:
+            RebuildMonitor: The monitor, not yet polling.
+        """
+        return RebuildMonitor(self, vd_id, **kwargs)
+
+
+class ControllerInfoParser(object):
+    """
+    One-pass state machine parser of mnv_cli 'info -o hba'.
+
+    The controller fields come first, then every 'Root Complex: <id>' or
+    'End Point: <id>' line opens a PCIe device which owns the following
+    'Link width' and 'PCIe speed' lines. Keys are looked up in a static
+    table of NVMeController field names and value converters, so a line
+    costs one split and one dict lookup.
+    """
+    FIELDS = {
+        'bus device fun': ('bus_device_func', str),
+        'device': ('device', str),
+        'slot id': ('slot_id', str),
+        'firmware version': ('firmware_version', str),
+        'vid': ('vid', str),
+        'svid': ('svid', str),
+        'did': ('did', str),
+        'sdid': ('sdid', str),
+        'revisionid': ('revision_id', str),
+        'port count': ('port_count', int),
+        'max pd of per vd': ('max_pd_of_per_vd', int),
+        'max vd': ('max_vd', int),
+        'max pd': ('max_pd', int),
+        'max ns of per vd': ('max_ns_of_per_vd', int),
+        'max ns': ('max_ns', int),
+        'supported raid mode': ('supported_raid_mode', str.split),
+        'cache': ('cache', str),
+        'supported bga features': ('supported_bga_features', str.split),
+        'support stripe size': ('support_stripe_size', str.split),
+        'supported features': ('supported_features', str.split),
+    }
+    DEVICES = {'root complex': RootComplex, 'end point': EndPoint}
+    LINKS = {'link width': 'link_width', 'pcie speed': 'pcie_speed'}
+
+    @classmethod
+    def parse(cls, lines: List[str]) -> NVMeController:
+        """
+        Parses the output into an NVMeController.
+
+        Args:
+            lines (List[str]): The command output.
+
+        Returns:
+            NVMeController: The controller with its root complexes and end
+            points, missing fields are empty or 0.
+
+        Raises:
+            ValueError: If a numeric field or device ID is not a number.
+        """
+        data = {name: 0 if convert is int else convert('')
+                for name, convert in cls.FIELDS.values()}
+        devices = {RootComplex: [], EndPoint: []}
+        current = None
+        for line in lines:
+            key, colon, value = line.partition(':')
+            if not colon:
+                continue
+            key = ' '.join(key.lower().split())
+            value = value.strip()
+            if key in cls.LINKS:
+                if current is not None:
+                    setattr(current, cls.LINKS[key], value)
+            elif key in cls.DEVICES:
+                device = cls.DEVICES[key]
+                current = device(id=int(value), link_width='', pcie_speed='')
+                devices[device].append(current)
+            elif key in cls.FIELDS:
+                name, convert = cls.FIELDS[key]
+                data[name] = convert(value)
+        return NVMeController(root_complexes=devices[RootComplex],
+                              end_points=devices[EndPoint], **data)
+
+
+class VirtualDriveInfoParser(object):
+    """
+    One-pass block parser of mnv_cli 'info -o vd'.
+
+    Every 'VD ID: <id>' line opens the block of a VD which owns the field
+    lines up to the next one, and the closing 'Total # of VD' applies to
+    all of them. Keys are looked up in a static table of VirtualDrive field
+    names and value converters like ControllerInfoParser.
+    """
+    DIGITS = re.compile(r'\d+')
+    FIELDS = {
+        'name': ('name', str),
+        'status': ('status', str),
+        'importable': ('importable', str),
+        'raid mode': ('raid_mode', str),
+        'size': ('size', str),
+        'pd count': ('pd_count', int),
+        'pds': ('pds', lambda value: [
+            int(pd) for pd in VirtualDriveInfoParser.DIGITS.findall(value)]),
+        'stripe block size': ('stripe_block_size', str),
+        'sector size': ('sector_size', str),
+        'bga progress': ('bga_progress', str),
+    }
+    # Fields whose change is reported while polling
+    WATCHED = ('status', 'bga_progress')
+
+    @classmethod
+    def parse(cls, lines: List[str]) -> Dict[int, VirtualDrive]:
+        """
+        Parses the output into a map of VDs.
+
+        Args:
+            lines (List[str]): The command output.
+
+        Returns:
+            dict: The VirtualDrive of every VD by vd_id in output order,
+            missing fields are empty or 0.
+
+        Raises:
+            ValueError: If a numeric field is not a number.
+        """
+        blocks = []
+        total = 0
+        for line in lines:
+            key, colon, value = line.partition(':')
+            if not colon:
+                continue
+            key = ' '.join(key.lower().split())
+            value = value.strip()
+            if key == 'vd id':
+                blocks.append({'vd_id': int(value)})
+            elif key == 'total # of vd':
+                total = int(value)
+            elif key in cls.FIELDS and blocks:
+                name, convert = cls.FIELDS[key]
+                blocks[-1][name] = convert(value)
+        result = {}
+        for block in blocks:
+            for name, convert in cls.FIELDS.values():
+                block.setdefault(name, convert('') if convert is not int
+                                 else 0)
+            result[block['vd_id']] = VirtualDrive(total_of_vd=total, **block)
+        return result
+
+    @classmethod
+    def diff(cls, previous: Dict[int, VirtualDrive],
+             current: Dict[int, VirtualDrive]
+             ) -> Dict[int, Optional[VirtualDrive]]:
+        """
+        Compares two maps of VDs.
+
+        Args:
+            previous (dict): The VDs of the last poll.
+            current (dict): The VDs of this poll.
+
+        Returns:
+            dict: The new VDs and the VDs whose watched fields changed by
+            vd_id, None for the removed VDs.
+        """
+        changed = {vd_id: None for vd_id in previous if vd_id not in current}
+        for vd_id, drive in current.items():
+            before = previous.get(vd_id)
+            if before is None or any(
+                    getattr(before, name) != getattr(drive, name)
+                    for name in cls.WATCHED):
+                changed[vd_id] = drive
+        return changed
 
 
 class Changlong(BasePCIeSwitch):
+    @staticmethod
+    def _lines(output) -> List[str]:
+        if isinstance(output, list):
+            return output
+        elif isinstance(output, str):
+            return output.splitlines()
+        raise TypeError("Invalid output type, expected str or list")
+
     @property
     def controller_info(self) -> NVMeController:
+        """
+        The controller of 'info -o hba', parsed again only when the output
+        changed since the last access.
+        """
         try:
-            hba_info = self.cmd.interpret('info -o hba')
-            logger.debug('hba_info = %s', hba_info)
-            data = {}
-            root_complexes = []
-            end_points = []
-            current_section = None
-
-            if isinstance(hba_info, list):
-                lines = hba_info
-            elif isinstance(hba_info, str):
-                lines = hba_info.splitlines()
-            else:
-                raise TypeError("Invalid output type, expected str or list")
-
-            for line in lines:
-                match = re.match(r"(.*?):\s+(.*)", line)
-                if match:
-                    key, value = match.groups()
-                    key = re.sub(r'[^a-zA-Z0-9_]', '_', key.lower())
-
-                    if key.startswith("root_complex"):
-                        root_id = int(value)
-                        root_complexes.append(RootComplex(
-                            id=root_id,
-                            link_width="",
-                            pcie_speed=""
-                        ))
-                        current_section = "root_complex"
-                    elif key.startswith("end_point"):
-                        end_id = int(value)
-                        end_points.append(EndPoint(id=end_id, link_width="",
-                                                   pcie_speed=""))
-                        current_section = "end_point"
-                    elif key == "link_width":
-                        if current_section == \
-                                "root_complex" and root_complexes:
-                            root_complexes[-1].link_width = value
-                        elif current_section == "end_point" and end_points:
-                            end_points[-1].link_width = value
-                    elif key == "pcie_speed":
-                        if current_section == "root_complex" and \
-                                root_complexes:
-                            root_complexes[-1].pcie_speed = value
-                        elif current_section == "end_point" and end_points:
-                            end_points[-1].pcie_speed = value
-                    else:
-                        data[key] = value
-
-            # Convert specific values to correct types
-            int_fields = ["port_count", "max_pd_of_per_vd", "max_vd", "max_pd",
-                          "max_ns_of_per_vd", "max_ns"]
-            for int_field in int_fields:
-                data[int_field] = int(data.get(int_field, 0))
-
-            list_fields = ["supported_raid_mode", "supported_bga_features",
-                           "support_stripe_size", "supported_features"]
-            for list_field in list_fields:
-                data[list_field] = data.get(list_field, "").split()
-
-            self._controller_info = NVMeController(
-                bus_device_func=data.get("bus_device_fun", ""),
-                device=data.get("device", ""),
-                slot_id=data.get("slot_id", ""),
-                firmware_version=data.get("firmware_version", ""),
-                vid=data.get("vid", ""),
-                svid=data.get("svid", ""),
-                did=data.get("did", ""),
-                sdid=data.get("sdid", ""),
-                revision_id=data.get("revisionid", ""),
-                port_count=data["port_count"],
-                max_pd_of_per_vd=data["max_pd_of_per_vd"],
-                max_vd=data["max_vd"],
-                max_pd=data["max_pd"],
-                max_ns_of_per_vd=data["max_ns_of_per_vd"],
-                max_ns=data["max_ns"],
-                supported_raid_mode=data["supported_raid_mode"],
-                cache=data.get("cache", ""),
-                supported_bga_features=data["supported_bga_features"],
-                support_stripe_size=data["support_stripe_size"],
-                supported_features=data["supported_features"],
-                root_complexes=root_complexes,
-                end_points=end_points,
-            )
+            lines = self._lines(self.cmd.interpret('info -o hba'))
+            logger.debug('hba_info = %s', lines)
+
+            output_hash = hashlib.sha1('\n'.join(lines).encode()).hexdigest()
+            if (self._controller_info is None or
+                    output_hash != self._controller_hash):
+                self._controller_info = ControllerInfoParser.parse(lines)
+                self._controller_hash = output_hash
             return self._controller_info
 
         except Exception as e:
             logger.error("An unexpected error in controller_info: %s", e)
-            self._contrller_info = None
+            self._controller_info = None
             raise
 
-    @property
-    def virtual_drive_info(self) -> VirtualDrive:
+    def poll_virtual_drives(self) -> Dict[int, Optional[VirtualDrive]]:
+        """
+        Polls 'info -o vd' and reports what changed since the last poll.
+
+        An unchanged output costs a hash compare, and only the map of the
+        current VDs is kept however long the polling runs.
+
+        Returns:
+            dict: See VirtualDriveInfoParser.diff, empty if nothing
+            changed.
+        """
         try:
-            vd_info = self.cmd.interpret('info -o vd')
-            logger.debug('vd_info = %s', vd_info)
-            virtual_drives = []
-            data = {}
-            pd_ids = []
-
-            if isinstance(vd_info, list):
-                lines = vd_info
-            elif isinstance(vd_info, str):
-                lines = vd_info.splitlines()
-            else:
-                raise TypeError("Invalid output type, expected str or list")
-
-            for line in lines:
-                match = re.match(r"(.*?):\s+(.*)", line)
-                if match:
-                    key, value = match.groups()
-                    key = re.sub(r'[^a-zA-Z0-9_]', '_', key.lower())
-                    logger.debug("%s: %s", key, value)
-
-                    if key.startswith("vd_id"):
-                        logger.debug("value = %s", value)
-                        root_id = int(value)
-                        virtual_drives.append(VirtualDrive(
-                                vd_id=root_id,
-                                name="",
-                                status="",
-                                importable="",
-                                raid_mode="",
-                                size="",
-                                pd_count="",
-                                pds="",
-                                stripe_block_size="",
-                                sector_size="",
-                                bga_progress="",
-                                total_of_vd=""
-                            )
-                        )
-                    elif key.startswith("pds"):
-                        if not pd_ids:
-                            pds = re.findall(r'\d+', value)
-                            logger.debug("pds = %s", pds)
-                            pd_ids = list(map(int, pds))
-                            logger.debug("pd_ids = %s", pd_ids)
-                    else:
-                        data[key] = value
-
-            logger.debug("data = %s", data)
-            # Convert specific values to correct types
-            int_fields = ["vd_id", "pd_count", "total___of_vd"]
-            for int_field in int_fields:
-                data[int_field] = int(data.get(int_field, 0))
-
-            list_fields = ["name", "status", "importable", "raid_mode",
-                           "size", "stripe_block_size", "sector_size"]
-            for list_field in list_fields:
-                data[list_field] = data.get(list_field, "")
-
-            for virtual_drive in virtual_drives:
-                self._virtual_drive_info.append(VirtualDrive(
-                        vd_id=virtual_drive.vd_id,
-                        name=data.get("name", ""),
-                        status=data.get("status", ""),
-                        importable=data.get("importable", ""),
-                        raid_mode=data.get("raid_mode", ""),
-                        size=data.get("size", ""),
-                        pd_count=data.get("pd_count", ""),
-                        pds=pd_ids,
-                        stripe_block_size=data.get("stripe_block_size", ""),
-                        sector_size=data.get("sector_size", ""),
-                        bga_progress=data.get("bga_progress", ""),
-                        total_of_vd=data.get("total___of_vd")
-                    )
-                )
-                return self._virtual_drive_info
+            lines = self._lines(self.cmd.interpret('info -o vd'))
+            logger.debug('vd_info = %s', lines)
+
+            output_hash = hashlib.sha1('\n'.join(lines).encode()).hexdigest()
+            if output_hash == self._virtual_drive_hash:
+                return {}
+            current = VirtualDriveInfoParser.parse(lines)
+            changed = VirtualDriveInfoParser.diff(self._virtual_drives,
+                                                  current)
+            self._virtual_drives = current
+            self._virtual_drive_hash = output_hash
+            for vd_id, drive in changed.items():
+                logger.debug('VD %s changed to %s', vd_id, drive)
+            return changed
 
         except Exception as e:
             logger.error("An unexpected error in virtual_drive_info: %s", e)
-            self._virtual_drive_info = None
+            self._virtual_drives = {}
+            self._virtual_drive_hash = None
             raise
 
+    @property
+    def virtual_drive_info(self) -> List[VirtualDrive]:
+        '''The VDs of 'info -o vd' in output order'''
+        self.poll_virtual_drives()
+        self._virtual_drive_info = list(self._virtual_drives.values())
+        return self._virtual_drive_info
+
 
 class BasePCIeSwitchFactory(ABC):
     def __init__(self, api: BaseInterface):
@@ -0,0 +1,198 @@
+'''Copyright (c) 2025 Jaron Cheng'''
+import logging
+import math
+import re
+import threading
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+from unit.log_handler import get_logger
+from unit.ring_buffer import ColumnarRingBuffer
+
+logger = get_logger(__name__, logging.INFO)
+
+
+class RebuildMonitor(object):
+    """
+    Progress time series of the background activity of a VD.
+
+    The 'BGA progress' of the VD, e.g. 'Rebuilding is running in 37%', is
+    polled into a columnar ring buffer. A line fitted to the latest samples
+    gives the progress rate, from which the ETA and the MB/s over the VD
+    size are estimated. The poll interval follows the ETA, so the monitor
+    polls seldom in the middle of a long rebuild and often near the end.
+    The activity is finished once the VD reports no BGA progress.
+
+    Attributes:
+        switch (BasePCIeSwitch): The device polled for its VDs.
+        vd_id (int): The monitored VD.
+        min_interval (float): Shortest seconds between two polls.
+        max_interval (float): Longest seconds between two polls.
+        window (int): Number of latest samples the rate is fitted to.
+        ring (ColumnarRingBuffer): The recorded samples.
+    """
+    PROGRESS = re.compile(
+        r'(?P<activity>.+?) is running in (?P<percent>\d+(?:\.\d+)?)%')
+    SIZE = re.compile(r'(\d+(?:\.\d+)?)\s*([KMGT])B', re.I)
+    UNITS = {'K': 1 / 1024, 'M': 1, 'G': 1024, 'T': 1024 ** 2}
+    # The ETA is covered in about this many polls
+    POLLS_PER_ETA = 10
+
+    def __init__(self, switch, vd_id: int = 1, min_interval: float = 5,
+                 max_interval: float = 60, window: int = 10,
+                 capacity: int = 8640):
+        self.switch = switch
+        self.vd_id = vd_id
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.window = window
+        self.ring = ColumnarRingBuffer(['timestamp', 'progress'], capacity)
+        self.activity = None
+        self.size_mb = math.nan
+        self.finished = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sample(self) -> Optional[float]:
+        """
+        Records the progress of the VD once.
+
+        Returns:
+            float or None: The progress in percent, None once the activity
+            finished or if the VD is gone.
+        """
+        drive = next((drive for drive in self.switch.virtual_drive_info
+                      if drive.vd_id == self.vd_id), None)
+        if drive is None:
+            logger.warning('VD %s not found', self.vd_id)
+            return None
+        match = self.SIZE.search(drive.size or '')
+        if match:
+            self.size_mb = (float(match.group(1)) *
+                            self.UNITS[match.group(2).upper()])
+        match = self.PROGRESS.search(drive.bga_progress or '')
+        if not match:
+            if len(self.ring):
+                # The last poll closes the activity at 100%
+                self.ring.append(timestamp=time.time(), progress=100.0)
+            self.finished = True
+            logger.info('VD %s has no background activity (%s)',
+                        self.vd_id, drive.status)
+            return None
+        self.activity = match.group('activity')
+        progress = float(match.group('percent'))
+        self.ring.append(timestamp=time.time(), progress=progress)
+        return progress
+
+    def rate(self) -> float:
+        """
+        Fits the progress rate to the latest samples.
+
+        Returns:
+            float: Percent per second, NaN until the progress moved.
+        """
+        timestamps = self.ring.column('timestamp')[-self.window:]
+        progress = self.ring.column('progress')[-self.window:]
+        if len(timestamps) < 2 or np.ptp(progress) == 0:
+            return math.nan
+        slope = np.polyfit(timestamps - timestamps[0], progress, 1)[0]
+        return float(slope) if slope > 0 else math.nan
+
+    def eta(self) -> float:
+        '''Seconds until the activity finishes, NaN while unknown'''
+        if self.finished:
+            return 0.0
+        progress = self.ring.column('progress')
+        if not len(progress):
+            return math.nan
+        return (100 - progress[-1]) / self.rate()
+
+    def throughput(self) -> float:
+        '''MB/s of the activity over the VD size, NaN while unknown'''
+        return self.rate() / 100 * self.size_mb
+
+    def next_interval(self) -> float:
+        '''Seconds until the next poll, short while the ETA is unknown'''
+        eta = self.eta()
+        if math.isnan(eta):
+            return self.min_interval
+        return min(max(eta / self.POLLS_PER_ETA, self.min_interval),
+                   self.max_interval)
+
+    def run(self, timeout: float = None) -> Dict:
+        """
+        Polls until the activity finishes.
+
+        Args:
+            timeout (float, optional): Seconds to poll at most, no limit by
+            default.
+
+        Returns:
+            dict: See summary.
+        """
+        self._stop.clear()
+        end = math.inf if timeout is None else time.monotonic() + timeout
+        while not self._stop.is_set() and time.monotonic() < end:
+            if self.sample() is None:
+                break
+            logger.debug('VD %s %s %.1f%%, ETA %.0f s, %.1f MBps',
+                         self.vd_id, self.activity,
+                         self.ring.column('progress')[-1], self.eta(),
+                         self.throughput())
+            self._stop.wait(min(self.next_interval(),
+                                max(end - time.monotonic(), 0)))
+        return self.summary()
+
+    def start(self, timeout: float = None) -> None:
+        '''Poll in the background, e.g. alongside a stress test'''
+        self._thread = threading.Thread(target=self.run, args=(timeout,),
+                                        daemon=True)
+        self._thread.start()
+        logger.info('Rebuild monitor started on VD %s', self.vd_id)
+
+    def stop(self, timeout: float = 60) -> Dict:
+        """
+        Stops polling in the background.
+
+        Args:
+            timeout (float): Seconds to wait for the monitor thread.
+
+        Returns:
+            dict: See summary.
+        """
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        return self.summary()
+
+    def summary(self) -> Dict:
+        """
+        Summarizes the activity.
+
+        Returns:
+            dict: The 'activity', whether it 'finished', the last
+            'progress' in percent, the 'duration' in seconds, the mean
+            'rate' in percent per second and its 'mbps' over the whole
+            series, and the 'eta' in seconds of the fitted rate.
+        """
+        timestamps = self.ring.column('timestamp')
+        progress = self.ring.column('progress')
+        duration = (float(timestamps[-1] - timestamps[0])
+                    if len(timestamps) else 0.0)
+        rate = (float(progress[-1] - progress[0]) / duration
+                if duration else math.nan)
+        result = {'activity': self.activity, 'finished': self.finished,
+                  'progress': float(progress[-1]) if len(progress)
+                  else math.nan,
+                  'duration': duration, 'rate': rate,
+                  'mbps': rate / 100 * self.size_mb, 'eta': self.eta()}
+        logger.info('VD %s %s: %.1f%% in %.0f s, %.1f MBps, ETA %.0f s',
+                    self.vd_id, result['activity'], result['progress'],
+                    result['duration'], result['mbps'], result['eta'])
+        return result
+
+    def save(self, path: str) -> None:
+        '''Persist the recorded samples, see ColumnarRingBuffer.save'''
+        self.ring.save(path)
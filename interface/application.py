@@ -8,6 +8,7 @@ from dataclasses import field
 from typing import Tuple
 from typing import List
 from typing import Dict
+from typing import Iterator
 from unit.json_handler import dict_format
 import logging
 import subprocess
@@ -212,7 +213,8 @@ class BaseInterface(ABC):
         self.script_name = "diskpart_script.txt"
 
     @abstractmethod
-    def ftp_command(self, str_target_file: str) -> bool:
+    def ftp_command(self, str_target_file: str,
+                    remote_name: str = None) -> bool:
         """Handles FTP commands."""
 
     @abstractmethod
@@ -223,6 +225,23 @@ class BaseInterface(ABC):
     def io_command(self, str_ssh_command: str) -> bool:
         """Executes I/O related commands over SSH."""
 
+    def io_stream(self, str_ssh_command: str) -> Iterator[str]:
+        """
+        Executes a command over SSH and yields its output line by line as
+        it arrives. The session is closed when the caller stops iterating.
+        """
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        client.connect(self.remote_ip, port=22, username=self.account,
+                       password=self.password)
+        try:
+            _, stdout, _ = client.exec_command(str_ssh_command,
+                                               get_pty=True)
+            for line in iter(stdout.readline, ''):
+                yield line.rstrip('\r\n')
+        finally:
+            client.close()
+
     def __import_config(self) -> Dict[str, str]:
         '''This is a docstring'''
         try:
@@ -425,7 +444,8 @@ class WindowsInterface(BaseInterface):
         else:
             raise ValueError('Unknown mode setting in command_line')
 
-    def ftp_command(self, str_target_file: str) -> bool:
+    def ftp_command(self, str_target_file: str,
+                    remote_name: str = None) -> bool:
         '''Placeholder'''
         logger.debug('str_target_file: %s', str_target_file)
         try:
@@ -436,9 +456,9 @@ class WindowsInterface(BaseInterface):
             logger.debug('password = %s', self.password)
             logger.debug('remote_dir = %s', self.remote_dir)
 
-            remote_script_path = os.path.join(self.remote_dir,
-                                              self.script_name).replace("\\",
-                                                                        "/")
+            remote_script_path = os.path.join(
+                self.remote_dir,
+                remote_name or self.script_name).replace("\\", "/")
             logger.debug('remote_script_path = %s', remote_script_path)
             client.connect(self.remote_ip, port=22, username=self.account,
                            password=self.password)
@@ -560,7 +580,8 @@ class LinuxInterface(BaseInterface):
         else:
             raise ValueError('Unknown mode setting in command_line')
 
-    def ftp_command(self, str_target_file: str) -> bool:
+    def ftp_command(self, str_target_file: str,
+                    remote_name: str = None) -> bool:
         '''Placeholder'''
         logger.debug('str_target_file: %s', str_target_file)
         try:
@@ -572,7 +593,8 @@ class LinuxInterface(BaseInterface):
             logger.debug('remote_dir = %s', self.remote_dir)
 
             remote_script_path = (
-                self.remote_dir.replace("\\", "/") + f"/{self.script_name}")
+                self.remote_dir.replace("\\", "/") +
+                f"/{remote_name or self.script_name}")
             logger.debug('remote_script_path = %s', remote_script_path)
             client.connect(self.remote_ip, port=22, username=self.account,
                            password=self.password)
@@ -0,0 +1,221 @@
+# Contents of storage/affinity.py
+'''Copyright (c) 2024 Jaron Cheng'''
+import json
+import logging
+import os
+import re
+from dataclasses import asdict
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from unit.log_handler import get_logger
+
+logger = get_logger(__name__, logging.INFO)
+
+
+@dataclass
+class CpuTopology:
+    """CPU topology of a SUT.
+
+    Attributes:
+        cores: Number of physical cores.
+        logical: Number of logical processors.
+        numa_nodes: Number of NUMA nodes, cores are split evenly among them.
+        smt_adjacent: True if SMT siblings are numbered next to each other
+            (Windows: core k owns 2k and 2k+1), False if they are numbered
+            one core count apart (Linux: core k owns k and k+cores).
+    """
+    cores: int
+    logical: int
+    numa_nodes: int = 1
+    smt_adjacent: bool = True
+
+    @classmethod
+    def from_platform(cls, platform, smt_adjacent: bool = True
+                      ) -> 'CpuTopology':
+        '''Read the topology from a platform object such as AMD64Windows'''
+        cores = platform.cpu.cores
+        logical = getattr(platform, 'logic_processors', None) or cores
+        numa_nodes = getattr(platform, 'numa_nodes', None) or 1
+        return cls(cores, logical, numa_nodes, smt_adjacent)
+
+    @property
+    def smt(self) -> int:
+        return max(self.logical // self.cores, 1)
+
+    def siblings(self, core: int) -> List[int]:
+        '''Logical processors of a physical core'''
+        if self.smt_adjacent:
+            return [core * self.smt + index for index in range(self.smt)]
+        return [core + index * self.cores for index in range(self.smt)]
+
+    def node_of(self, core: int) -> int:
+        return core * self.numa_nodes // self.cores
+
+
+@dataclass
+class AffinityPlan:
+    """Threads and affinity of every target.
+
+    Attributes:
+        name: Name of the candidate, e.g. 'physical_cores'.
+        threads: Threads per target.
+        cpus: Logical processors of every target, in target order.
+        score: Throughput measured by the benchmark, 0 if not measured.
+    """
+    name: str
+    threads: int
+    cpus: List[List[int]]
+    score: float = 0.0
+
+    @property
+    def cpu_group(self) -> str:
+        """Affinity in the DISKSPD '-ag' format of processor group 0.
+
+        DISKSPD assigns the threads of all targets in order round robin over
+        the list, so thread j of target i runs on cpus[i][j].
+        """
+        cpus = [cpu for target in self.cpus for cpu in target]
+        return f"0,{','.join(str(cpu) for cpu in cpus)}"
+
+
+class AffinityPlanner(object):
+    """
+    Plans the threads and CPU affinity of the targets of a perf or stress
+    engine.
+
+    Candidate plans are derived from the topology, benchmarked with a short
+    run each, and the best one is stored per SUT so later sessions reuse it
+    without benchmarking again.
+
+    Attributes:
+        topology (CpuTopology): The topology of the SUT.
+        target_count (int): Number of targets, e.g. volumes.
+        sut (str): Identifier of the SUT, e.g. its IP address.
+        cache_dir (str): Directory of the stored plans.
+    """
+    CACHE_DIR = '.affinity'
+
+    def __init__(self, topology: CpuTopology, target_count: int, sut: str,
+                 cache_dir: str = None):
+        self.topology = topology
+        self.target_count = max(target_count, 1)
+        self.sut = sut
+        self.cache_dir = cache_dir or self.CACHE_DIR
+
+    def _split(self, cores: List[int]) -> List[List[int]]:
+        '''Split cores among targets, keeping each target on one NUMA node'''
+        nodes = self.topology.numa_nodes
+        result = [[] for _ in range(self.target_count)]
+        for node in range(nodes):
+            targets = list(range(node, self.target_count, nodes))
+            node_cores = [core for core in cores
+                          if self.topology.node_of(core) == node]
+            if not targets or not node_cores:
+                continue
+            share = max(len(node_cores) // len(targets), 1)
+            for order, target in enumerate(targets):
+                start = order * share % len(node_cores)
+                result[target] = node_cores[start:start + share]
+        # Fewer nodes with cores than targets, wrap around all cores
+        for target, assigned in enumerate(result):
+            if not assigned:
+                result[target] = [cores[target % len(cores)]]
+        return result
+
+    def candidates(self) -> List[AffinityPlan]:
+        """
+        Builds the candidate plans.
+
+        Returns:
+            List[AffinityPlan]: 'cpu0' (the legacy default), one core per
+            target, all physical cores, and all logical processors.
+        """
+        cores = list(range(self.topology.cores))
+        siblings = self.topology.siblings
+        plans = [AffinityPlan('cpu0', 1, [[0]] * self.target_count)]
+
+        split = self._split(cores)
+        single = [[siblings(group[0])[0]] for group in split]
+        plans.append(AffinityPlan('core_per_target', 1, single))
+
+        width = min(len(group) for group in split)
+        physical = [[siblings(core)[0] for core in group[:width]]
+                    for group in split]
+        plans.append(AffinityPlan('physical_cores', width, physical))
+
+        if self.topology.smt > 1:
+            logical = [[cpu for core in group[:width]
+                        for cpu in siblings(core)] for group in split]
+            plans.append(AffinityPlan('all_logical',
+                                      width * self.topology.smt, logical))
+        return plans
+
+    def select(self, benchmark: Callable[[AffinityPlan], float]
+               ) -> AffinityPlan:
+        """
+        Benchmarks every candidate and stores the best one.
+
+        Args:
+            benchmark (Callable): Runs a short workload with a plan applied
+            and returns its throughput, e.g. IOPS.
+
+        Returns:
+            AffinityPlan: The plan with the highest score.
+        """
+        best = None
+        for plan in self.candidates():
+            try:
+                plan.score = float(benchmark(plan))
+            except Exception as e:
+                logger.warning("Benchmark of %s failed: %s", plan.name, e)
+                continue
+            logger.info('%s: threads = %d, cpus = %s, score = %.2f',
+                        plan.name, plan.threads, plan.cpus, plan.score)
+            if best is None or plan.score > best.score:
+                best = plan
+        if best is None:
+            raise RuntimeError("No affinity plan could be benchmarked.")
+        self.save(best)
+        return best
+
+    def plan(self, benchmark: Callable[[AffinityPlan], float]
+             ) -> AffinityPlan:
+        '''Return the stored plan of the SUT, benchmarking if there is none'''
+        return self.load() or self.select(benchmark)
+
+    @property
+    def cache_path(self) -> str:
+        sut = re.sub(r'[^\w.-]', '_', str(self.sut))
+        return os.path.join(self.cache_dir,
+                            f'{sut}_{self.target_count}.json')
+
+    def save(self, plan: AffinityPlan) -> None:
+        '''Store the plan of the SUT'''
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self.cache_path, 'w', encoding='utf-8') as f:
+            json.dump({'topology': asdict(self.topology),
+                       'plan': asdict(plan)}, f, indent=4)
+        logger.info('Stored affinity plan %s in %s', plan.name,
+                    self.cache_path)
+
+    def load(self) -> Optional[AffinityPlan]:
+        """
+        Loads the stored plan of the SUT.
+
+        Returns:
+            AffinityPlan or None: The stored plan, None if there is none or
+            it was planned for another topology.
+        """
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+        except FileNotFoundError:
+            return None
+        except json.JSONDecodeError as e:
+            logger.error("Error decoding %s: %s", self.cache_path, e)
+            return None
+        if stored.get('topology') != asdict(self.topology):
+            logger.info('Topology of %s changed, planning again', self.sut)
+            return None
+        return AffinityPlan(**stored['plan'])
@@ -1,5 +1,7 @@
 # Contents of storage/partition.py
 '''Copyright (c) 2024 Jaron Cheng'''
+import base64
+import json
 import logging
 import math
 import re
@@ -8,8 +10,9 @@ from abc import ABC
 from abc import abstractmethod
 # from amd64.nvme import AMD64NVMe
 from system.amd64 import BaseOS
-from typing import List
+from typing import Dict, List, Optional, Tuple
 from interface.application import BaseInterface
+from storage.volume_cache import VolumeMapCache
 from unit.log_handler import get_logger
 
 logger = get_logger(__name__, logging.INFO)
@@ -42,12 +45,29 @@ class PartitionDisk(ABC):
         self.memory_size = platform.memory_size
         self.disk_format = disk_format
         self.file_system = file_system
-        self.disk_num, self.serial_num = self._get_disk_num().values()
+        self._layout = {}
         self._partition_size = None
         self._disk_capacity = None
+
+        # Skip the remote enumeration if the SUT is unchanged since the
+        # volume map was stored, a hit still runs one remote serial query
+        self._cache = VolumeMapCache(self.remote_ip)
+        self._config_hash = VolumeMapCache.config_hash(
+            platform.api.virtual_drive, self.physical_drive)
+        entry = self._cache.load(self._config_hash, self._query_serial)
+        if entry:
+            self.disk_num = entry['disk_num']
+            self.serial_num = entry['serial_num']
+            self._layout = entry['layout']
+        else:
+            self.disk_num, self.serial_num = self._get_disk_num().values()
         self.partition_num = math.floor(
             self.disk_capacity / self.partition_size)
-        self.disk_info = self._get_volume()
+        if entry:
+            self.disk_info = [tuple(volume) for volume in entry['disk_info']]
+        else:
+            self.disk_info = self._get_volume()
+            self.store_cache()
 
     @abstractmethod
     def execute(self) -> bool:
@@ -66,10 +86,57 @@ class PartitionDisk(ABC):
     def _get_disk_num(self):
         pass
 
+    @abstractmethod
+    def _query_serial(self, disk_num) -> str:
+        '''Serial number the disk of a stored disk_num reports now'''
+        pass
+
     @abstractmethod
     def _get_volume(self):
         pass
 
+    def store_cache(self) -> None:
+        '''Store the layout and volume map for the next setup'''
+        self._cache.save(self._config_hash, self.serial_num, {
+            'disk_num': self.disk_num,
+            'layout': self._layout,
+            'disk_info': self.disk_info,
+        })
+
+    @property
+    def partition_size(self):
+        '''Returns the partition size as the next power of 2 based on memory
+        size.
+        '''
+        if self._partition_size is None:
+            self._partition_size = self._next_power_of_2(self.memory_size * 2)
+        return self._partition_size
+
+    def _next_power_of_2(self, x):
+        '''Returns the next power of 2 greater than or equal to x.'''
+        return 1 if x == 0 else 2**math.ceil(math.log2(x))
+
+    @property
+    def disk_capacity(self):
+        '''Capacity of the target disk in GiB, from the layout query'''
+        if self._disk_capacity is None:
+            try:
+                self._disk_capacity = int(self._layout['Size']) / (2**30)
+                logger.debug("disk_capacity = %s", self._disk_capacity)
+            except (KeyError, TypeError, ValueError) as e:
+                logger.error('Error occurred in disk_capacity: %s', e)
+                raise
+        return self._disk_capacity
+
+    @staticmethod
+    def _format_size(size: float) -> str:
+        '''Format bytes as PowerShell does, e.g. 68719476736 -> "64 GB"'''
+        units = ('B', 'KB', 'MB', 'GB', 'TB')
+        exponent = 0
+        while exponent < len(units) - 1 and size >= 1024 ** (exponent + 1):
+            exponent += 1
+        return f'{round(size / 1024 ** exponent, 2):g} {units[exponent]}'
+
 
 class WindowsVolume(PartitionDisk):
     """
@@ -77,7 +144,179 @@ class WindowsVolume(PartitionDisk):
 
     Provides methods to write, execute, and delete partitioning scripts
     on a Windows platform.
+
+    The disk number, serial number, capacity and partitions of the target
+    disk are gathered by one PowerShell query, and the same query runs right
+    after diskpart when partitions are created, so no extra probe is needed.
     """
+    LAYOUT_QUERY = (
+        "$disk = Get-PhysicalDisk | Where-Object FriendlyName -match "
+        "'{manufacturer}' | Select-Object -First 1; "
+        "$parts = @(Get-Partition -DiskNumber $disk.DeviceId "
+        "-ErrorAction SilentlyContinue | "
+        "Select-Object PartitionNumber, DriveLetter, Size); "
+        "@{{Number = [int]$disk.DeviceId; "
+        "SerialNumber = $disk.SerialNumber; Size = $disk.Size; "
+        "Partitions = $parts}} | ConvertTo-Json -Compress -Depth 3"
+    )
+    # Quick-format every lettered partition of the disk in its own job
+    FORMAT_QUERY = (
+        "$jobs = @(Get-Partition -DiskNumber {disk_num} | "
+        "Where-Object {{ $_.DriveLetter -match '[A-Z]' }} | "
+        "ForEach-Object {{ Start-Job -ArgumentList "
+        "([string]$_.DriveLetter), '{file_system}' -ScriptBlock {{ "
+        "param($letter, $fs) $time = Measure-Command {{ "
+        "Format-Volume -DriveLetter $letter -FileSystem $fs "
+        "-Confirm:$false | Out-Null }}; "
+        "[pscustomobject]@{{DriveLetter = $letter; "
+        "Seconds = $time.TotalSeconds}} }} }}); "
+        "$jobs | Wait-Job | Receive-Job | "
+        "Select-Object DriveLetter, Seconds | ConvertTo-Json -Compress"
+    )
+    SERIAL_QUERY = (
+        "$disk = Get-PhysicalDisk | Where-Object DeviceId -eq '{disk_num}'; "
+        "@{{Number = [int]$disk.DeviceId; "
+        "SerialNumber = $disk.SerialNumber}} | ConvertTo-Json -Compress"
+    )
+    PARALLEL_FORMAT = False
+
+    def __init__(self, platform: BaseOS, disk_format: str,
+                 file_system: str):
+        # Seconds each volume took to format in the last parallel run
+        self.format_times: Dict[str, float] = {}
+        super().__init__(platform, disk_format, file_system)
+
+    @classmethod
+    def set_parallel_format(cls, parallel_format: bool):
+        """
+        Sets whether partitions are formatted concurrently.
+
+        Args:
+            parallel_format (bool): True to create the partition table first
+            and then quick-format all volumes in parallel jobs.
+        """
+        cls.PARALLEL_FORMAT = parallel_format
+        logger.info("Manually set PARALLEL_FORMAT: %s", cls.PARALLEL_FORMAT)
+
+    @staticmethod
+    def _encode(query: str) -> str:
+        '''Encode a PowerShell script to survive the SSH quoting'''
+        encoded = base64.b64encode(query.encode('utf-16-le')).decode()
+        return f'powershell -NoProfile -EncodedCommand {encoded}'
+
+    @property
+    def disk_manufacturer(self) -> str:
+        if self.disk_vid == '0x1b4b':
+            return 'Marvell'
+        return 'CT500P5SSD8'
+
+    def layout_command(self) -> str:
+        '''Compose the encoded layout query'''
+        return self._encode(self.LAYOUT_QUERY.format(
+            manufacturer=self.disk_manufacturer))
+
+    def format_command(self) -> str:
+        '''Compose the encoded parallel quick-format of the disk'''
+        return self._encode(self.FORMAT_QUERY.format(
+            disk_num=self.disk_num, file_system=self.file_system.upper()))
+
+    @staticmethod
+    def parse_format_times(output) -> Dict[str, float]:
+        """
+        Parses the per-volume timing printed by the format jobs.
+
+        Args:
+            output (list): The command output lines.
+
+        Returns:
+            Dict[str, float]: Seconds taken to format each drive letter.
+        """
+        times = {}
+        for line in output or []:
+            line = str(line).strip()
+            if '"Seconds"' not in line:
+                continue
+            try:
+                records = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(records, dict):
+                records = [records]
+            for record in records:
+                times[record['DriveLetter']] = float(record['Seconds'])
+        return times
+
+    @staticmethod
+    def parse_layout(output) -> Optional[Dict]:
+        """
+        Parses the JSON printed by the layout query.
+
+        Args:
+            output (str, list or dict): The command output, possibly with
+            diskpart messages before the JSON line.
+
+        Returns:
+            dict or None: Number, SerialNumber, Size and Partitions of the
+            disk, None if the output holds no layout.
+        """
+        if isinstance(output, dict):
+            lines = list(output.values())
+        elif isinstance(output, str):
+            lines = output.splitlines()
+        else:
+            lines = list(output or [])
+        for line in reversed(lines):
+            line = str(line).strip()
+            if not line.startswith('{'):
+                continue
+            try:
+                layout = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if 'Number' in layout:
+                partitions = layout.get('Partitions') or []
+                # A single object is not wrapped in an array by PowerShell
+                if isinstance(partitions, dict):
+                    partitions = [partitions]
+                layout['Partitions'] = partitions
+                return layout
+        return None
+
+    def query_layout(self) -> Dict:
+        """
+        Gathers the layout of the target disk in one PowerShell query.
+
+        Returns:
+            dict: Number, SerialNumber, Size in bytes, and Partitions with
+            their PartitionNumber, DriveLetter and Size.
+
+        Raises:
+            ValueError: If the query returns no layout.
+        """
+        try:
+            layout = self.parse_layout(
+                self._api.command_line(self.layout_command()))
+            if layout is None:
+                raise ValueError("No disk layout returned from powershell")
+        except Exception as e:
+            logger.error('Error occurred in query_layout: %s', e)
+            raise
+        logger.debug('layout = %s', layout)
+        self._layout = layout
+        return layout
+
+    def volume_map(self, layout: Dict) -> List[Tuple[str, str]]:
+        '''Drive letter and size of every partition of a layout'''
+        volumes = []
+        for partition in layout.get('Partitions', []):
+            letter = partition.get('DriveLetter') or ''
+            if isinstance(letter, int):
+                letter = chr(letter)
+            letter = letter.strip('\x00 ')
+            volumes.append((letter or "No Drive Letter",
+                            self._format_size(partition.get('Size') or 0)))
+        return volumes
+
     def write_script(self, diskpart_script: str) -> bool:
         """
         Write a disk partitioning script to a file and upload it via FTP.
@@ -125,6 +364,8 @@ class WindowsVolume(PartitionDisk):
             Exception: If an error occurs during the execution process.
         """
         logger.info("Disk partitioning for Windows...")
+        # An arbitrary script may change the partitions
+        self._cache.invalidate()
         try:
             partition_cmd = self._api.command_line.original(
                 self._api,
@@ -168,8 +409,17 @@ class WindowsVolume(PartitionDisk):
             logger.error("Error during deletion of diskpart script: %s", e)
             raise Exception("Error during deletion of diskpart script") from e
 
-    def create_partition(self) -> bool:
-        '''This is a docstring'''
+    def plan_script(self, quick_format: bool = True) -> List[str]:
+        """
+        Plans the diskpart script creating partition_num partitions.
+
+        Args:
+            quick_format (bool): False to only create and assign the
+            partitions, leaving the format to format_command.
+
+        Returns:
+            List[str]: The script lines.
+        """
         script_lines = [
             f"select disk {self.disk_num}",
             "clean",
@@ -184,10 +434,40 @@ class WindowsVolume(PartitionDisk):
         for _ in range(partition_num):
             script_lines.append(
                 f"create partition primary size={partition_size}")
-            script_lines.append(f"format fs={self.file_system} quick")
+            if quick_format:
+                script_lines.append(f"format fs={self.file_system} quick")
             script_lines.append("assign")
         logger.debug("script_lines = %s", script_lines)
+        return script_lines
+
+    def create_partition(self, parallel_format: Optional[bool] = None
+                         ) -> bool:
+        """
+        Creates the partitions with one diskpart script.
+
+        The script is uploaded once, and diskpart and the layout query run
+        in one execution, so disk_info is refreshed from the same output.
+        In parallel mode diskpart only writes the partition table, and the
+        volumes are then quick-formatted concurrently, each one timed into
+        format_times.
+
+        Args:
+            parallel_format (bool): Whether to format in parallel,
+            PARALLEL_FORMAT by default.
 
+        Returns:
+            bool: True if the partitions are created.
+
+        Raises:
+            Exception: If an error occurs while creating the partitions.
+        """
+        if parallel_format is None:
+            parallel_format = self.PARALLEL_FORMAT
+        script_lines = self.plan_script(quick_format=not parallel_format)
+        commands = [f"diskpart /s {self._api.script_name}"]
+        if parallel_format:
+            commands.append(self.format_command())
+        commands.append(self.layout_command())
         try:
             with open(self.script_name, "w") as file:
                 file.write("\n".join(script_lines))
@@ -196,11 +476,18 @@ class WindowsVolume(PartitionDisk):
             self._api.ftp_command(self.script_name)
 
             partition_cmd = self._api.command_line.original(
-                self._api,
-                f"diskpart /s {self._api.script_name}"
-            )
-            result_string = ' '.join(partition_cmd)
-            logger.debug('result_string = %s', result_string)
+                self._api, " & ".join(commands))
+            self.format_times = self.parse_format_times(partition_cmd)
+            for letter, seconds in sorted(self.format_times.items()):
+                logger.info('%s: formatted in %.2f s', letter, seconds)
+            layout = self.parse_layout(partition_cmd)
+            if layout is None:
+                logger.warning("No layout after diskpart, querying again")
+                layout = self.query_layout()
+            self._layout = layout
+            self.disk_info = self.volume_map(layout)
+            logger.debug('disk_info = %s', self.disk_info)
+            self.store_cache()
             return True
 
         except Exception as e:
@@ -211,176 +498,379 @@ class WindowsVolume(PartitionDisk):
         """
         Retrieves disk information (number and serial number).
 
-        Uses powershell and findstr to retrieve disk information, with target
-        depending on vendor, and parses the output to get the disk number and
-        serial number.
-
         Returns:
-            dict[str, str | int | None]: A dictionary containing the disk
-            number (as an integer) and serial number (as a string), or None
-            for both if an error occurred.
+            dict[str, str | int]: The disk number and serial number of the
+            target disk, taken from the layout query.
 
         Raises:
-            subprocess.CalledProcessError: If there is a problem executing the
-                subprocess command
-            ValueError: If the powershell output is not found or can't be
-                converted to an integer
-            IndexError: If parsing fails
+            ValueError: If the layout query returns no disk.
         """
-        cmd_return = disk_num = None
+        layout = self.query_layout()
+        disk_num = int(layout['Number'])
+        serial_num = str(layout.get('SerialNumber') or '').strip()
+        logger.debug('disk_num = %d', disk_num)
+        logger.debug('serial_num = %s', serial_num)
+        return {"Number": disk_num, "SerialNumber": serial_num}
 
-        if self.disk_vid == '0x1b4b':
-            disk_manufacturer = 'Marvell'
-        else:
-            disk_manufacturer = 'CT500P5SSD8'
+    def _query_serial(self, disk_num) -> str:
+        layout = self.parse_layout(self._api.command_line(
+            self._encode(self.SERIAL_QUERY.format(disk_num=disk_num))))
+        return str((layout or {}).get('SerialNumber') or '').strip()
 
-        try:
-            cmd_return = self._api.command_line(
-                f'powershell Get-PhysicalDisk|findstr {disk_manufacturer}')
-            logger.debug('str_return = %s', cmd_return)
+    def _get_volume(self):
+        """
+        Gets the drive letter and size of every partition of the disk, and
+        creates the partitions if there is none.
 
-            # Check if str_return is None
-            if cmd_return is None:
-                raise ValueError("Received None from command_line")
+        Returns:
+            List[Tuple[str, str]]: Drive letters and sizes, e.g.
+            ('D', '64 GB').
+        """
+        try:
+            list_disk_info = self.volume_map(self._layout)
+            if not list_disk_info:
+                logger.warning("No partitions found. Attempting to create "
+                               "partitions...")
+                self.create_partition()
+                list_disk_info = self.disk_info
 
-            disk_num = int(cmd_return.get(0).split(' ')[0].lstrip())
-            serial_num = cmd_return.get(0).split(' ')[2].lstrip()
-            logger.debug('disk_num = %d', disk_num)
-            logger.debug('serial_num = %s', serial_num)
+            logger.debug("list_disk_info = %s", list_disk_info)
+            logger.debug("Total number of disks: %s", len(list_disk_info))
 
         except Exception as e:
-            logger.error('Error occurred in get_disk_num: %s', e)
+            logger.error('Error occurred in _get_volume: %s', e)
+            logger.error("Traceback:\n%s", traceback.format_exc())
             raise
-        return {"Number": disk_num, "SerialNumber": serial_num}
 
-    def _get_volume(self):
-        ''' Get Volume
-            Args: None
-            Returns: Volume, Size
-            Raises: Any errors
-        '''
-        try:
-            # self.disk_num stands for the logical device of target controller
-            dict_return = self._api.command_line(
-                f"powershell Get-Partition -DiskNumber {self.disk_num}")
+        return list_disk_info
 
-            # Get DriveLetter and Size
-            pattern = re.compile(r'\d+\s+([A-Z]?)\s+\d+\s+([\d.]+\s+\w+)')
 
-            list_disk_info = []
-            logger.debug("dict_return = %s", dict_return)
+class LinuxVolume(PartitionDisk):
+    """
+    Disk partitioning implementation for Linux systems.
 
-            if dict_return == {}:
-                logger.warning("No partitions found. Attempting to create "
-                               "partitions...")
-                self.create_partition()
+    The namespace of the target controller is found through sysfs. One
+    script writes all partitions with sfdisk, formats them in parallel and
+    mounts them under MOUNT_ROOT, so disk_info lists the mount points in
+    the same (path, size) shape as WindowsVolume and LinuxStress can use
+    them as I/O paths directly. Existing partitions, e.g. unmounted by a
+    reboot, are mounted again instead; the disk is only partitioned when
+    sysfs shows no partition on it. Commands needing root run with sudo
+    like LinuxReboot.
+    """
+    SCRIPT_NAME = 'partition_script.sh'
+    MOUNT_ROOT = '/mnt'
+    FILE_SYSTEMS = {'ext4': '-F', 'xfs': '-f'}
+    LAYOUT_COMMAND = (
+        "grep -H . /sys/block/nvme*/device/device/vendor "
+        "/sys/block/nvme*/device/serial /sys/block/nvme*/size "
+        "/sys/block/nvme*/nvme*p*/size 2>/dev/null; "
+        "grep '^/dev/nvme' /proc/mounts"
+    )
+    SYSFS_PATTERN = re.compile(
+        r'^/sys/block/(?P<disk>nvme\w+)/(?:(?P<part>nvme\w+)/)?'
+        r'(?P<field>size|device/serial|device/device/vendor):(?P<value>.*)$')
+
+    def __init__(self, platform: BaseOS, disk_format: str = 'gpt',
+                 file_system: str = 'ext4'):
+        """
+        Initialize the LinuxVolume instance.
 
-            if isinstance(dict_return, dict):
-                output_string = "\n".join(dict_return.values())
-            else:
-                output_string = dict_return
+        Args:
+            platform (AMD64Linux): The platform whose API reaches the SUT.
+            disk_format (str): The partition table, 'gpt' or 'dos'.
+            file_system (str): One of FILE_SYSTEMS, anything else (e.g. the
+            'ntfs' of the Windows fixtures) falls back to ext4.
+        """
+        if file_system not in self.FILE_SYSTEMS:
+            logger.warning("Unsupported file system %s, using ext4",
+                           file_system)
+            file_system = 'ext4'
+        super().__init__(platform, disk_format, file_system)
 
-            for match in pattern.findall(output_string):
-                drive_letter = match[0] if match[0] else "No Drive Letter"
-                size = match[1]
-                list_disk_info.append((drive_letter, size))
+    def parse_layout(self, output) -> Optional[Dict]:
+        """
+        Parses the sysfs and /proc/mounts lines of LAYOUT_COMMAND.
 
-            logger.debug("list_disk_info = %s", list_disk_info)
+        Args:
+            output (list): The command output lines.
 
-            total_disks = len(list_disk_info)
-            logger.debug("Total number of disks: %s", total_disks)
+        Returns:
+            dict or None: Number (the namespace name), SerialNumber, Size in
+            bytes and Partitions with their Name, Size and MountPoint, for
+            the first namespace of the controller vendor, None if there is
+            none.
+        """
+        disks: Dict[str, Dict] = {}
+        mounts = {}
+        for line in output or []:
+            line = str(line).strip()
+            if line.startswith('/dev/'):
+                fields = line.split()
+                if len(fields) > 1:
+                    mounts[fields[0][len('/dev/'):]] = fields[1]
+                continue
+            match = self.SYSFS_PATTERN.match(line)
+            if not match:
+                continue
+            disk = disks.setdefault(match.group('disk'),
+                                    {'Partitions': {}})
+            value = match.group('value').strip()
+            if match.group('part'):
+                disk['Partitions'][match.group('part')] = int(value) * 512
+            elif match.group('field') == 'size':
+                disk['Size'] = int(value) * 512
+            elif match.group('field') == 'device/serial':
+                disk['SerialNumber'] = value
+            else:
+                disk['Vendor'] = value
+
+        for name in sorted(disks):
+            disk = disks[name]
+            if disk.get('Vendor', '').lower() != str(self.disk_vid).lower():
+                continue
+            partitions = [
+                {'Name': part, 'Size': size, 'MountPoint': mounts.get(part)}
+                for part, size in sorted(
+                    disk['Partitions'].items(),
+                    key=lambda item: int(re.search(r'\d+$',
+                                                   item[0]).group()))
+            ]
+            return {'Number': name,
+                    'SerialNumber': disk.get('SerialNumber', ''),
+                    'Size': disk.get('Size', 0), 'Partitions': partitions}
+        return None
+
+    def query_layout(self) -> Dict:
+        """
+        Gathers the layout of the target namespace in one command.
+
+        Returns:
+            dict: See parse_layout.
 
+        Raises:
+            ValueError: If no namespace of the controller is found.
+        """
+        try:
+            layout = self.parse_layout(self._api.command_line.original(
+                self._api, self.LAYOUT_COMMAND))
+            if layout is None:
+                raise ValueError(
+                    f"No NVMe namespace of vendor {self.disk_vid} found")
         except Exception as e:
-            logger.error('Error occurred in _get_volume: %s', e)
-            logger.error("Traceback:\n%s", traceback.format_exc())
+            logger.error('Error occurred in query_layout: %s', e)
             raise
+        logger.debug('layout = %s', layout)
+        self._layout = layout
+        return layout
 
-        return list_disk_info
+    def volume_map(self, layout: Dict) -> List[Tuple[str, str]]:
+        '''Mount point and size of every mounted partition of a layout'''
+        return [(partition['MountPoint'],
+                 self._format_size(partition['Size']))
+                for partition in layout.get('Partitions', [])
+                if partition.get('MountPoint')]
 
     @property
-    def partition_size(self):
-        '''Returns the partition size as the next power of 2 based on memory
-        size.
-        '''
-        if self._partition_size is None:
-            self._partition_size = self._next_power_of_2(self.memory_size * 2)
-        return self._partition_size
+    def device(self) -> str:
+        return f'/dev/{self.disk_num}'
+
+    def mount_script(self, layout: Dict) -> List[str]:
+        '''Lines mounting the unmounted partitions of a layout'''
+        lines = []
+        for partition in layout.get('Partitions', []):
+            if partition.get('MountPoint'):
+                continue
+            mount_point = f"{self.MOUNT_ROOT}/{partition['Name']}"
+            lines.append(f"mkdir -p {mount_point} && "
+                         f"mount /dev/{partition['Name']} {mount_point}")
+        return lines
+
+    def mount_partitions(self, layout: Dict) -> Dict:
+        """
+        Mounts the existing partitions that are not mounted, keeping their
+        data.
 
-    def _next_power_of_2(self, x):
-        '''Returns the next power of 2 greater than or equal to x.'''
-        return 1 if x == 0 else 2**math.ceil(math.log2(x))
+        Args:
+            layout (dict): See parse_layout.
 
-    @property
-    def disk_capacity(self):
-        ''' Get Volume
-        Args: None
-        Returns: Volume, Size
-        Raises: Any errors
-        '''
+        Returns:
+            dict: The layout after mounting, a partition without a file
+            system stays unmounted.
+
+        Raises:
+            Exception: If the command fails.
+        """
+        lines = self.mount_script(layout)
+        if not lines:
+            return layout
+        logger.info("Mounting %d existing partitions", len(lines))
         try:
-            str_return = self._api.command_line(
-                "wmic diskdrive get size,caption")
+            output = self._api.command_line.original(
+                self._api,
+                f"sudo sh -c '{'; '.join(lines)}'; {self.LAYOUT_COMMAND}")
+            layout = self.parse_layout(output) or self.query_layout()
+        except Exception as e:
+            logger.error("Error during mounting of partitions: %s", e)
+            raise
+        self._layout = layout
+        return layout
 
-            pattern = r"Marvell_NVMe_Controller\s+(\d+)"
+    def plan_script(self) -> List[str]:
+        """
+        Plans the script partitioning, formatting and mounting the disk.
 
-            if str_return:
-                if isinstance(str_return, dict):
-                    output_string = "\n".join(str_return.values())
-                else:
-                    output_string = str_return
+        Returns:
+            List[str]: The shell script lines.
+        """
+        partitions = f'{self.device}p*'
+        script_lines = [
+            f'umount {partitions} 2>/dev/null',
+            f'sfdisk --wipe always --wipe-partitions always {self.device} '
+            "<<'EOF'",
+            f'label: {self.disk_format}',
+        ]
+        for _ in range(self.partition_num):
+            script_lines.append(f'size={self.partition_size}GiB, type=linux')
+        script_lines += [
+            'EOF',
+            'udevadm settle',
+            f'for part in {partitions}; do',
+            f'    mkfs -t {self.file_system} '
+            f'{self.FILE_SYSTEMS[self.file_system]} -q "$part" &',
+            'done',
+            'wait',
+            f'for part in {partitions}; do',
+            f'    mkdir -p {self.MOUNT_ROOT}/${{part##*/}} && '
+            f'mount "$part" {self.MOUNT_ROOT}/${{part##*/}}',
+            'done',
+        ]
+        logger.debug("script_lines = %s", script_lines)
+        return script_lines
 
-            match = re.search(pattern, output_string)
+    def write_script(self, script: str) -> bool:
+        """
+        Writes a partitioning script and uploads it to the SUT.
 
-            if match:
-                disk_capacity = match.group(1)
-                logger.debug("disk_capacity = %s", disk_capacity)
-            else:
-                raise ValueError(
-                    "Unexpected None value returned from command line")
+        Args:
+            script (str): The content of the script.
+
+        Returns:
+            bool: True if the script is written and uploaded.
+
+        Raises:
+            Exception: If there is an error during the write or upload.
+        """
+        try:
+            with open(self.SCRIPT_NAME, "w", newline='\n') as file:
+                file.write(script)
+            self._api.ftp_command(self.SCRIPT_NAME, self.SCRIPT_NAME)
+            return True
 
         except Exception as e:
-            logger.error('Error occurred in disk_capacity: %s', e)
+            logger.error("Error during Linux disk partitioning: %s", e)
             raise
 
-        return int(disk_capacity) / (2**30)
+    def execute(self, pattern: str) -> str:
+        """
+        Runs the uploaded script.
 
+        Args:
+            pattern (str): A regular expression with one group matched
+            against the output.
 
-class LinuxVolume(PartitionDisk):
-    """
-    Disk partitioning implementation for Linux systems.
+        Returns:
+            str: The first group of the match.
 
-    Provides methods to execute disk partitioning operations on Linux.
-    """
-    def __init__(self, platform: BaseOS):
+        Raises:
+            ValueError: If no match is found in the command output.
         """
-        Initialize the LinuxVolume instance.
+        logger.info("Disk partitioning for Linux...")
+        self._cache.invalidate()
+        try:
+            output = ' '.join(self._api.command_line.original(
+                self._api, f'sudo sh {self.SCRIPT_NAME}'))
+            logger.debug('output = %s', output)
+            match = re.search(pattern, output)
+            if not match:
+                raise ValueError("No matching disk found.")
+            return match.group(1)
 
-        Args:
-            platform (AMD64NVMe): An instance of the AMD64NVMe class
-                representing the platform's API for interaction.
-        """
-        self._api = platform.api
+        except Exception as e:
+            logger.error("Error during script execution: %s", e)
+            raise
 
-    def execute(self) -> bool:
+    def create_partition(self) -> bool:
         """
-        Execute disk partitioning commands on a Linux system.
+        Partitions, formats and mounts the disk with one script, and
+        refreshes disk_info from the layout printed by the same execution.
 
         Returns:
-            bool: True if the partitioning operation is successful, False
-            otherwise.
+            bool: True if the partitions are created.
 
         Raises:
-            Exception: If an error occurs during the execution process.
+            Exception: If an error occurs while creating the partitions.
         """
-        logger.info("Disk partitioning for Linux...")
         try:
-            self._api.command_line(self._api, 'ls')
-            logger.info("Disk partitioning successfully for Linux.")
+            self.write_script("\n".join(self.plan_script()) + "\n")
+            output = self._api.command_line.original(
+                self._api,
+                f'sudo sh {self.SCRIPT_NAME}; {self.LAYOUT_COMMAND}')
+            layout = self.parse_layout(output) or self.query_layout()
+            self._layout = layout
+            self.disk_info = self.volume_map(layout)
+            if len(self.disk_info) < self.partition_num:
+                logger.warning("Only %d of %d partitions are mounted",
+                               len(self.disk_info), self.partition_num)
+            logger.debug('disk_info = %s', self.disk_info)
+            self.store_cache()
             return True
 
         except Exception as e:
-            logger.error("Error during Linux partitioning: %s", e)
-            return False
+            logger.error("Error during creation of partitions: %s", e)
+            raise Exception("Error during creation of partitions") from e
+
+    def _get_disk_num(self):
+        """
+        Retrieves the namespace name and serial number of the target disk.
+
+        Returns:
+            dict[str, str]: Number (e.g. 'nvme0n1') and SerialNumber.
+        """
+        layout = self.query_layout()
+        return {"Number": layout['Number'],
+                "SerialNumber": layout['SerialNumber']}
+
+    def _query_serial(self, disk_num) -> str:
+        output = self._api.command_line.original(
+            self._api, f'cat /sys/block/{disk_num}/device/serial')
+        return ''.join(str(line) for line in output or []).strip()
+
+    def _get_volume(self):
+        """
+        Gets the mount point and size of every partition of the disk. The
+        unmounted partitions are mounted again, and the partitions are only
+        created if the disk has none, so existing data is never wiped.
+
+        Returns:
+            List[Tuple[str, str]]: Mount points and sizes, e.g.
+            ('/mnt/nvme0n1p1', '64 GB').
+        """
+        if not self._layout.get('Partitions'):
+            logger.warning("No partitions found. Attempting to create "
+                           "partitions...")
+            self.create_partition()
+            return self.disk_info
+
+        list_disk_info = self.volume_map(
+            self.mount_partitions(self._layout))
+        if len(list_disk_info) < len(self._layout['Partitions']):
+            logger.warning("Only %d of %d existing partitions are mounted, "
+                           "the others are left untouched",
+                           len(list_disk_info),
+                           len(self._layout['Partitions']))
+        logger.debug("list_disk_info = %s", list_disk_info)
+        return list_disk_info
 
 
 class BasePartitionFactory(ABC):
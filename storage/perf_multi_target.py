@@ -0,0 +1,237 @@
+# Contents of storage/perf_multi_target.py
+'''Copyright (c) 2024 Jaron Cheng'''
+import logging
+import re
+from abc import ABC
+from abc import abstractmethod
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+from unit.log_handler import get_logger
+
+logger = get_logger(__name__, logging.INFO)
+
+
+class BaseMultiTarget(ABC):
+    """
+    Multi-target engine of BasePerf, driving several volumes or disks at
+    once with the threads of every target on their own logical processors.
+    """
+    @abstractmethod
+    def run_multi_target(self,
+                         targets: List[str],
+                         iodepth: int,
+                         block_size: str,
+                         random_size: Optional[str],
+                         write_pattern: str,
+                         duration: int) -> Dict:
+        pass
+
+    def plan_affinity(self, target_count: int) -> List[List[int]]:
+        """Plans one block of logical processors per target.
+
+        Logical processors are split into equally sized contiguous blocks so
+        that the threads of one target never compete with the threads of
+        another one, unless an applied AffinityPlan covers the targets. With
+        more targets than processors, every target gets a single processor in
+        round-robin order.
+
+        Args:
+            target_count (int): Number of targets driven concurrently.
+
+        Returns:
+            List[List[int]]: Logical processor IDs per target.
+        """
+        # A plan from apply_affinity wins if it has as many targets
+        if self._affinity and len(self._affinity) == target_count:
+            return self._affinity
+
+        logic_processors = self._thread or self._cpu_num or 1
+        per_target = max(1, logic_processors // target_count)
+        plan = [[(index * per_target + offset) % logic_processors
+                 for offset in range(per_target)]
+                for index in range(target_count)]
+        logger.debug('affinity plan = %s', plan)
+        return plan
+
+
+class WindowsMultiTarget(BaseMultiTarget):
+    '''All targets are driven by one DISKSPD invocation'''
+    def run_multi_target(self,
+                         targets: List[str],
+                         iodepth: int,
+                         block_size: str,
+                         random_size: Optional[str],
+                         write_pattern: str,
+                         duration: int) -> Dict:
+        """Runs DISKSPD against several volumes or raw disks concurrently.
+
+        All targets are driven by one DISKSPD invocation. Threads of each
+        target are pinned to their own block of logical processors planned by
+        plan_affinity.
+
+        Args:
+            targets (List[str]): IO files (e.g. 'E:\\IO.dat') or raw disks
+            (e.g. '#1').
+            iodepth (int): Outstanding I/O per thread.
+            block_size (str): Block size, e.g. '4k'.
+            random_size (str, optional): Random alignment, None for
+            sequential I/O.
+            write_pattern (str): Write percentage.
+            duration (int): Test duration in seconds.
+
+        Returns:
+            dict: 'targets' maps each target to (read bw, read iops, write
+            bw, write iops), 'aggregate' holds the same tuple summed over all
+            targets, plus 'cpu_usage' and the 'affinity' plan.
+
+        Raises:
+            RuntimeError: If no output is returned from the I/O command.
+        """
+        plan = self.plan_affinity(len(targets))
+        affinity = ','.join(str(cpu) for block in plan for cpu in block)
+        random_option = f' -r{random_size}' if random_size else ''
+        # Raw disks (#N) are used as is, files are created on demand unless
+        # the target file manager prepared them
+        prepared = (self._target_files is not None and
+                    self._target_files.prepare(targets, self._file_size,
+                                               random_size, write_pattern))
+        file_option = (f' -c{self._file_size}G'
+                       if not prepared and
+                       any(not t.startswith('#') for t in targets) else '')
+        str_command = (f'diskspd -t{len(plan[0])} -a{affinity}'
+                       f' -o{iodepth} -b{block_size}{random_option}'
+                       f' -Sh -D -L -w{write_pattern} -d{duration}'
+                       f'{file_option} {" ".join(targets)}')
+        logger.info('multi target command = %s', str_command)
+
+        try:
+            str_output = self._api.io_command(str_command)
+            if not str_output:
+                raise RuntimeError("No output returned from io_command.")
+        except Exception as e:
+            logger.error("Error occurred in run_multi_target: %s", e)
+            raise
+
+        read_bw, read_iops, write_bw, write_iops, cpu_usage = \
+            self.parse_output(str_output)
+        read_section = re.search(r'Read IO(.*?)Write IO', str_output, re.S)
+        write_section = re.search(r'Write IO(.*?)(\n\n|\Z)', str_output,
+                                  re.S)
+        read_rows = self._parse_target_rows(
+            read_section.group(1) if read_section else '')
+        write_rows = self._parse_target_rows(
+            write_section.group(1) if write_section else '')
+
+        per_target = {}
+        for target in targets:
+            target_read = read_rows.get(target, (0.0, 0.0))
+            target_write = write_rows.get(target, (0.0, 0.0))
+            per_target[target] = target_read + target_write
+            logger.info('%s = %s', target, per_target[target])
+
+        return {
+            'targets': per_target,
+            'aggregate': (read_bw, read_iops, write_bw, write_iops),
+            'cpu_usage': cpu_usage,
+            'affinity': dict(zip(targets, plan))
+        }
+
+    @staticmethod
+    def volume_targets(disk_info: List[Tuple[str, str]]) -> List[str]:
+        """Maps WindowsVolume.disk_info to one IO file per volume.
+
+        Args:
+            disk_info (List[Tuple[str, str]]): Drive letters and sizes.
+
+        Returns:
+            List[str]: IO file paths, volumes without a drive letter are
+            skipped.
+        """
+        return [f'{drive_letter}:\\IO.dat' for drive_letter, _ in disk_info
+                if len(drive_letter) == 1]
+
+    @staticmethod
+    def _parse_target_rows(section: str) -> Dict[str, Tuple[float, float]]:
+        '''Sums MiB/s and I/O per s of the thread rows per target file'''
+        row_pattern = re.compile(
+            r'^\s*\d+\s*\|\s*\d+\s*\|\s*\d+\s*\|\s*([\d.]+)\s*\|'
+            r'\s*([\d.]+)\s*\|.*\|\s*(\S+?)(?:\s+\(.*\))?\s*$',
+            re.M)
+        rows = {}
+        for match in row_pattern.finditer(section):
+            bw, iops = rows.get(match.group(3), (0.0, 0.0))
+            rows[match.group(3)] = (bw + float(match.group(1)),
+                                    iops + float(match.group(2)))
+        return rows
+
+
+class LinuxMultiTarget(BaseMultiTarget):
+    '''Every target is a reporting group of one fio invocation'''
+    def run_multi_target(self,
+                         targets: List[str],
+                         iodepth: int,
+                         block_size: str,
+                         random_size: Optional[str],
+                         write_pattern: str,
+                         duration: int) -> Dict:
+        """Runs fio against several files or block devices concurrently.
+
+        Every target is a reporting group of its own, its jobs pinned to the
+        block of logical processors planned by plan_affinity.
+
+        Args:
+            targets (List[str]): IO files or block devices.
+            iodepth (int): Outstanding I/O per thread.
+            block_size (str): Block size, e.g. '4k'.
+            random_size (str, optional): Random alignment, None for
+            sequential I/O.
+            write_pattern (str): Write percentage.
+            duration (int): Test duration in seconds.
+
+        Returns:
+            dict: Same as WindowsMultiTarget.run_multi_target.
+
+        Raises:
+            RuntimeError: If no output is returned from the I/O command.
+        """
+        plan = self.plan_affinity(len(targets))
+        if self._target_files is not None:
+            self._target_files.prepare(targets, self._file_size, random_size,
+                                       write_pattern)
+        options = ['fio --output-format=json', f'--ioengine={self.IO_ENGINE}',
+                   '--direct=1', f'--numjobs={len(plan[0])}',
+                   '--group_reporting']
+        options += self._workload_options(iodepth, block_size, random_size,
+                                          write_pattern, duration)
+        for target, block in zip(targets, plan):
+            options += [f'--name={target}', '--new_group']
+            options += self._file_options(target)
+            options.append('--cpus_allowed=' + ','.join(
+                str(cpu) for cpu in block))
+        str_command = ' '.join(options)
+        logger.info('multi target command = %s', str_command)
+
+        try:
+            str_output = self._api.io_command(str_command)
+            if not str_output:
+                raise RuntimeError("No output returned from io_command.")
+            report = self.load_report(str_output)
+        except Exception as e:
+            logger.error("Error occurred in run_multi_target: %s", e)
+            raise
+
+        read_bw, read_iops, write_bw, write_iops, cpu_usage = \
+            self.parse_report(report)
+        per_target = {target: (0.0,) * 4 for target in targets}
+        for job in report['jobs']:
+            per_target[job['jobname']] = self.job_result(job)
+            logger.info('%s = %s', job['jobname'],
+                        per_target[job['jobname']])
+        return {
+            'targets': per_target,
+            'aggregate': (read_bw, read_iops, write_bw, write_iops),
+            'cpu_usage': cpu_usage,
+            'affinity': dict(zip(targets, plan))
+        }
@@ -0,0 +1,358 @@
+# Contents of storage/perf_online.py
+'''Copyright (c) 2024 Jaron Cheng'''
+import json
+import logging
+import math
+from abc import ABC
+from abc import abstractmethod
+from dataclasses import dataclass
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import Optional
+from typing import Tuple
+from unit.log_handler import get_logger
+
+logger = get_logger(__name__, logging.INFO)
+
+
+@dataclass
+class OnlineResult:
+    """Outcome of a perf run validated while it is running.
+
+    Attributes:
+        verdict: 'pass' or 'fail' if the run was aborted early, 'complete'
+            if it ran for the whole duration undecided.
+        intervals: Number of interval samples taken into account.
+        read_bw: Mean read bandwidth in MBps.
+        read_iops: Mean read IOPS.
+        write_bw: Mean write bandwidth in MBps.
+        write_iops: Mean write IOPS.
+    """
+    verdict: str
+    intervals: int
+    read_bw: float = 0.0
+    read_iops: float = 0.0
+    write_bw: float = 0.0
+    write_iops: float = 0.0
+
+
+class BaseOnline(ABC):
+    """
+    Online engine of BasePerf, judging a run from its interval samples while
+    it is running and stopping it once the verdict is certain.
+    """
+    # Two-sided 95% confidence of the running mean
+    Z_SCORE = 1.96
+    MIN_INTERVALS = 10
+
+    @abstractmethod
+    def run_io_online(self,
+                      iodepth: int,
+                      block_size: str,
+                      random_size: Optional[str],
+                      write_pattern: str,
+                      duration: int,
+                      criteria: dict) -> OnlineResult:
+        pass
+
+    @abstractmethod
+    def metric_limits(self, criteria: dict,
+                      metric: str) -> Tuple[float, float]:
+        pass
+
+    def online_bands(self, criteria: dict,
+                     write_pattern: int) -> Dict[str, Tuple[float, float]]:
+        """Selects the acceptance bands checked while a run is in progress.
+
+        Args:
+            criteria (dict): Performance criteria, see validate_metrics.
+            write_pattern (int): Write percentage of the run.
+
+        Returns:
+            dict: The (lower, upper) band of every metric of the run.
+        """
+        metrics = []
+        if int(write_pattern) < 100:
+            metrics += ['read_iops', 'read_bw']
+        if int(write_pattern) > 0:
+            metrics += ['write_iops', 'write_bw']
+        return {metric: self.metric_limits(criteria, metric)
+                for metric in metrics}
+
+    def watch_intervals(self, intervals: Iterable[Dict[str, float]],
+                        bands: Dict[str, Tuple[float, float]]
+                        ) -> OnlineResult:
+        """Judges a run from its interval samples as they arrive.
+
+        The running mean and its confidence interval are kept per metric
+        with Welford's algorithm. Once MIN_INTERVALS samples are in, the run
+        fails as soon as the interval of any metric lies wholly outside its
+        band, and passes as soon as the intervals of all metrics lie wholly
+        inside their bands.
+
+        Args:
+            intervals (Iterable[dict]): Per-interval metrics, e.g. one
+            {'read_iops': ..., 'read_bw': ...} per second.
+            bands (dict): The (lower, upper) band of every checked metric.
+
+        Returns:
+            OnlineResult: The verdict and the means of the samples seen.
+        """
+        count = 0
+        means = dict.fromkeys(('read_bw', 'read_iops', 'write_bw',
+                               'write_iops'), 0.0)
+        m2 = dict.fromkeys(means, 0.0)
+
+        def result(verdict):
+            return OnlineResult(verdict, count, **means)
+
+        for sample in intervals:
+            count += 1
+            for metric in means:
+                delta = sample.get(metric, 0.0) - means[metric]
+                means[metric] += delta / count
+                m2[metric] += delta * (sample.get(metric, 0.0) -
+                                       means[metric])
+            if count < self.MIN_INTERVALS:
+                continue
+
+            inside = True
+            for metric, (lower, upper) in bands.items():
+                half = self.Z_SCORE * math.sqrt(m2[metric] / (count - 1) /
+                                                count)
+                if means[metric] + half < lower or \
+                        means[metric] - half > upper:
+                    logger.info("%s = %.2f ± %.2f is out of band after %d "
+                                "intervals", metric, means[metric], half,
+                                count)
+                    return result('fail')
+                if means[metric] - half <= lower or \
+                        means[metric] + half >= upper:
+                    inside = False
+            if inside and bands:
+                logger.info("All metrics are in band after %d intervals",
+                            count)
+                return result('pass')
+        return result('complete')
+
+
+class WindowsOnline(BaseOnline):
+    '''DISKSPD watched through the typeperf counters of its volume'''
+    ONLINE_OUTPUT = "diskspd_online.txt"
+    PID_MARKER = 'DISKSPD_PID='
+    # DISKSPD warms up for 5 seconds before it measures
+    WARMUP_INTERVALS = 5
+    COUNTERS = ('Disk Reads/sec', 'Disk Read Bytes/sec',
+                'Disk Writes/sec', 'Disk Write Bytes/sec')
+
+    def run_io_online(self,
+                      iodepth: int,
+                      block_size: str,
+                      random_size: Optional[str],
+                      write_pattern: str,
+                      duration: int,
+                      criteria: dict) -> OnlineResult:
+        """Runs DISKSPD and validates it while it is running.
+
+        DISKSPD is started in the background by Start-Process, which prints
+        its PID, while typeperf streams the per-second LogicalDisk counters
+        of the target volume. Only that PID is terminated as soon as
+        watch_intervals reaches a verdict, so DISKSPD runs of other tests
+        are left alone; otherwise the final DISKSPD report is used for the
+        result.
+
+        Args:
+            iodepth (int): Outstanding I/O per thread.
+            block_size (str): Block size, e.g. '4k'.
+            random_size (str, optional): Random alignment, None for
+            sequential I/O.
+            write_pattern (str): Write percentage.
+            duration (int): Measuring time in seconds.
+            criteria (dict): Performance criteria, see validate_metrics.
+
+        Returns:
+            OnlineResult: The verdict and the measured means.
+        """
+        try:
+            self._target_prepared = self._prepare_files(
+                [self._io_file], random_size, write_pattern)
+            str_command = self._compose_command(iodepth, block_size,
+                                                random_size, write_pattern,
+                                                duration)
+            volume = (f'{self._io_file[0]}:' if self._io_file[1:2] == ':'
+                      else '_Total')
+            counters = ' '.join(f'"\\LogicalDisk({volume})\\{counter}"'
+                                for counter in self.COUNTERS)
+            samples = duration + self.WARMUP_INTERVALS
+            arguments = str_command.split(' ', 1)[1]
+            stream = self._api.io_stream(
+                'powershell -Command "$p = Start-Process diskspd '
+                f"-ArgumentList '{arguments}' "
+                f'-RedirectStandardOutput {self.ONLINE_OUTPUT} '
+                '-NoNewWindow -PassThru; '
+                f"Write-Output ('{self.PID_MARKER}' + $p.Id)\" & "
+                f'typeperf {counters} -si 1 -sc {samples}')
+
+            state = {}
+            intervals = (interval for index, interval in enumerate(
+                self._counters(stream, state))
+                if index >= self.WARMUP_INTERVALS)
+            try:
+                result = self.watch_intervals(
+                    intervals, self.online_bands(criteria, write_pattern))
+            finally:
+                stream.close()
+
+            pid = state.get('pid')
+            if result.verdict != 'complete':
+                if pid:
+                    self._api.io_command(f'taskkill /F /PID {pid}')
+                else:
+                    logger.warning('No DISKSPD PID to terminate')
+                return result
+
+            # The report is written once DISKSPD exits after its cooldown
+            wait = (f'Wait-Process -Id {pid} -ErrorAction SilentlyContinue; '
+                    if pid else '')
+            read_bw, read_iops, write_bw, write_iops, _ = self.parse_output(
+                self._api.io_command(
+                    f'powershell -Command "{wait}'
+                    f'Get-Content {self.ONLINE_OUTPUT}"'))
+            return OnlineResult('complete', result.intervals, read_bw,
+                                read_iops, write_bw, write_iops)
+
+        except Exception as e:
+            logger.error("Error occurred in run_io_online: %s", e)
+            raise
+
+    def _counters(self, stream: Iterable[str], state: dict
+                  ) -> Iterator[Dict[str, float]]:
+        '''Parse the typeperf samples, recording the DISKSPD PID'''
+        for line in stream:
+            line = line.strip()
+            if line.startswith(self.PID_MARKER):
+                state['pid'] = line[len(self.PID_MARKER):]
+                continue
+            interval = self.parse_counters(line)
+            if interval:
+                yield interval
+
+    @classmethod
+    def parse_counters(cls, line: str) -> Optional[Dict[str, float]]:
+        """Parses one typeperf CSV sample of the COUNTERS.
+
+        Args:
+            line (str): e.g. '"10/19/2024 10:00:01.123","1000","4096000",
+            "0","0"'.
+
+        Returns:
+            dict or None: IOPS and MBps of the sample, None for headers,
+            status lines and blank samples.
+        """
+        fields = line.strip().strip('"').split('","')
+        if len(fields) != len(cls.COUNTERS) + 1:
+            return None
+        try:
+            read_iops, read_bytes, write_iops, write_bytes = (
+                float(value) for value in fields[1:])
+        except ValueError:
+            return None
+        return {'read_iops': read_iops,
+                'read_bw': read_bytes / 1024 ** 2,
+                'write_iops': write_iops,
+                'write_bw': write_bytes / 1024 ** 2}
+
+
+class LinuxOnline(BaseOnline):
+    '''fio watched through its JSON status every second'''
+    PID_MARKER = 'FIO_PID='
+
+    def _reports(self, stream: Iterable[str], state: dict
+                 ) -> Iterator[dict]:
+        '''Parse the JSON documents fio prints every status interval'''
+        lines = []
+        for line in stream:
+            if line.startswith(self.PID_MARKER):
+                state['pid'] = line[len(self.PID_MARKER):].strip()
+            elif line == '{' or lines:
+                lines.append(line)
+                if line == '}':
+                    state['report'] = json.loads('\n'.join(lines))
+                    lines = []
+                    yield state['report']
+
+    def _intervals(self, reports: Iterable[dict]
+                   ) -> Iterator[Dict[str, float]]:
+        '''Turn the cumulative fio reports into per-interval rates'''
+        previous = None
+        for report in reports:
+            current = [0.0] * 5
+            for job in report['jobs']:
+                # The jobs of a report run side by side
+                current = [max(current[0], job['job_runtime'] / 1000),
+                           current[1] + job['read']['io_bytes'],
+                           current[2] + job['read']['total_ios'],
+                           current[3] + job['write']['io_bytes'],
+                           current[4] + job['write']['total_ios']]
+            if previous is not None and current[0] > previous[0]:
+                seconds = current[0] - previous[0]
+                read_bytes, read_ios, write_bytes, write_ios = (
+                    now - before for now, before
+                    in zip(current[1:], previous[1:]))
+                yield {'read_iops': read_ios / seconds,
+                       'read_bw': read_bytes / 1024 ** 2 / seconds,
+                       'write_iops': write_ios / seconds,
+                       'write_bw': write_bytes / 1024 ** 2 / seconds}
+            previous = current
+
+    def run_io_online(self,
+                      iodepth: int,
+                      block_size: str,
+                      random_size: Optional[str],
+                      write_pattern: str,
+                      duration: int,
+                      criteria: dict) -> OnlineResult:
+        """Runs fio and validates it while it is running.
+
+        fio reports its cumulative counters every second. The run is
+        terminated through its PID as soon as watch_intervals reaches a
+        verdict; otherwise the final fio report is used for the result.
+
+        Args:
+            Same as WindowsOnline.run_io_online.
+
+        Returns:
+            OnlineResult: The verdict and the measured means.
+        """
+        try:
+            self._target_prepared = self._prepare_files(
+                [self._io_file], random_size, write_pattern)
+            str_command = self._compose_command(iodepth, block_size,
+                                                random_size, write_pattern,
+                                                duration)
+            stream = self._api.io_stream(
+                f'{str_command} --status-interval=1 & '
+                f'echo "{self.PID_MARKER}$!"; wait')
+            state = {}
+            try:
+                result = self.watch_intervals(
+                    self._intervals(self._reports(stream, state)),
+                    self.online_bands(criteria, write_pattern))
+                if result.verdict != 'complete' and state.get('pid'):
+                    self._api.io_command(f'kill {state["pid"]}')
+            finally:
+                stream.close()
+
+            if result.verdict != 'complete':
+                return result
+            if 'report' not in state:
+                raise RuntimeError("No report returned from fio.")
+            read_bw, read_iops, write_bw, write_iops, _ = self.parse_report(
+                state['report'])
+            return OnlineResult('complete', result.intervals, read_bw,
+                                read_iops, write_bw, write_iops)
+
+        except Exception as e:
+            logger.error("Error occurred in run_io_online: %s", e)
+            raise
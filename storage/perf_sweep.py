@@ -0,0 +1,287 @@
+# Contents of storage/perf_sweep.py
+'''Copyright (c) 2024 Jaron Cheng'''
+import logging
+import re
+import xml.etree.ElementTree as ET
+from abc import ABC
+from abc import abstractmethod
+from dataclasses import dataclass
+from typing import Iterable
+from typing import Iterator
+from typing import Optional
+from typing import Tuple
+from unit.log_handler import get_logger
+
+logger = get_logger(__name__, logging.INFO)
+
+
+@dataclass
+class PerfStep:
+    """One point of a performance parameter matrix.
+
+    Attributes:
+        iodepth: Outstanding I/O per thread.
+        block_size: Block size, e.g. '4k'.
+        random_size: Random alignment, None for sequential I/O.
+        write_pattern: Write percentage, 0 - full read, 100 - full write.
+        duration: Measuring time of the step in seconds.
+    """
+    iodepth: int
+    block_size: str
+    random_size: Optional[str]
+    write_pattern: int
+    duration: int
+
+
+class BaseSweep(ABC):
+    """
+    Sweep engine of BasePerf, running a parameter matrix step by step or as
+    one engine job file against a target prepared once.
+    """
+    PRECONDITION_TIME = 60
+
+    @abstractmethod
+    def prepare_target(self, duration: int) -> bool:
+        pass
+
+    @abstractmethod
+    def run_job_file(self, steps: Iterable[PerfStep]) -> Iterator[Tuple]:
+        pass
+
+    def run_sweep(self, steps: Iterable[PerfStep],
+                  precondition: Optional[int] = None,
+                  job_file: bool = False) -> Iterator[Tuple]:
+        """Runs a whole parameter matrix against one prepared target.
+
+        The target file is created and preconditioned only once, then every
+        step reuses it instead of recreating a file of twice the RAM size per
+        case.
+
+        Args:
+            steps (Iterable[PerfStep]): Parameter matrix to be executed in
+            order.
+            precondition (int, optional): Sequential fill time in seconds,
+            PRECONDITION_TIME by default.
+            job_file (bool): Run all steps as a single multi-step engine job
+            in one remote invocation.
+
+        Yields:
+            tuple: (step, result) where result has the same shape as the
+            return value of run_io_operation.
+        """
+        if not self._target_prepared:
+            self.prepare_target(precondition or self.PRECONDITION_TIME)
+
+        if job_file:
+            yield from self.run_job_file(steps)
+        else:
+            for step in steps:
+                logger.info("Sweep step = %s", step)
+                yield step, self.run_io_operation(step.iodepth,
+                                                  step.block_size,
+                                                  step.random_size,
+                                                  step.write_pattern,
+                                                  step.duration)
+
+
+class WindowsSweep(BaseSweep):
+    '''DISKSPD sweep, a job file is an XML profile of timespans'''
+    JOB_FILE = "diskspd_profile.xml"
+
+    def prepare_target(self, duration: int) -> bool:
+        """Creates the IO file once and preconditions it with a sequential
+        fill so that following runs can reuse it.
+
+        Args:
+            duration (int): Sequential fill time in seconds.
+
+        Returns:
+            bool: True if the target is prepared.
+
+        Raises:
+            RuntimeError: If no output is returned from the I/O command.
+        """
+        logger.info("Preparing %s (%s GB) for %s s", self._io_file,
+                    self._file_size, duration)
+        str_command = (f'diskspd -t1 -o32 -b128k -w100 -Sh -d{duration} '
+                       f'-c{self._file_size}G {self._io_file}')
+        try:
+            if not self._api.io_command(str_command):
+                raise RuntimeError("No output returned from io_command.")
+        except Exception as e:
+            logger.error("Error occurred in prepare_target: %s", e)
+            raise
+        self._target_prepared = True
+        return True
+
+    def compose_job_file(self, steps: Iterable[PerfStep]) -> str:
+        """Composes a DISKSPD XML profile with one timespan per step.
+
+        Args:
+            steps (Iterable[PerfStep]): Parameter matrix in execution order.
+
+        Returns:
+            str: The XML profile.
+        """
+        profile = ET.Element('Profile')
+        ET.SubElement(profile, 'ResultFormat').text = 'text'
+        time_spans = ET.SubElement(profile, 'TimeSpans')
+        for step in steps:
+            time_span = ET.SubElement(time_spans, 'TimeSpan')
+            ET.SubElement(time_span, 'Duration').text = str(step.duration)
+            ET.SubElement(time_span, 'Warmup').text = '5'
+            ET.SubElement(time_span, 'Cooldown').text = '0'
+            ET.SubElement(time_span, 'MeasureLatency').text = 'true'
+            ET.SubElement(time_span, 'CalculateIopsStdDev').text = 'true'
+            target = ET.SubElement(ET.SubElement(time_span, 'Targets'),
+                                   'Target')
+            ET.SubElement(target, 'Path').text = self._io_file
+            ET.SubElement(target, 'BlockSize').text = str(
+                self._size_in_bytes(step.block_size))
+            if step.random_size:
+                ET.SubElement(target, 'Random').text = str(
+                    self._size_in_bytes(step.random_size))
+            else:
+                ET.SubElement(target, 'StrideSize').text = str(
+                    self._size_in_bytes(step.block_size))
+            ET.SubElement(target, 'DisableOSCache').text = 'true'
+            ET.SubElement(target, 'WriteThrough').text = 'true'
+            ET.SubElement(target, 'RequestCount').text = str(step.iodepth)
+            ET.SubElement(target, 'WriteRatio').text = str(
+                step.write_pattern)
+            ET.SubElement(target, 'ThreadsPerFile').text = str(self._thread)
+        return ET.tostring(profile, encoding='unicode')
+
+    def run_job_file(self, steps: Iterable[PerfStep]) -> Iterator[Tuple]:
+        """Runs the whole parameter matrix as one DISKSPD XML profile.
+
+        Args:
+            steps (Iterable[PerfStep]): Parameter matrix in execution order.
+
+        Yields:
+            tuple: (step, result) for every timespan of the profile.
+
+        Raises:
+            RuntimeError: If the number of reported timespans does not match
+            the number of steps.
+        """
+        steps = list(steps)
+        try:
+            with open(self.JOB_FILE, "w", encoding='utf-8') as file:
+                file.write(self.compose_job_file(steps))
+            self._api.ftp_command(self.JOB_FILE, self.JOB_FILE)
+
+            str_output = self._api.io_command(
+                f'diskspd -X{self._api.remote_dir}\\{self.JOB_FILE}')
+            if not str_output:
+                raise RuntimeError("No output returned from io_command.")
+        except Exception as e:
+            logger.error("Error occurred in run_job_file: %s", e)
+            raise
+
+        time_spans = re.split(r'Results for timespan \d+:',
+                              str_output)[1:]
+        if len(time_spans) != len(steps):
+            raise RuntimeError(f"Expected {len(steps)} timespans, got "
+                               f"{len(time_spans)}")
+        for step, time_span in zip(steps, time_spans):
+            yield step, self.parse_output(time_span)
+
+    @staticmethod
+    def _size_in_bytes(size: str) -> int:
+        '''Converts a DISKSPD size such as 4k or 1M into bytes'''
+        units = {'k': 2**10, 'm': 2**20, 'g': 2**30}
+        unit = size[-1].lower()
+        if unit in units:
+            return int(size[:-1]) * units[unit]
+        return int(size)
+
+
+class LinuxSweep(BaseSweep):
+    '''fio sweep, a job file holds one stonewalled job per step'''
+    JOB_FILE = "fio_profile.fio"
+
+    def prepare_target(self, duration: int) -> bool:
+        """Lays out the IO file once and preconditions it with a sequential
+        fill so that following runs can reuse it.
+
+        Args:
+            duration (int): Sequential fill time in seconds.
+
+        Returns:
+            bool: True if the target is prepared.
+
+        Raises:
+            RuntimeError: If no output is returned from the I/O command.
+        """
+        logger.info("Preparing %s (%s GB) for %s s", self._io_file,
+                    self._file_size, duration)
+        str_command = ' '.join(
+            [f'fio --name=prepare --ioengine={self.IO_ENGINE}',
+             '--direct=1 --rw=write --bs=128k --iodepth=32',
+             f'--runtime={duration}'] + self._file_options(self._io_file))
+        try:
+            if not self._api.io_command(str_command):
+                raise RuntimeError("No output returned from io_command.")
+        except Exception as e:
+            logger.error("Error occurred in prepare_target: %s", e)
+            raise
+        self._target_prepared = True
+        return True
+
+    def compose_job_file(self, steps: Iterable[PerfStep]) -> str:
+        """Composes a fio job file with one stonewalled job per step.
+
+        Args:
+            steps (Iterable[PerfStep]): Parameter matrix in execution order.
+
+        Returns:
+            str: The job file.
+        """
+        lines = ['[global]', f'ioengine={self.IO_ENGINE}', 'direct=1',
+                 'time_based', 'group_reporting', f'numjobs={self._thread}']
+        lines += [option[2:] for option in self._file_options(self._io_file)]
+        if self._affinity:
+            lines.append('cpus_allowed=' + ','.join(
+                str(cpu) for cpu in self._affinity[0]))
+        for index, step in enumerate(steps):
+            lines += ['', f'[step{index}]', 'stonewall']
+            lines += [option[2:] for option in self._workload_options(
+                step.iodepth, step.block_size, step.random_size,
+                step.write_pattern, step.duration)]
+        return '\n'.join(lines) + '\n'
+
+    def run_job_file(self, steps: Iterable[PerfStep]) -> Iterator[Tuple]:
+        """Runs the whole parameter matrix as one fio job file.
+
+        Args:
+            steps (Iterable[PerfStep]): Parameter matrix in execution order.
+
+        Yields:
+            tuple: (step, result) for every reporting group of the job file.
+
+        Raises:
+            RuntimeError: If the number of reported groups does not match
+            the number of steps.
+        """
+        steps = list(steps)
+        try:
+            with open(self.JOB_FILE, "w", encoding='utf-8') as file:
+                file.write(self.compose_job_file(steps))
+            self._api.ftp_command(self.JOB_FILE, self.JOB_FILE)
+
+            str_output = self._api.io_command(
+                'fio --output-format=json '
+                f'{self._api.remote_dir}/{self.JOB_FILE}')
+            if not str_output:
+                raise RuntimeError("No output returned from io_command.")
+        except Exception as e:
+            logger.error("Error occurred in run_job_file: %s", e)
+            raise
+
+        jobs = self.load_report(str_output)['jobs']
+        if len(jobs) != len(steps):
+            raise RuntimeError(f"Expected {len(steps)} groups, got "
+                               f"{len(jobs)}")
+        for step, job in zip(steps, jobs):
+            yield step, self.parse_report({'jobs': [job]})
@@ -1,22 +1,49 @@
 # Contents of storage/perforamnce.py
 '''Copyright (c) 2024 Jaron Cheng'''
+import json
 import re
 import logging
 from abc import ABC
 from abc import abstractmethod
+from typing import Dict
+from typing import List
 from typing import Optional
 from typing import Tuple
 from interface.application import BaseInterface
+from storage.perf_multi_target import BaseMultiTarget
+from storage.perf_multi_target import LinuxMultiTarget
+from storage.perf_multi_target import WindowsMultiTarget
+from storage.perf_online import BaseOnline
+from storage.perf_online import LinuxOnline
+from storage.perf_online import WindowsOnline
+from storage.perf_sweep import BaseSweep
+from storage.perf_sweep import LinuxSweep
+from storage.perf_sweep import WindowsSweep
 from unit.log_handler import get_logger
 
 logger = get_logger(__name__, logging.INFO)
 
 
-class BasePerf(ABC):
-    '''docstring'''
+class BasePerf(BaseSweep, BaseMultiTarget, BaseOnline):
+    '''Single-target perf engine, joined by the sweep, multi-target and
+    online engines of perf_sweep, perf_multi_target and perf_online
+    '''
     READ_R_CFL = READ_L_CFL = WRITE_R_CFL = WRITE_L_CFL = None
 
     def __init__(self, platform, io_file):
+        self._default_criteria()
+        self._io_file = io_file
+        self._platform = platform
+        self._api = platform.api
+        self._cpu_num = self._platform.cpu.cores
+        self._thread = self._platform._logic_processors
+        self._file_size = self._platform.memory_size * 2
+        self._target_prepared = False
+        self._affinity = None
+        self._target_files = None
+
+    @staticmethod
+    def _default_criteria():
         if BasePerf.READ_R_CFL is None:
             BasePerf.READ_R_CFL = 3
         if BasePerf.WRITE_R_CFL is None:
@@ -25,12 +52,23 @@ class BasePerf(ABC):
             BasePerf.READ_L_CFL = 10
         if BasePerf.WRITE_L_CFL is None:
             BasePerf.WRITE_L_CFL = 7
-        self._io_file = io_file
-        self._platform = platform
-        self._api = platform.api
-        self._cpu_num = self._platform.cpu.cores
-        self._thread = self._platform._logic_processors
-        self._file_size = self._platform.memory_size * 2
+
+    @classmethod
+    def cfl_factors(cls) -> Dict[str, Dict[str, float]]:
+        """
+        Confidence factors of every metric for a PercentileModel.
+
+        Returns:
+            dict: The 'upper_factor' and 'lower_factor' by metric, read
+            metrics use READ_R/L_CFL and write metrics WRITE_R/L_CFL.
+        """
+        cls._default_criteria()
+        read = {'upper_factor': cls.READ_R_CFL,
+                'lower_factor': cls.READ_L_CFL}
+        write = {'upper_factor': cls.WRITE_R_CFL,
+                 'lower_factor': cls.WRITE_L_CFL}
+        return {'read_iops': read, 'read_bw': read,
+                'write_iops': write, 'write_bw': write}
 
     @classmethod
     def set_perf_criteria(cls, read_r, write_r, read_l, write_l):
@@ -59,13 +97,77 @@ class BasePerf(ABC):
                          duration: int) -> Tuple[float, float, float, float]:
         pass
 
+    def metric_limits(self, criteria: dict,
+                      metric: str) -> Tuple[float, float]:
+        """Computes the acceptance band of one metric.
+
+        The band of a criteria model under criteria['limits'] is used when
+        present. Otherwise the band is percentile ± std_dev × confidence
+        factor, falling back to the minimum if the lower limit is negative.
+
+        Args:
+            criteria (dict): A dictionary of performance criteria including
+            percentile, minimum, and standard deviation for IOPS and bandwidth.
+            metric (str): 'read_iops', 'read_bw', 'write_iops' or 'write_bw'.
+
+        Returns:
+            Tuple[float, float]: The lower and upper limits.
+        """
+        limits = criteria.get('limits', {}).get(metric)
+        if limits:
+            return tuple(limits)
+
+        if metric.startswith('read_'):
+            upper_cfl, lower_cfl = self.READ_R_CFL, self.READ_L_CFL
+        else:
+            upper_cfl, lower_cfl = self.WRITE_R_CFL, self.WRITE_L_CFL
+        pct = criteria[f'percentile_{metric}'][0]
+        std_dev = criteria[f'std_dev_{metric}']
+
+        upper_limit = pct + std_dev * upper_cfl
+        lower_limit = pct - std_dev * lower_cfl
+        if lower_limit < 0:
+            lower_limit = criteria[f'min_{metric}']
+        return lower_limit, upper_limit
+
+    def apply_affinity(self, plan) -> None:
+        """Applies the threads and CPU affinity of an AffinityPlan.
+
+        Args:
+            plan (AffinityPlan): The plan, see storage.affinity.
+        """
+        self._thread = plan.threads
+        self._affinity = plan.cpus
+        logger.info("Affinity plan %s: threads = %s, cpus = %s", plan.name,
+                    plan.threads, plan.cpus)
+
+    def use_target_files(self, manager) -> None:
+        """
+        Lets a target file manager create and precondition the IO file
+        instead of the engine creating it on every run.
+
+        Args:
+            manager (BaseTargetFileManager): See storage.target_file.
+        """
+        self._target_files = manager
+
+    def _prepare_files(self, paths: List[str], random_size: Optional[str],
+                       write_pattern) -> bool:
+        '''Precondition the IO files for a workload through the manager'''
+        if self._target_files is None:
+            return self._target_prepared
+        return self._target_files.prepare(paths, self._file_size,
+                                          random_size, write_pattern)
+
 
-class WindowsPerf(BasePerf):
+class WindowsPerf(WindowsSweep, WindowsMultiTarget, WindowsOnline,
+                  BasePerf):
     '''Windows Performance
     Args:
         platform: Operation system plus barebone
         io_file: File/block device
     '''
+
     def run_io_operation(self,
                          iodepth: int,
                          block_size: str,
@@ -91,78 +193,110 @@ class WindowsPerf(BasePerf):
         logger.info("IO file = %s", self._io_file)
         logger.info("File size = %s GB", self._file_size)
 
-        read_iops = read_bw = write_iops = write_bw = 0.0
-        cpu_usage = {}
-
         try:
-            if random_size:
-                str_command = (f'diskspd -c{self._cpu_num} -t{self._thread}'
-                               f' -o{iodepth} -b{block_size} -r{random_size} '
-                               f'-Sh -D -L -w{write_pattern} -d{duration} '
-                               f'-c{self._file_size}G {self._io_file}')
-            else:
-                str_command = (f'diskspd -c{self._cpu_num} -t{self._thread}'
-                               f' -o{iodepth} -b{block_size} '
-                               f'-w{write_pattern} -Sh -D -d{duration} -L '
-                               f'-c{self._file_size}G {self._io_file}')
-
+            self._target_prepared = self._prepare_files(
+                [self._io_file], random_size, write_pattern)
+            str_command = self._compose_command(iodepth, block_size,
+                                                random_size, write_pattern,
+                                                duration)
             str_output = self._api.io_command(str_command)
 
             if not str_output:
                 raise RuntimeError("No output returned from io_command.")
 
-            read_io_section = re.search(r'Read IO(.*?)Write IO', str_output,
-                                        re.S)
-            write_io_section = re.search(r'Write IO(.*?)(\n\n|\Z)', str_output,
-                                         re.S)
-
-            if read_io_section:
-                read_io_text = read_io_section.group(1)
-                read_pattern = re.compile(r'total:\s*([\d\s|.]+)')
-                read_match = read_pattern.search(read_io_text)
-
-                if read_match:
-                    read_values = read_match.group(1).split('|')
-                    read_iops = read_values[3].strip()
-                    read_bw = read_values[2].strip()
-                    logger.debug('read_iops = %s', read_iops)
-                    logger.debug('read_bw = %s', read_bw)
-
-            if write_io_section:
-                write_io_text = write_io_section.group(1)
-                write_pattern = re.compile(r'total:\s*([\d\s|.]+)')
-                write_match = write_pattern.search(write_io_text)
-
-                if write_match:
-                    write_values = write_match.group(1).split('|')
-                    write_iops = write_values[3].strip()
-                    write_bw = write_values[2].strip()
-                    logger.debug('write_iops = %s', write_iops)
-                    logger.debug('write_bw = %s', write_bw)
-
-            cpu_pattern = re.compile(
-                r"\s+\d+\|\s+(\d+)\|\s+([\d\.]+)%\|\s+([\d\.]+)%\|\s+"
-                r"([\d\.]+)%\|\s+([\d\.]+)%"
-            )
-            for match in cpu_pattern.finditer(str_output):
-                cpu_id = int(match.group(1))
-                logger.debug('cpu_id = %d', cpu_id)
-                usage = {
-                    "Total": float(match.group(2)),
-                    "User": float(match.group(3)),
-                    "Kernel": float(match.group(4)),
-                    "Idle": float(match.group(5)),
-                }
-                cpu_usage[cpu_id] = usage
-                logger.debug('Total = %.2f', cpu_usage[cpu_id]["Total"])
-                logger.debug('User = %.2f', cpu_usage[cpu_id]["User"])
-                logger.debug('Kernel = %.2f', cpu_usage[cpu_id]["Kernel"])
-                logger.debug('Idle = %.2f', cpu_usage[cpu_id]["Idle"])
+            return self.parse_output(str_output)
 
         except Exception as e:
             logger.error("Error occurred in run_io_operation: %s", e)
             raise
 
+    def _compose_command(self, iodepth: int, block_size: str,
+                         random_size: Optional[str], write_pattern: str,
+                         duration: int) -> str:
+        '''Compose the DISKSPD command line of one case'''
+        # A prepared target is reused as is, -c would recreate it
+        if self._target_prepared:
+            cpu_option = file_option = ''
+        else:
+            cpu_option = f'-c{self._cpu_num} '
+            file_option = f'-c{self._file_size}G '
+        if self._affinity:
+            cpus = ','.join(str(cpu) for cpu in self._affinity[0])
+            file_option = f'-a{cpus} {file_option}'
+
+        if random_size:
+            str_command = (f'diskspd {cpu_option}-t{self._thread}'
+                           f' -o{iodepth} -b{block_size} -r{random_size} '
+                           f'-Sh -D -L -w{write_pattern} -d{duration} '
+                           f'{file_option}{self._io_file}')
+        else:
+            str_command = (f'diskspd {cpu_option}-t{self._thread}'
+                           f' -o{iodepth} -b{block_size} '
+                           f'-w{write_pattern} -Sh -D -d{duration} -L '
+                           f'{file_option}{self._io_file}')
+        return str_command
+
+    @staticmethod
+    def parse_output(str_output: str) -> Tuple:
+        """Parses the text report of one DISKSPD timespan.
+
+        Args:
+            str_output (str): DISKSPD text output.
+
+        Returns:
+            tuple: read bw, read iops, write bw, write iops, cpu usage
+        """
+        read_iops = read_bw = write_iops = write_bw = 0.0
+        cpu_usage = {}
+
+        read_io_section = re.search(r'Read IO(.*?)Write IO', str_output,
+                                    re.S)
+        write_io_section = re.search(r'Write IO(.*?)(\n\n|\Z)', str_output,
+                                     re.S)
+
+        if read_io_section:
+            read_io_text = read_io_section.group(1)
+            read_pattern = re.compile(r'total:\s*([\d\s|.]+)')
+            read_match = read_pattern.search(read_io_text)
+
+            if read_match:
+                read_values = read_match.group(1).split('|')
+                read_iops = read_values[3].strip()
+                read_bw = read_values[2].strip()
+                logger.debug('read_iops = %s', read_iops)
+                logger.debug('read_bw = %s', read_bw)
+
+        if write_io_section:
+            write_io_text = write_io_section.group(1)
+            write_pattern = re.compile(r'total:\s*([\d\s|.]+)')
+            write_match = write_pattern.search(write_io_text)
+
+            if write_match:
+                write_values = write_match.group(1).split('|')
+                write_iops = write_values[3].strip()
+                write_bw = write_values[2].strip()
+                logger.debug('write_iops = %s', write_iops)
+                logger.debug('write_bw = %s', write_bw)
+
+        cpu_pattern = re.compile(
+            r"\s+\d+\|\s+(\d+)\|\s+([\d\.]+)%\|\s+([\d\.]+)%\|\s+"
+            r"([\d\.]+)%\|\s+([\d\.]+)%"
+        )
+        for match in cpu_pattern.finditer(str_output):
+            cpu_id = int(match.group(1))
+            logger.debug('cpu_id = %d', cpu_id)
+            usage = {
+                "Total": float(match.group(2)),
+                "User": float(match.group(3)),
+                "Kernel": float(match.group(4)),
+                "Idle": float(match.group(5)),
+            }
+            cpu_usage[cpu_id] = usage
+            logger.debug('Total = %.2f', cpu_usage[cpu_id]["Total"])
+            logger.debug('User = %.2f', cpu_usage[cpu_id]["User"])
+            logger.debug('Kernel = %.2f', cpu_usage[cpu_id]["Kernel"])
+            logger.debug('Idle = %.2f', cpu_usage[cpu_id]["Idle"])
+
         return (
             float(read_bw or 0.0),
             float(read_iops or 0.0),
@@ -216,90 +350,170 @@ class WindowsPerf(BasePerf):
             write_bw (float): Write bandwidth.
             write_iops (float): Write IOPS.
             criteria (dict): A dictionary of performance criteria including
-            percentile, minimum, and standard deviation for IOPS and bandwidth.
+            percentile, minimum, and standard deviation for IOPS and bandwidth,
+            and optionally the 'limits' of a criteria model.
 
         Raises:
             AssertionError: If the metrics fall outside of the calculated
             limits.
         """
-        if read_iops and read_bw:
-            pct_read_iops = criteria['percentile_read_iops'][0]
-            min_read_iops = criteria['min_read_iops']
-            std_dev_read_iops = criteria['std_dev_read_iops']
-
-            upper_limit_read_iops = (pct_read_iops + std_dev_read_iops *
-                                     self.READ_R_CFL)
-            lower_limit_read_iops = (pct_read_iops - std_dev_read_iops *
-                                     self.READ_L_CFL)
-            if lower_limit_read_iops < 0:
-                lower_limit_read_iops = min_read_iops
-
-            pct_read_bw = criteria['percentile_read_bw'][0]
-            min_read_bw = criteria['min_read_bw']
-            std_dev_read_bw = criteria['std_dev_read_bw']
-
-            upper_limit_read_bw = \
-                pct_read_bw + std_dev_read_bw * self.READ_R_CFL
-            lower_limit_read_bw = \
-                pct_read_bw - std_dev_read_bw * self.READ_L_CFL
-            if lower_limit_read_bw < 0:
-                lower_limit_read_bw = min_read_bw
-
-            self.log_target_limit(
-                upper_limit_read_iops,
-                lower_limit_read_iops,
-                upper_limit_read_bw,
-                lower_limit_read_bw,
-                'read_'
-            )
-
-            assert upper_limit_read_iops > read_iops > lower_limit_read_iops
-            assert upper_limit_read_bw > read_bw > lower_limit_read_bw
-
-        if write_iops and write_bw:
-            pct_write_iops = criteria['percentile_write_iops'][0]
-            min_write_iops = criteria['min_write_iops']
-            std_dev_write_iops = criteria['std_dev_write_iops']
-
-            upper_limit_write_iops = (pct_write_iops + std_dev_write_iops *
-                                      self.WRITE_R_CFL)
-            lower_limit_write_iops = (pct_write_iops - std_dev_write_iops *
-                                      self.WRITE_L_CFL)
-            if lower_limit_write_iops < 0:
-                lower_limit_write_iops = min_write_iops
-
-            pct_write_bw = criteria['percentile_write_bw'][0]
-            min_write_bw = criteria['min_write_bw']
-            std_dev_write_bw = criteria['std_dev_write_bw']
-
-            upper_limit_write_bw = \
-                pct_write_bw + std_dev_write_bw * self.WRITE_R_CFL
-            lower_limit_write_bw = \
-                pct_write_bw - std_dev_write_bw * self.WRITE_L_CFL
-            if lower_limit_write_bw < 0:
-                lower_limit_write_bw = min_write_bw
-
-            self.log_target_limit(
-                upper_limit_write_iops,
-                lower_limit_write_iops,
-                upper_limit_write_bw,
-                lower_limit_write_bw,
-                'write_'
-            )
-
-            assert upper_limit_write_iops > write_iops > lower_limit_write_iops
-            assert upper_limit_write_bw > write_bw > lower_limit_write_bw
-
-
-class LinuxPerf(BasePerf):
-    '''docstring'''
+        for prefix, iops, bw in (('read_', read_iops, read_bw),
+                                 ('write_', write_iops, write_bw)):
+            if not (iops and bw):
+                continue
+            lower_iops, upper_iops = self.metric_limits(criteria,
+                                                        f'{prefix}iops')
+            lower_bw, upper_bw = self.metric_limits(criteria, f'{prefix}bw')
+            self.log_target_limit(upper_iops, lower_iops, upper_bw, lower_bw,
+                                  prefix)
+
+            assert upper_iops > iops > lower_iops
+            assert upper_bw > bw > lower_bw
+
+
+class LinuxPerf(LinuxSweep, LinuxMultiTarget, LinuxOnline, BasePerf):
+    '''Linux Performance
+    Every run is one fio invocation with a JSON report. The threads of a
+    target are fio jobs reported as one group.
+
+    Args:
+        platform: Operation system plus barebone
+        io_file: File or block device, e.g. '/mnt/nvme/IO.dat' or
+        '/dev/nvme0n1'
+    '''
+    IO_ENGINE = 'libaio'
+
+    @classmethod
+    def set_io_engine(cls, io_engine: str):
+        """
+        Sets the fio I/O engine.
+
+        Args:
+            io_engine (str): e.g. 'libaio' or 'io_uring'.
+        """
+        cls.IO_ENGINE = io_engine
+        logger.info("Manually set IO_ENGINE: %s", cls.IO_ENGINE)
+
+    def _file_options(self, path: str) -> List[str]:
+        '''Block devices are used as is, files need their size'''
+        if path.startswith('/dev/'):
+            return [f'--filename={path}']
+        return [f'--filename={path}', f'--size={self._file_size}G']
+
+    def _workload_options(self, iodepth: int, block_size: str,
+                          random_size: Optional[str], write_pattern: str,
+                          duration: int) -> List[str]:
+        options = [f'--rw={"randrw" if random_size else "rw"}',
+                   f'--rwmixwrite={write_pattern}', f'--bs={block_size}',
+                   f'--iodepth={iodepth}', f'--runtime={duration}',
+                   '--time_based']
+        if random_size:
+            options.append(f'--blockalign={random_size}')
+        return options
+
+    def _compose_command(self, iodepth: int, block_size: str,
+                         random_size: Optional[str], write_pattern: str,
+                         duration: int) -> str:
+        '''Compose the fio command line of one case'''
+        options = ['fio --output-format=json', f'--ioengine={self.IO_ENGINE}',
+                   '--direct=1', f'--numjobs={self._thread}',
+                   '--group_reporting']
+        options += self._workload_options(iodepth, block_size, random_size,
+                                          write_pattern, duration)
+        options.append('--name=perf')
+        options += self._file_options(self._io_file)
+        if self._affinity:
+            options.append('--cpus_allowed=' + ','.join(
+                str(cpu) for cpu in self._affinity[0]))
+        return ' '.join(options)
+
     def run_io_operation(self,
                          iodepth: int,
                          block_size: str,
                          random_size: Optional[str],
                          write_pattern: str,
                          duration: int) -> Tuple[float, float, float, float]:
-        pass
+        ''' Run fio
+            Args:
+                iodepth: Outstanding I/O per thread
+                block_size: Block size, e.g. '4k'
+                random_size: Random alignment, None for sequential I/O
+                write_pattern: Write percentage
+                duration: Test duration in seconds
+            Returns: read bw, read iops, write bw, write iops, cpu usage
+            Raises: RuntimeError if fio returns no output or reports an
+            error
+        '''
+        logger.info("Thread count = %s", self._thread)
+        logger.info("IO depth = %s", iodepth)
+        logger.info("Block size = %s", block_size)
+        logger.info("Random size = %s", random_size)
+        logger.info("Write pattern = %s", write_pattern)
+        logger.info("Duration = %s", duration)
+        logger.info("IO file = %s", self._io_file)
+        logger.info("File size = %s GB", self._file_size)
+
+        try:
+            self._target_prepared = self._prepare_files(
+                [self._io_file], random_size, write_pattern)
+            str_output = self._api.io_command(
+                self._compose_command(iodepth, block_size, random_size,
+                                      write_pattern, duration))
+            if not str_output:
+                raise RuntimeError("No output returned from io_command.")
+            return self.parse_output(str_output)
+
+        except Exception as e:
+            logger.error("Error occurred in run_io_operation: %s", e)
+            raise
+
+    @staticmethod
+    def load_report(str_output: str) -> dict:
+        '''The fio JSON report of an output, possibly preceded by warnings'''
+        return json.loads(str_output[str_output.index('{'):])
+
+    @staticmethod
+    def job_result(job: dict) -> Tuple[float, float, float, float]:
+        '''read bw, read iops, write bw, write iops of one fio job'''
+        if job.get('error'):
+            raise RuntimeError(f"fio job {job['jobname']} failed with error "
+                               f"{job['error']}")
+        return (job['read']['bw'] / 1024, job['read']['iops'],
+                job['write']['bw'] / 1024, job['write']['iops'])
+
+    @classmethod
+    def parse_report(cls, report: dict) -> Tuple:
+        """Sums the jobs of a fio JSON report.
+
+        Args:
+            report (dict): The parsed fio report.
+
+        Returns:
+            tuple: read bw, read iops, write bw, write iops in MBps and
+            IOPS, and the CPU usage of every job by its index.
+        """
+        totals = [0.0] * 4
+        cpu_usage = {}
+        for index, job in enumerate(report['jobs']):
+            for position, value in enumerate(cls.job_result(job)):
+                totals[position] += value
+            total = job['usr_cpu'] + job['sys_cpu']
+            cpu_usage[index] = {"Total": total, "User": job['usr_cpu'],
+                                "Kernel": job['sys_cpu'],
+                                "Idle": max(100.0 - total, 0.0)}
+        return (*(float(total) for total in totals), cpu_usage)
+
+    @classmethod
+    def parse_output(cls, str_output: str) -> Tuple:
+        """Parses the fio JSON output of one run.
+
+        Args:
+            str_output (str): fio output, possibly preceded by warnings.
+
+        Returns:
+            tuple: See parse_report.
+        """
+        return cls.parse_report(cls.load_report(str_output))
 
 
 class BasePerfFactory(ABC):
@@ -1,15 +1,111 @@
 # Contents of storage/stress.py
 '''Copyright (c) 2024 Jaron Cheng'''
+import json
 import logging
+import os
 import re
+import time
 from abc import ABC
 from abc import abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
 from interface.application import BaseInterface
+from storage.performance import LinuxPerf
+from storage.performance import WindowsPerf
 from unit.log_handler import get_logger
 
 logger = get_logger(__name__, logging.INFO)
 
 
+@dataclass
+class Mismatch:
+    """A block that failed verification.
+
+    Attributes:
+        path: The file or device as reported by fio.
+        offset: Byte offset of the block.
+        length: Length of the block in bytes.
+    """
+    path: str
+    offset: int
+    length: int
+
+    SECTOR_SIZE = 512
+
+    @property
+    def lba(self) -> int:
+        return self.offset // self.SECTOR_SIZE
+
+
+class SoakCheckpoint(object):
+    """
+    Persists the completed segments of a soak run.
+
+    The checkpoint is written to a local JSON file and, if a MongoDB
+    connection is given, mirrored to one document so it also survives the
+    loss of the controlling host.
+
+    Attributes:
+        path (str): The local checkpoint file, None to keep it in memory.
+        key (dict): The parameters identifying the soak run.
+        segments (List[dict]): The records of the completed segments.
+    """
+    def __init__(self, path: Optional[str], key: dict, mdb=None):
+        self.path = path
+        self.key = key
+        self.mdb = mdb
+        self.segments: List[dict] = []
+
+    def load(self) -> List[dict]:
+        """
+        Loads the completed segments of the same soak run.
+
+        A checkpoint stored for other parameters is ignored, and the local
+        file is preferred over MongoDB.
+
+        Returns:
+            List[dict]: The completed segments in order.
+        """
+        stored = None
+        try:
+            if self.path:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    stored = json.load(f)
+        except FileNotFoundError:
+            pass
+        except json.JSONDecodeError as e:
+            logger.error("Error decoding %s: %s", self.path, e)
+        if stored is None and self.mdb:
+            stored = self.mdb.find_document({'soak': self.key})
+
+        if stored and stored.get('soak') == self.key:
+            self.segments = stored.get('segments', [])
+        else:
+            self.segments = []
+        logger.info('Soak resumes after %d segments', len(self.segments))
+        return self.segments
+
+    def append(self, segment: dict) -> None:
+        '''Record a completed segment and persist the checkpoint'''
+        self.segments.append(segment)
+        document = {'soak': self.key, 'segments': self.segments}
+        if self.path:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Replace atomically so a crash never leaves a truncated file
+            with open(f'{self.path}.tmp', 'w', encoding='utf-8') as f:
+                json.dump(document, f, indent=4)
+            os.replace(f'{self.path}.tmp', self.path)
+        if self.mdb:
+            try:
+                self.mdb.upsert_document({'soak': self.key}, document)
+            except Exception as e:
+                logger.warning("Failed to mirror checkpoint to MongoDB: %s",
+                               e)
+
+
 class BaseStress(ABC):
     """
     Class to perform multi-path I/O stress testing on AMD64 systems.
@@ -27,6 +123,13 @@ class BaseStress(ABC):
                               execute commands on the Windows 10 environment.
     """
     CPU_GROUP = None
+    # Placeholder path of a volume without a drive letter in disk_info
+    NO_DRIVE_LETTER = 'No Drive Letter'
+    VERIFY_ENGINE = 'psync'
+    VERIFY_SEED = 20240101
+    MISMATCH_PATTERN = re.compile(
+        r'at file (?P<path>.+?) offset (?P<offset>\d+),'
+        r' length (?P<length>\d+)')
 
     def __init__(self, platform, diskpart):
         """
@@ -43,9 +146,16 @@ class BaseStress(ABC):
             BaseStress.CPU_GROUP = "0,0"  # Default CPU group 0, CPU0
         self._platform = platform
         self._diskpart = diskpart
-        self.io_paths = self._diskpart.disk_info
+        # Volumes without a drive letter cannot take I/O, neither in the
+        # stress jobs nor in run_verification
+        self.io_paths = [volume for volume in self._diskpart.disk_info
+                         if volume[0] != self.NO_DRIVE_LETTER]
         self._api = platform.api
         self._file_size = self._platform.memory_size * 2
+        # Per-path (read_bw, read_iops, write_bw, write_iops) of the last run
+        self.path_results = {}
+        self._affinity = None
+        self._target_files = None
 
     @classmethod
     def set_cpu_group(cls, cpu_group: str):
@@ -58,13 +168,292 @@ class BaseStress(ABC):
         cls.CPU_GROUP = cpu_group
         logger.info("Manually set CPU_GROUP: %s", cls.CPU_GROUP)
 
+    def apply_affinity(self, plan) -> int:
+        """
+        Applies the CPU affinity of an AffinityPlan to every I/O path.
+
+        Args:
+            plan (AffinityPlan): The plan, see storage.affinity.
+
+        Returns:
+            int: The threads per path recommended by the plan.
+        """
+        self.set_cpu_group(plan.cpu_group)
+        self._affinity = plan.cpus
+        return plan.threads
+
+    def use_target_files(self, manager) -> None:
+        """
+        Lets a target file manager create and precondition the IO files
+        instead of the engine creating them on every run.
+
+        Args:
+            manager (BaseTargetFileManager): See storage.target_file.
+        """
+        self._target_files = manager
+
+    def _prepare_files(self, paths: List[str], random_size,
+                       write_pattern) -> bool:
+        '''Precondition the IO files for a workload through the manager'''
+        if self._target_files is None:
+            return False
+        return self._target_files.prepare(paths, self._file_size,
+                                          random_size, write_pattern)
+
     @abstractmethod
     def run_io_operation(self, thread, iodepth, block_size, random_size,
                          write_pattern, duration):
         pass
 
+    def run_with_telemetry(self, telemetry, thread, iodepth, block_size,
+                           random_size, write_pattern, duration):
+        """
+        Runs run_io_operation while a telemetry sampler records the run.
+
+        Args:
+            telemetry (StressTelemetry or SMARTPoller): The sampler,
+            started before and stopped after the stress job.
+            Other arguments are the same as run_io_operation.
+
+        Returns:
+            tuple: The result of run_io_operation.
+        """
+        # Cover the warmup of the engine as well
+        telemetry.start(duration + 10)
+        try:
+            return self.run_io_operation(thread, iodepth, block_size,
+                                         random_size, write_pattern, duration)
+        finally:
+            telemetry.stop()
+
+    def _target_filename(self, path: str) -> str:
+        '''Target of a path, a raw device or the IO.dat in a directory'''
+        if path.startswith('/dev/'):
+            return path
+        return f'{path.rstrip("/")}/IO.dat'
+
+    def _verify_filename(self, path: str) -> str:
+        '''fio filename of the target of a path'''
+        return self._target_filename(path)
+
+    def compose_verify_command(self, block_size, size, seed, iodepth):
+        """
+        Composes the fio command writing seeded blocks to every path and
+        reading them back.
+
+        Every block carries a header with its offset and seed plus a crc32c
+        checksum of its payload, all checked on the SUT during the read
+        phase, so both corrupted and misplaced blocks are detected.
+
+        Args:
+            Same as run_verification.
+
+        Returns:
+            str: The fio command line.
+        """
+        options = [
+            'fio --output-format=json', f'--ioengine={self.VERIFY_ENGINE}',
+            '--direct=1', '--rw=randwrite', f'--bs={block_size}',
+            f'--iodepth={iodepth}', f'--size={size}G', '--do_verify=1',
+            '--verify=crc32c', '--verify_fatal=0', '--verify_dump=0',
+            f'--randseed={seed}', '--randrepeat=0',
+        ]
+        for path, *_ in self.io_paths:
+            options += [f'--name={path}',
+                        f'--filename={self._verify_filename(path)}']
+        return ' '.join(options)
+
+    def run_verification(self, block_size='64k', size=1, seed=None,
+                         iodepth=16) -> List[Mismatch]:
+        """
+        Writes deterministic seeded blocks to every path, reads them back
+        and reports the blocks that do not match.
+
+        Args:
+            block_size (str): Size of a verified block (e.g., '64k').
+            size (int): GB written per path.
+            seed (int): Seed of the block pattern, VERIFY_SEED by default.
+            iodepth (int): I/O depth of the write and read phases.
+
+        Returns:
+            List[Mismatch]: The mismatching blocks, empty if all data read
+            back intact.
+
+        Raises:
+            RuntimeError: If fio returns no output or a job fails for
+            another reason than a mismatch.
+        """
+        seed = self.VERIFY_SEED if seed is None else seed
+        logger.info('Verifying %s with seed %d', self.io_paths, seed)
+        try:
+            str_output = self._api.io_command(self.compose_verify_command(
+                block_size, size, seed, iodepth))
+            if not str_output:
+                raise RuntimeError("No output returned from io_command.")
+            mismatches = self.parse_mismatches(str_output)
+            if not mismatches and '{' in str_output:
+                report = json.loads(
+                    str_output[str_output.index('{'):
+                               str_output.rindex('}') + 1])
+                for job in report['jobs']:
+                    if job.get('error'):
+                        raise RuntimeError(
+                            f"fio job {job['jobname']} failed with error "
+                            f"{job['error']}")
+        except Exception as e:
+            logger.error("Error occurred in run_verification: %s", e)
+            raise
+        finally:
+            # The seeded blocks replaced the preconditioned contents
+            if self._target_files is not None:
+                for path, *_ in self.io_paths:
+                    self._target_files.invalidate(
+                        self._target_filename(path))
+
+        for mismatch in mismatches:
+            logger.error('Mismatch on %s at LBA %d, %d bytes',
+                         mismatch.path, mismatch.lba, mismatch.length)
+        return mismatches
+
+    @classmethod
+    def parse_mismatches(cls, str_output: str) -> List[Mismatch]:
+        """
+        Parses the verification failures reported by fio, e.g.
+        'crc32c: verify failed at file /dev/sdb offset 4096, length 4096'.
+
+        Args:
+            str_output (str): fio output with stderr merged.
+
+        Returns:
+            List[Mismatch]: One entry per distinct block, in offset order.
+        """
+        found = {}
+        for match in cls.MISMATCH_PATTERN.finditer(str_output):
+            mismatch = Mismatch(match.group('path'),
+                                int(match.group('offset')),
+                                int(match.group('length')))
+            found[(mismatch.path, mismatch.offset)] = mismatch
+        return [found[key] for key in sorted(found)]
+
+    def verify_during(self, action: Callable, *args, **kwargs
+                      ) -> Tuple[object, List[Mismatch]]:
+        """
+        Runs run_verification in the background while an action runs, e.g.
+        waiting for a rebuild, to catch corruption under load.
+
+        Args:
+            action (Callable): Called with the remaining arguments.
+
+        Returns:
+            tuple: The result of the action and the mismatches.
+        """
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(self.run_verification)
+            result = action(*args, **kwargs)
+            return result, future.result()
+
+    def run_soak(self, thread, iodepth, block_size, random_size,
+                 write_pattern, duration, segment=3600,
+                 checkpoint: Optional[SoakCheckpoint] = None, retries=3,
+                 retry_delay=60):
+        """
+        Runs a long stress as fixed-length segments that can be resumed.
+
+        Every completed segment is checkpointed. Running again with the same
+        checkpoint skips the segments already done, and a failed segment,
+        e.g. on a dropped SSH session or a reboot of the SUT, is retried
+        after a delay.
+
+        Args:
+            duration (int): Total duration of the soak in seconds.
+            segment (int): Duration of one segment in seconds.
+            checkpoint (SoakCheckpoint): Where the segments are persisted,
+            None to keep them in memory only.
+            retries (int): Attempts per segment before giving up.
+            retry_delay (int): Seconds to wait before retrying a segment.
+            Other arguments are the same as run_io_operation.
+
+        Returns:
+            tuple: The duration-weighted (read_bw, read_iops, write_bw,
+            write_iops, cpu_usage) of all segments.
+
+        Raises:
+            Exception: The error of the last attempt of a segment.
+        """
+        durations = [segment] * (duration // segment)
+        if duration % segment:
+            durations.append(duration % segment)
+        if checkpoint is None:
+            checkpoint = SoakCheckpoint(None, {})
+        done = len(checkpoint.load())
+
+        for index in range(done, len(durations)):
+            for attempt in range(1, retries + 1):
+                try:
+                    result = self.run_io_operation(
+                        thread, iodepth, block_size, random_size,
+                        write_pattern, durations[index])
+                    break
+                except Exception as e:
+                    logger.warning("Soak segment %d attempt %d failed: %s",
+                                   index, attempt, e)
+                    if attempt == retries:
+                        raise
+                    time.sleep(retry_delay)
+
+            read_bw, read_iops, write_bw, write_iops, cpu_usage = result
+            checkpoint.append({
+                'index': index, 'duration': durations[index],
+                'read_bw': read_bw, 'read_iops': read_iops,
+                'write_bw': write_bw, 'write_iops': write_iops,
+                'cpu_usage': cpu_usage})
+            logger.info('Soak segment %d/%d done', index + 1, len(durations))
+
+        return self.aggregate_segments(checkpoint.segments)
+
+    @staticmethod
+    def aggregate_segments(segments: List[dict]):
+        """
+        Aggregates segment records weighted by their duration.
+
+        Rates such as IOPS and MBps, and CPU usage percentages, only average
+        correctly over time when each segment counts by its length.
+
+        Args:
+            segments (List[dict]): The segment records of run_soak.
+
+        Returns:
+            tuple: (read_bw, read_iops, write_bw, write_iops, cpu_usage).
+        """
+        total = sum(record['duration'] for record in segments)
+        if not total:
+            return 0.0, 0.0, 0.0, 0.0, {}
+
+        metrics = [sum(record[metric] * record['duration']
+                       for record in segments) / total
+                   for metric in ('read_bw', 'read_iops', 'write_bw',
+                                  'write_iops')]
+        cpu_usage: Dict[int, Dict[str, float]] = {}
+        for record in segments:
+            weight = record['duration'] / total
+            for cpu_id, usage in record['cpu_usage'].items():
+                # JSON checkpoints store the CPU IDs as strings
+                target = cpu_usage.setdefault(int(cpu_id), {})
+                for field, value in usage.items():
+                    target[field] = target.get(field, 0.0) + value * weight
+        return (*metrics, cpu_usage)
+
 
 class WindowsStress(BaseStress):
+    VERIFY_ENGINE = 'windowsaio'
+
+    def _target_filename(self, path: str) -> str:
+        return f'{path}:\\IO.dat'
+
+    def _verify_filename(self, path: str) -> str:
+        '''fio needs the colon of a drive letter escaped'''
+        return f'{path}\\:\\IO.dat'
+
     def run_io_operation(self, thread, iodepth, block_size, random_size,
                          write_pattern, duration):
         """
@@ -105,18 +494,21 @@ class WindowsStress(BaseStress):
         logger.debug('self._io_file = %s', self.io_paths)
         logger.debug('self._file_size = %s', self._file_size)
 
-        read_iops = read_bw = write_iops = write_bw = 0.0
-        cpu_usage = {}
-
-        list_io_path = [f'{drive_letter}:\\IO.dat' for drive_letter,
-                        _ in self.io_paths]
+        list_io_path = [self._target_filename(drive_letter)
+                        for drive_letter, _ in self.io_paths]
         logger.info('_io_file = %s', " ".join(list_io_path))
 
         try:
+            # Prepared files are reused as is, -c would recreate them
+            if self._prepare_files(list_io_path, random_size, write_pattern):
+                create_option = file_option = ''
+            else:
+                create_option = '-c1 '
+                file_option = f' -c{self._file_size}G'
             str_command = (
-                f'diskspd -c1 -ag{self.CPU_GROUP} -t{thread} -L -Sh -D'
-                f' -o{iodepth} -b{block_size} -r{random_size}'
-                f' -w{write_pattern} -d{duration} -c{self._file_size}G'
+                f'diskspd {create_option}-ag{self.CPU_GROUP} -t{thread} -L'
+                f' -Sh -D -o{iodepth} -b{block_size} -r{random_size}'
+                f' -w{write_pattern} -d{duration}{file_option}'
                 f' {" ".join(list_io_path)}')
 
             str_output = self._api.io_command(str_command)
@@ -124,60 +516,194 @@ class WindowsStress(BaseStress):
             if not str_output:
                 raise RuntimeError("No output returned from io_command.")
 
-            read_io_section = re.search(r'Read IO(.*?)Write IO', str_output,
-                                        re.S)
-            write_io_section = re.search(r'Write IO(.*?)(\n\n|\Z)',
-                                         str_output, re.S)
-
-            if read_io_section:
-                read_io_text = read_io_section.group(1)
-
-                # Extract total and I/O per s values
-                read_pattern = re.compile(r'total:\s*([\d\s|.]+)')
-                read_match = read_pattern.search(read_io_text)
-
-                if read_match:
-                    read_values = read_match.group(1).split('|')
-                    read_iops = read_values[3].strip()
-                    read_bw = read_values[2].strip()
-                    logger.debug('read_iops = %s', read_iops)
-                    logger.debug('read_bw = %s', read_bw)
-
-            if write_io_section:
-                write_io_text = write_io_section.group(1)
-
-                # Extract total and I/O per s value
-                write_pattern = re.compile(r'total:\s*([\d\s|.]+)')
-                write_match = write_pattern.search(write_io_text)
-                if write_match:
-                    write_values = write_match.group(1).split('|')
-                    write_iops = write_values[3].strip()
-                    write_bw = write_values[2].strip()
-                    logger.debug('write_iops = %s', write_iops)
-                    logger.debug('write_bw = %s', write_bw)
-
-            cpu_pattern = re.compile(
-                r"\s+\d+\|\s+(\d+)\|\s+"
-                r"([\d\.]+)%\|\s+([\d\.]+)%\|\s+([\d\.]+)%\|\s+([\d\.]+)%"
-            )
-            for match in cpu_pattern.finditer(str_output):
-                cpu_id = int(match.group(1))
-                logger.debug('cpu_id = %d', cpu_id)
-                usage = {
-                    "Total": float(match.group(2)),
-                    "User": float(match.group(3)),
-                    "Kernel": float(match.group(4)),
-                    "Idle": float(match.group(5)),
-                }
-                cpu_usage[cpu_id] = usage
-                logger.debug('Total = %.2f', cpu_usage[cpu_id]["Total"])
-                logger.debug('User = %.2f', cpu_usage[cpu_id]["User"])
-                logger.debug('Kernel = %.2f', cpu_usage[cpu_id]["Kernel"])
-                logger.debug('Idle = %.2f', cpu_usage[cpu_id]["Idle"])
+            # The report has the same layout as the one of a perf run
+            return WindowsPerf.parse_output(str_output)
+
+        except Exception as e:
+            logger.error("Error occurred in run_io_operation: %s", e)
+            raise
+
+class LinuxStress(BaseStress):
+    """
+    Multi-path I/O stress on Linux with one fio job per partition or
+    namespace.
+
+    Every path of the volume info becomes its own fio job pinned to a CPU of
+    CPU_GROUP, and written data is verified with crc32c checksums. A path
+    under /dev is stressed as a raw block device, any other path as a
+    directory holding an IO.dat file.
+
+    Attributes:
+        IO_ENGINE (str): The fio engine, 'io_uring' or 'libaio'.
+    """
+    IO_ENGINE = 'io_uring'
+    IO_ENGINES = ('io_uring', 'libaio')
+    VERIFY_ENGINE = IO_ENGINE
+
+    @classmethod
+    def set_io_engine(cls, io_engine: str):
+        """
+        Sets the fio I/O engine.
+
+        Args:
+            io_engine (str): 'io_uring' or 'libaio'.
+
+        Raises:
+            ValueError: If the engine is not supported.
+        """
+        if io_engine not in cls.IO_ENGINES:
+            raise ValueError(f"Unsupported I/O engine: {io_engine}")
+        cls.IO_ENGINE = io_engine
+        cls.VERIFY_ENGINE = io_engine
+        logger.info("Manually set IO_ENGINE: %s", cls.IO_ENGINE)
+
+    def _cpu_list(self):
+        '''CPUs of CPU_GROUP, given as "group,cpu[,cpu...]"'''
+        cpus = [cpu.strip() for cpu in self.CPU_GROUP.split(',')[1:]]
+        return [cpu for cpu in cpus if cpu] or ['0']
+
+    def compose_command(self, thread, iodepth, block_size, random_size,
+                        write_pattern, duration):
+        """
+        Composes one fio command line with a job section per path.
+
+        Args:
+            Same as run_io_operation.
+
+        Returns:
+            str: The fio command line.
+        """
+        cpus = self._cpu_list()
+        rw = 'randrw' if random_size else 'rw'
+        options = [
+            'fio --output-format=json', f'--ioengine={self.IO_ENGINE}',
+            '--direct=1', f'--rw={rw}', f'--rwmixwrite={write_pattern}',
+            f'--bs={block_size}', f'--iodepth={iodepth}',
+            f'--numjobs={thread}', f'--runtime={duration}', '--time_based',
+        ]
+        if random_size:
+            options.append(f'--blockalign={random_size}')
+        verify = int(write_pattern) > 0
+        if verify:
+            options += ['--verify=crc32c', '--verify_fatal=1',
+                        '--verify_backlog=1024']
+        # Verifying jobs sharing a file would overwrite each other's blocks,
+        # so each job of a path gets its own slice of it
+        split = verify and int(thread) > 1
+
+        for index, (path, *_) in enumerate(self.io_paths):
+            options.append(f'--name={path}')
+            if path.startswith('/dev/'):
+                options.append(f'--filename={path}')
+                if split:
+                    share = f'{100 // int(thread)}%'
+                    options += [f'--size={share}',
+                                f'--offset_increment={share}']
+            else:
+                options.append(f'--filename={path.rstrip("/")}/IO.dat')
+                if split:
+                    share = f'{self._file_size * 1024 // int(thread)}M'
+                    options += [f'--filesize={self._file_size}G',
+                                f'--size={share}',
+                                f'--offset_increment={share}']
+                else:
+                    options.append(f'--size={self._file_size}G')
+            if self._affinity and index < len(self._affinity):
+                allowed = ','.join(str(cpu) for cpu in self._affinity[index])
+            else:
+                allowed = cpus[index % len(cpus)]
+            options.append(f'--cpus_allowed={allowed}')
+        return ' '.join(options)
+
+    def run_io_operation(self, thread, iodepth, block_size, random_size,
+                         write_pattern, duration):
+        """
+        Runs fio on every path at once and returns the totals.
+
+        Args:
+            thread (int): Number of fio jobs per path.
+            iodepth (int): I/O depth (queue depth) for the operation.
+            block_size (str): Block size for the I/O operation (e.g., '4k').
+            random_size (str): Random alignment, None for sequential I/O.
+            write_pattern (str): Write pattern percentage (e.g., '100' for
+            write only).
+            duration (int): Duration of the test in seconds.
+
+        Returns:
+            tuple: (read_bw, read_iops, write_bw, write_iops, cpu_usage) as
+            in WindowsStress, bandwidth in MBps. The results of each path are
+            kept in path_results.
+
+        Raises:
+            RuntimeError: If fio returns no output or a job reports an error,
+            e.g. a verification failure.
+        """
+        logger.info('thread = %s', thread)
+        logger.info('iodepth = %s', iodepth)
+        logger.info('block_size = %s', block_size)
+        logger.info('random_size = %s', random_size)
+        logger.info('write_pattern = %s', write_pattern)
+        logger.info('duration = %s', duration)
+        logger.info('io_engine = %s', self.IO_ENGINE)
+
+        try:
+            # fio keeps existing files, the manager only preconditions them
+            self._prepare_files(
+                [self._target_filename(path) for path, *_ in self.io_paths],
+                random_size, write_pattern)
+            str_output = self._api.io_command(
+                self.compose_command(thread, iodepth, block_size,
+                                     random_size, write_pattern, duration))
+            if not str_output:
+                raise RuntimeError("No output returned from io_command.")
+            return self.parse_output(str_output)
 
         except Exception as e:
             logger.error("Error occurred in run_io_operation: %s", e)
             raise
+
+    def parse_output(self, str_output: str):
+        """
+        Parses the fio JSON report into totals, per-path results and per-CPU
+        usage.
+
+        Args:
+            str_output (str): fio output, possibly preceded by warnings.
+
+        Returns:
+            tuple: (read_bw, read_iops, write_bw, write_iops, cpu_usage).
+        """
+        report = LinuxPerf.load_report(str_output)
+        cpus = self._cpu_list()
+        paths = [path for path, *_ in self.io_paths]
+        self.path_results = {}
+        cpu_usage = {}
+
+        for job in report['jobs']:
+            totals = self.path_results.get(job['jobname'], (0.0,) * 4)
+            self.path_results[job['jobname']] = tuple(
+                total + value for total, value
+                in zip(totals, LinuxPerf.job_result(job)))
+
+            index = paths.index(job['jobname']) if \
+                job['jobname'] in paths else 0
+            if self._affinity and index < len(self._affinity):
+                cpu_id = self._affinity[index][0]
+            else:
+                cpu_id = int(cpus[index % len(cpus)].split('-')[0])
+            usage = cpu_usage.setdefault(
+                cpu_id, {"Total": 0.0, "User": 0.0, "Kernel": 0.0,
+                         "Idle": 100.0})
+            usage["User"] += job['usr_cpu']
+            usage["Kernel"] += job['sys_cpu']
+            usage["Total"] = usage["User"] + usage["Kernel"]
+            usage["Idle"] = max(100.0 - usage["Total"], 0.0)
+
+        for path, result in self.path_results.items():
+            logger.debug('%s = %s', path, result)
+        read_bw, read_iops, write_bw, write_iops = (
+            sum(values) for values in zip(
+                *self.path_results.values() or [(0.0,) * 4]))
         return (
             float(read_bw),
             float(read_iops),
@@ -187,13 +713,6 @@ class WindowsStress(BaseStress):
         )
 
 
-class LinuxStress(BaseStress):
-    '''docstring'''
-    def run_io_operation(self, thread, iodepth, block_size, random_size,
-                         write_pattern, duration):
-        pass
-
-
 class BaseStressFactory(ABC):
     '''docstring'''
     def __init__(self, api: BaseInterface):
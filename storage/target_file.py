@@ -0,0 +1,321 @@
+# Contents of storage/target_file.py
+'''Copyright (c) 2024 Jaron Cheng'''
+import json
+import logging
+import os
+import re
+import time
+from abc import ABC
+from abc import abstractmethod
+from dataclasses import asdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from interface.application import BaseInterface
+from unit.log_handler import get_logger
+
+logger = get_logger(__name__, logging.INFO)
+
+
+@dataclass
+class TargetFile:
+    """A test file on a volume of the SUT.
+
+    Attributes:
+        path: Path of the file on the SUT, e.g. 'E:\\IO.dat'.
+        size: Size in GB.
+        fill_state: 'absent', 'sequential' after a sequential fill, or
+            'steady_random' after a random write steady state.
+        workload: Workload family of the last run, 'sequential' or 'random'.
+        last_write_pattern: Write percentage of the last run.
+        updated: Time of the last precondition or run.
+    """
+    path: str
+    size: int
+    fill_state: str = 'absent'
+    workload: Optional[str] = None
+    last_write_pattern: Optional[int] = None
+    updated: float = 0.0
+
+
+class BaseTargetFileManager(ABC):
+    """
+    Creates, preconditions and tracks the test files of perf and stress
+    targets.
+
+    A file is created and filled sequentially once, a random write steady
+    state is reached before the first random workload, and a sequential
+    fill is repeated only when a sequential workload follows a random one.
+    The metadata is stored per SUT, so later runs and sessions reuse the
+    prepared files instead of recreating them with every engine invocation.
+
+    Attributes:
+        sut (str): Identifier of the SUT, e.g. its IP address.
+        cache_dir (str): Directory of the stored metadata.
+        files (Dict[str, TargetFile]): The tracked files by path.
+    """
+    CACHE_DIR = '.target_files'
+    FILL_TIME = 60
+    STEADY_TIME = 60
+
+    def __init__(self, platform, cache_dir: str = None):
+        self._api = platform.api
+        self.sut = self._api.remote_ip
+        self.cache_dir = cache_dir or self.CACHE_DIR
+        self.files: Dict[str, TargetFile] = self.load()
+
+    @classmethod
+    def set_precondition_time(cls, fill_time: int, steady_time: int):
+        """
+        Sets the precondition time.
+
+        Args:
+            fill_time (int): Sequential fill time in seconds.
+            steady_time (int): Random write steady state time in seconds.
+        """
+        cls.FILL_TIME = fill_time
+        cls.STEADY_TIME = steady_time
+        logger.info("Manually set FILL_TIME: %s, STEADY_TIME: %s",
+                    cls.FILL_TIME, cls.STEADY_TIME)
+
+    @abstractmethod
+    def managed(self, path: str) -> bool:
+        '''Tell whether a path is a file rather than a raw disk'''
+        pass
+
+    @abstractmethod
+    def probe_command(self, paths: List[str]) -> str:
+        '''Compose the command listing the path and size of the files'''
+        pass
+
+    @abstractmethod
+    def fill_command(self, targets: List[TargetFile],
+                     create: bool) -> str:
+        '''Compose the sequential fill of the files'''
+        pass
+
+    @abstractmethod
+    def steady_command(self, targets: List[TargetFile],
+                       random_size: str) -> str:
+        '''Compose the random write steady state of the files'''
+        pass
+
+    @staticmethod
+    def family(random_size: Optional[str]) -> str:
+        return 'random' if random_size else 'sequential'
+
+    @staticmethod
+    def parse_probe(str_output: str) -> Dict[str, int]:
+        """
+        Parses the probe output.
+
+        Args:
+            str_output (str): 'path|bytes' lines, other lines such as errors
+            of missing files are ignored.
+
+        Returns:
+            dict: The size in bytes of every existing file.
+        """
+        sizes = {}
+        for line in str_output.splitlines():
+            match = re.match(r'^\s*(.+?)\|(\d+)\s*$', line)
+            if match:
+                sizes[match.group(1)] = int(match.group(2))
+        return sizes
+
+    def refresh(self, paths: List[str]) -> None:
+        """
+        Resets the tracked files which are gone or shrank on the SUT.
+
+        Args:
+            paths (List[str]): The files to check.
+        """
+        sizes = self.parse_probe(
+            self._api.io_command(self.probe_command(paths)) or '')
+        sizes = {path.lower(): size for path, size in sizes.items()}
+        for path in paths:
+            target = self.files.get(path)
+            if (target and target.fill_state != 'absent' and
+                    sizes.get(path.lower(), 0) < target.size * 1024 ** 3):
+                logger.info('%s is missing on the SUT', path)
+                target.fill_state = 'absent'
+
+    def prepare(self, paths: List[str], size: int,
+                random_size: Optional[str], write_pattern) -> bool:
+        """
+        Preconditions the files for a workload.
+
+        Args:
+            paths (List[str]): The target files, raw disks are skipped.
+            size (int): File size in GB.
+            random_size (str, optional): Random alignment of the workload,
+            None for sequential I/O.
+            write_pattern: Write percentage of the workload.
+
+        Returns:
+            bool: True if every path is a prepared file, so the engine can
+            use them without creating them again.
+
+        Raises:
+            RuntimeError: If no output is returned from a precondition.
+        """
+        files = [path for path in paths if self.managed(path)]
+        if not files:
+            return False
+        self.refresh(files)
+
+        targets = []
+        for path in files:
+            target = self.files.get(path)
+            if target is None or target.size != size:
+                target = self.files[path] = TargetFile(path, size)
+            targets.append(target)
+
+        family = self.family(random_size)
+        absent = [t for t in targets if t.fill_state == 'absent']
+        # Sequential results after a random steady state need a fresh fill
+        stale = [t for t in targets if family == 'sequential' and
+                 t.fill_state == 'steady_random']
+        try:
+            if absent or stale:
+                self._run(self.fill_command(absent + stale, bool(absent)))
+                for target in absent + stale:
+                    target.fill_state = 'sequential'
+            unsteady = [t for t in targets if family == 'random' and
+                        t.fill_state != 'steady_random']
+            if unsteady:
+                self._run(self.steady_command(unsteady, random_size))
+                for target in unsteady:
+                    target.fill_state = 'steady_random'
+        except Exception as e:
+            logger.error("Error occurred in prepare: %s", e)
+            self.save()
+            raise
+
+        for target in targets:
+            target.workload = family
+            target.last_write_pattern = int(write_pattern)
+            target.updated = time.time()
+        self.save()
+        return len(files) == len(paths)
+
+    def _run(self, str_command: str) -> None:
+        logger.info('precondition command = %s', str_command)
+        if not self._api.io_command(str_command):
+            raise RuntimeError("No output returned from io_command.")
+
+    def invalidate(self, path: str = None) -> None:
+        '''Forget one file or all files, e.g. after the volumes changed'''
+        if path:
+            self.files.pop(path, None)
+        else:
+            self.files.clear()
+        self.save()
+
+    @property
+    def cache_path(self) -> str:
+        sut = re.sub(r'[^\w.-]', '_', str(self.sut))
+        return os.path.join(self.cache_dir, f'{sut}.json')
+
+    def save(self) -> None:
+        '''Store the metadata of the SUT'''
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self.cache_path, 'w', encoding='utf-8') as f:
+            json.dump([asdict(target) for target in self.files.values()],
+                      f, indent=4)
+
+    def load(self) -> Dict[str, TargetFile]:
+        """
+        Loads the metadata of the SUT.
+
+        Returns:
+            dict: The stored files by path, empty if there are none.
+        """
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except json.JSONDecodeError as e:
+            logger.error("Error decoding %s: %s", self.cache_path, e)
+            return {}
+        return {entry['path']: TargetFile(**entry) for entry in stored}
+
+
+class WindowsTargetFileManager(BaseTargetFileManager):
+    '''Test files preconditioned by DISKSPD'''
+    def managed(self, path: str) -> bool:
+        # '#1' is a raw physical disk
+        return not path.startswith('#')
+
+    def probe_command(self, paths: List[str]) -> str:
+        items = ','.join(f"'{path}'" for path in paths)
+        return ('powershell -Command "Get-Item -Path '
+                f'{items} -ErrorAction SilentlyContinue | '
+                "ForEach-Object { $_.FullName + '|' + $_.Length }\"")
+
+    def fill_command(self, targets: List[TargetFile],
+                     create: bool) -> str:
+        # -c recreates every file of the command at the given size
+        file_option = f'-c{targets[0].size}G ' if create else ''
+        return (f'diskspd -t1 -o32 -b128k -w100 -Sh -d{self.FILL_TIME} '
+                f'{file_option}{" ".join(t.path for t in targets)}')
+
+    def steady_command(self, targets: List[TargetFile],
+                       random_size: str) -> str:
+        return (f'diskspd -t1 -o32 -b{random_size} -r{random_size} -w100 '
+                f'-Sh -d{self.STEADY_TIME} '
+                f'{" ".join(t.path for t in targets)}')
+
+
+class LinuxTargetFileManager(BaseTargetFileManager):
+    '''Test files preconditioned by fio'''
+    IO_ENGINE = 'libaio'
+
+    def managed(self, path: str) -> bool:
+        return not path.startswith('/dev/')
+
+    def probe_command(self, paths: List[str]) -> str:
+        return f"stat -c '%n|%s' {' '.join(paths)}"
+
+    def _jobs(self, targets: List[TargetFile]) -> str:
+        return ' '.join(f'--name={t.path} --filename={t.path} '
+                        f'--size={t.size}G' for t in targets)
+
+    def fill_command(self, targets: List[TargetFile],
+                     create: bool) -> str:
+        # fio lays out missing files itself, one pass fills them
+        return (f'fio --ioengine={self.IO_ENGINE} --direct=1 --rw=write '
+                f'--bs=128k --iodepth=32 {self._jobs(targets)}')
+
+    def steady_command(self, targets: List[TargetFile],
+                       random_size: str) -> str:
+        return (f'fio --ioengine={self.IO_ENGINE} --direct=1 '
+                f'--rw=randwrite --bs={random_size} --iodepth=32 '
+                f'--time_based --runtime={self.STEADY_TIME} '
+                f'{self._jobs(targets)}')
+
+
+class BaseTargetFileFactory(ABC):
+    '''docstring'''
+    def __init__(self, api: BaseInterface):
+        '''docstring'''
+        self.api = api
+        self.os_type = api.os_type
+
+    @abstractmethod
+    def initiate(self, **kwargs) -> BaseTargetFileManager:
+        '''docstring'''
+        pass
+
+
+class TargetFileFactory(BaseTargetFileFactory):
+    '''docstring'''
+    def initiate(self, **kwargs) -> BaseTargetFileManager:
+        '''docstring'''
+        if self.os_type == 'Windows':
+            return WindowsTargetFileManager(**kwargs)
+        elif self.os_type == 'Linux':
+            return LinuxTargetFileManager(**kwargs)
+        else:
+            raise ValueError(f"Unsupported OS type: {self.os_type}")
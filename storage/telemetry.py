@@ -0,0 +1,275 @@
+# Contents of storage/telemetry.py
+'''Copyright (c) 2024 Jaron Cheng'''
+import logging
+import math
+import threading
+import time
+from abc import ABC
+from abc import abstractmethod
+from typing import Dict, List, Optional
+
+from interface.application import BaseInterface
+from unit.log_handler import get_logger
+from unit.ring_buffer import ColumnarRingBuffer
+
+logger = get_logger(__name__, logging.INFO)
+
+
+class StressTelemetry(ABC):
+    """
+    Per-second telemetry sampler running alongside a stress job.
+
+    Streams the I/O counters of the stressed volumes and the host CPU usage
+    from the OS, and polls the controller temperature through the CLI on
+    its own cadence. Every second becomes one row of a columnar ring
+    buffer, which is persisted once the job is over so throughput dips can
+    be correlated with thermal throttling, rebuilds or other events.
+
+    Attributes:
+        volumes (List[str]): The stressed volumes, see the OS samplers.
+        cli (BaseCLI): The controller CLI, None to skip the temperature.
+        temp_interval (int): Seconds between two temperature polls.
+        ring (ColumnarRingBuffer): The recorded samples.
+    """
+    COLUMNS = ('timestamp', 'read_iops', 'read_bw', 'write_iops',
+               'write_bw', 'cpu_usage', 'temperature')
+
+    def __init__(self, api: BaseInterface, volumes: List[str], cli=None,
+                 capacity: int = 86400, temp_interval: int = 10):
+        self._api = api
+        self.volumes = volumes
+        self.cli = cli
+        self.temp_interval = temp_interval
+        self.ring = ColumnarRingBuffer(self.COLUMNS, capacity)
+        self._temperature = math.nan
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    @abstractmethod
+    def compose_command(self, duration: int) -> str:
+        '''Compose the command streaming one sample every second'''
+        pass
+
+    @abstractmethod
+    def parse_sample(self, line: str) -> Optional[Dict[str, float]]:
+        """
+        Parses one streamed line into the totals of all volumes.
+
+        Args:
+            line (str): A line of the command output.
+
+        Returns:
+            dict or None: One row without timestamp and temperature, None
+            for headers, status lines and blank samples.
+        """
+        pass
+
+    def start(self, duration: int) -> None:
+        """
+        Starts sampling in the background.
+
+        Args:
+            duration (int): The expected length of the stress job in
+            seconds; sampling also ends when stop is called.
+        """
+        self._stop.clear()
+        self._threads = [threading.Thread(target=self._sample,
+                                          args=(duration,), daemon=True)]
+        if self.cli:
+            self._threads.append(threading.Thread(target=self._poll_temp,
+                                                  daemon=True))
+        for thread in self._threads:
+            thread.start()
+        logger.info('Telemetry started on %s', self.volumes)
+
+    def stop(self, grace: float = 0, timeout: float = 10) -> None:
+        """
+        Stops sampling and waits for the sampler threads.
+
+        Args:
+            grace (float): Seconds to let the typeperf stream end on its own
+            before it is cut off.
+            timeout (float): Seconds to wait for each thread afterwards.
+        """
+        if grace and self._threads:
+            self._threads[0].join(grace)
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        logger.info('Telemetry stopped with %d samples', len(self.ring))
+
+    def save(self, path: str) -> None:
+        '''Persist the recorded samples, see ColumnarRingBuffer.save'''
+        self.ring.save(path)
+
+    def _sample(self, duration: int) -> None:
+        stream = self._api.io_stream(self.compose_command(duration))
+        try:
+            for line in stream:
+                if self._stop.is_set():
+                    break
+                sample = self.parse_sample(line)
+                if sample:
+                    self.ring.append(timestamp=time.time(),
+                                     temperature=self._temperature,
+                                     **sample)
+        except Exception as e:
+            logger.error("Error occurred in telemetry sampling: %s", e)
+        finally:
+            stream.close()
+
+    def _poll_temp(self) -> None:
+        while not self._stop.is_set():
+            try:
+                smart = self.cli.get_controller_smart_info()
+                self._temperature = float(smart.composite_temp)
+            except Exception as e:
+                logger.warning("Failed to poll controller temperature: %s",
+                               e)
+                self._temperature = math.nan
+            self._stop.wait(self.temp_interval)
+
+
+class WindowsTelemetry(StressTelemetry):
+    """
+    Samples the LogicalDisk counters and the CPU usage from typeperf.
+
+    Attributes:
+        volumes (List[str]): Drive letters of the stressed volumes.
+    """
+    COUNTERS = ('Disk Reads/sec', 'Disk Read Bytes/sec',
+                'Disk Writes/sec', 'Disk Write Bytes/sec')
+    CPU_COUNTER = '\\Processor(_Total)\\% Processor Time'
+
+    def compose_command(self, duration: int) -> str:
+        '''Compose the typeperf command sampling every second'''
+        counters = [f'"\\LogicalDisk({volume}:)\\{counter}"'
+                    for volume in self.volumes for counter in self.COUNTERS]
+        counters.append(f'"{self.CPU_COUNTER}"')
+        return f'typeperf {" ".join(counters)} -si 1 -sc {duration}'
+
+    def parse_sample(self, line: str) -> Optional[Dict[str, float]]:
+        """
+        Parses one typeperf CSV sample into the totals of all volumes.
+
+        Args:
+            line (str): A CSV line with the timestamp, COUNTERS of every
+            volume in order and the CPU counter.
+
+        Returns:
+            dict or None: See StressTelemetry.parse_sample.
+        """
+        fields = line.strip().strip('"').split('","')
+        if len(fields) != len(self.volumes) * len(self.COUNTERS) + 2:
+            return None
+        try:
+            values = [float(value) for value in fields[1:]]
+        except ValueError:
+            return None
+        width = len(self.COUNTERS)
+        totals = [sum(values[offset:-1:width]) for offset in range(width)]
+        return {'read_iops': totals[0],
+                'read_bw': totals[1] / 1024 ** 2,
+                'write_iops': totals[2],
+                'write_bw': totals[3] / 1024 ** 2,
+                'cpu_usage': values[-1]}
+
+
+class LinuxTelemetry(StressTelemetry):
+    """
+    Samples /proc/diskstats and /proc/stat every second.
+
+    A shell loop prints the summed cumulative counters of the block devices
+    behind the volumes and the 'cpu' line of /proc/stat once per second, and
+    each row is the difference to the previous line.
+
+    Attributes:
+        volumes (List[str]): Mount points or /dev/ paths of the stressed
+        volumes.
+    """
+    MARKER = 'DISKSTATS'
+    SECTOR_SIZE = 512
+
+    def __init__(self, api: BaseInterface, volumes: List[str], cli=None,
+                 capacity: int = 86400, temp_interval: int = 10):
+        super().__init__(api, volumes, cli, capacity, temp_interval)
+        self._previous: Optional[List[int]] = None
+
+    def _devices(self) -> str:
+        '''Shell words of the kernel names of the volumes'''
+        return ' '.join(
+            volume[len('/dev/'):] if volume.startswith('/dev/')
+            else f'$(basename $(findmnt -no SOURCE --target {volume}))'
+            for volume in self.volumes)
+
+    def compose_command(self, duration: int) -> str:
+        '''Compose the shell loop sampling every second'''
+        # Fields 4, 6, 8 and 10 are reads, sectors read, writes and sectors
+        # written; the first line is only the baseline of the differences
+        awk = ('BEGIN {split(devs, names, " "); for (i in names) '
+               'want[names[i]]} $3 in want {r += $4; rs += $6; w += $8; '
+               f'ws += $10}} END {{printf "{self.MARKER} %d %d %d %d ", '
+               'r, rs, w, ws}')
+        return (f'devs="{self._devices()}"; '
+                f'for i in $(seq {duration + 1}); do '
+                f'awk -v devs="$devs" \'{awk}\' /proc/diskstats; '
+                'head -1 /proc/stat; sleep 1; done')
+
+    def parse_sample(self, line: str) -> Optional[Dict[str, float]]:
+        """
+        Parses one line of the loop into the difference to the previous.
+
+        Args:
+            line (str): e.g. 'DISKSTATS 10 80 5 40 cpu 1 0 2 3 0 0 0 0'.
+
+        Returns:
+            dict or None: See StressTelemetry.parse_sample, None for the
+            baseline and unrelated lines.
+        """
+        fields = line.split()
+        if len(fields) < 10 or fields[0] != self.MARKER or \
+                fields[5] != 'cpu':
+            return None
+        try:
+            current = [int(value) for value in fields[1:5] + fields[6:]]
+        except ValueError:
+            return None
+        previous, self._previous = self._previous, current
+        if previous is None:
+            return None
+        delta = [now - before for now, before in zip(current, previous)]
+        # The cpu line is user nice system idle iowait irq softirq steal,
+        # guest time is already part of user
+        total = sum(delta[4:12])
+        idle = delta[7] + (delta[8] if len(delta) > 8 else 0)
+        return {'read_iops': float(delta[0]),
+                'read_bw': delta[1] * self.SECTOR_SIZE / 1024 ** 2,
+                'write_iops': float(delta[2]),
+                'write_bw': delta[3] * self.SECTOR_SIZE / 1024 ** 2,
+                'cpu_usage': 100 * (1 - idle / total) if total else 0.0}
+
+    def start(self, duration: int) -> None:
+        self._previous = None
+        super().start(duration)
+
+
+class TelemetryFactory(object):
+    """
+    Factory of the telemetry sampler of the OS.
+
+    Attributes:
+        api (BaseInterface): The interface the sampler streams through.
+        os_type (str): The operating system type of the interface.
+    """
+    def __init__(self, api: BaseInterface):
+        self.api = api
+        self.os_type = api.os_type
+
+    def initiate(self, **kwargs) -> StressTelemetry:
+        '''Creates the sampler, see StressTelemetry for the arguments'''
+        if self.os_type == 'Windows':
+            return WindowsTelemetry(self.api, **kwargs)
+        elif self.os_type == 'Linux':
+            return LinuxTelemetry(self.api, **kwargs)
+        else:
+            raise ValueError(f"Unsupported OS type: {self.os_type}")
@@ -0,0 +1,148 @@
+# Contents of storage/volume_cache.py
+'''Copyright (c) 2024 Jaron Cheng'''
+import hashlib
+import json
+import logging
+import os
+import re
+from dataclasses import asdict
+from dataclasses import is_dataclass
+from typing import Callable, Iterable, Optional
+
+from unit.log_handler import get_logger
+
+logger = get_logger(__name__, logging.INFO)
+
+
+class VolumeMapCache(object):
+    """
+    Persistent cache of the disk layout and volume map of a SUT.
+
+    An entry is stored per SUT together with the serial number of the disk
+    and a hash of the virtual and physical drive configuration, so building
+    the partitioning fixture again skips the remote disk enumeration while
+    nothing changed. An entry whose disk now reports another serial number
+    is rejected, and CLI commands changing the VD topology and reboots
+    invalidate the entry of their SUT.
+
+    A hit is not free when a serial probe is given: it costs one remote
+    command, e.g. Get-PhysicalDisk on Windows or a sysfs read on Linux, in
+    place of the disk enumeration and the volume queries of a miss.
+
+    Attributes:
+        sut (str): Identifier of the SUT, e.g. its IP address.
+        cache_dir (str): Directory of the stored entries, CACHE_DIR in the
+        repository root by default whatever the working directory is.
+    """
+    CACHE_DIR = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        '.volume_map')
+    # mnv_cli commands that change the virtual drives behind the volumes.
+    # Resets keep the VDs, a disk renumbered by one fails the serial probe.
+    TOPOLOGY_COMMANDS = re.compile(
+        r'^\s*(vd\b.*-a\s+(create|delete)|rebuild\b)')
+
+    def __init__(self, sut: str, cache_dir: str = None):
+        self.sut = sut
+        self.cache_dir = cache_dir or self.CACHE_DIR
+
+    @staticmethod
+    def config_hash(*drives: Optional[Iterable]) -> str:
+        """
+        Hashes the drive configuration of a SUT.
+
+        Args:
+            *drives: Lists of drive dataclasses, e.g. the virtual_drive and
+            physical_drive of the interface.
+
+        Returns:
+            str: The SHA-1 hex digest.
+        """
+        config = [[asdict(drive) if is_dataclass(drive) else drive
+                   for drive in group or []] for group in drives]
+        encoded = json.dumps(config, sort_keys=True, default=str)
+        return hashlib.sha1(encoded.encode()).hexdigest()
+
+    @property
+    def cache_path(self) -> str:
+        sut = re.sub(r'[^\w.-]', '_', str(self.sut))
+        return os.path.join(self.cache_dir, f'{sut}.json')
+
+    def load(self, config_hash: str,
+             serial_probe: Optional[Callable] = None) -> Optional[dict]:
+        """
+        Loads the entry of the SUT.
+
+        Args:
+            config_hash (str): The current drive configuration hash.
+            serial_probe (Callable, optional): Returns the current serial
+            number of the stored disk_num, to reject the entry if the disk
+            was swapped or renumbered. It is called once per hit.
+
+        Returns:
+            dict or None: The stored entry, None if there is none or it was
+            stored for another configuration or disk.
+        """
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except json.JSONDecodeError as e:
+            logger.error("Error decoding %s: %s", self.cache_path, e)
+            return None
+        if entry.get('config_hash') != config_hash:
+            logger.info('Drive configuration of %s changed', self.sut)
+            return None
+        if serial_probe is not None:
+            try:
+                serial_num = str(serial_probe(entry.get('disk_num'))).strip()
+            except Exception as e:
+                logger.warning("Failed to probe the disk serial of %s: %s",
+                               self.sut, e)
+                return None
+            if serial_num != str(entry.get('serial_num', '')).strip():
+                logger.info('Disk %s of %s changed from %s to %s',
+                            entry.get('disk_num'), self.sut,
+                            entry.get('serial_num'), serial_num)
+                return None
+        logger.debug('Volume map of %s loaded from %s', self.sut,
+                     self.cache_path)
+        return entry
+
+    def save(self, config_hash: str, serial_num: str, entry: dict) -> None:
+        """
+        Stores the entry of the SUT.
+
+        Args:
+            config_hash (str): The current drive configuration hash.
+            serial_num (str): The serial number of the disk.
+            entry (dict): The layout and volume map to store.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self.cache_path, 'w', encoding='utf-8') as f:
+            json.dump(dict(entry, config_hash=config_hash,
+                           serial_num=serial_num), f, indent=4)
+        logger.debug('Volume map of %s stored in %s', self.sut,
+                     self.cache_path)
+
+    def invalidate(self) -> None:
+        '''Drop the entry of the SUT'''
+        try:
+            os.remove(self.cache_path)
+            logger.info('Volume map cache of %s invalidated', self.sut)
+        except FileNotFoundError:
+            pass
+
+    @classmethod
+    def changes_topology(cls, command: str) -> bool:
+        """
+        Tells whether a CLI command changes the VD topology.
+
+        Args:
+            command (str): The mnv_cli command, e.g. 'vd -a delete -i 1'.
+
+        Returns:
+            bool: True if the volume map of the SUT must be enumerated again.
+        """
+        return bool(cls.TOPOLOGY_COMMANDS.match(command))
@@ -278,8 +278,30 @@ class AMD64Windows(BaseOS):
 
 class AMD64Linux(BaseOS):
     '''docstring'''
-    def _get_memory_size(self):
-        pass
+    def _get_memory_size(self) -> int:
+        """
+        Retrieves the total physical memory size in GB.
+
+        Parses MemTotal of /proc/meminfo, which is reported in kB.
+
+        Returns:
+            int: The total physical memory size in GB.
+
+        Raises:
+            ValueError: If MemTotal can't be found or converted to int
+        """
+        try:
+            memory_info = self.api.command_line.original(
+                self.api, 'cat /proc/meminfo | grep MemTotal')
+            match = re.search(r'MemTotal:\s*(\d+)\s*kB', ''.join(memory_info))
+            if not match:
+                raise ValueError("No MemTotal found in /proc/meminfo.")
+            int_memory_size = int(match.group(1)) // (1024 ** 2)
+            logger.debug('int_memory_size = %d', int_memory_size)
+        except Exception as e:
+            logger.error('Failed to retrieve memory size: %s', e)
+            raise
+        return int_memory_size
 
 
 class BasePlatformFactory(ABC):
@@ -13,6 +13,7 @@ from interface.application import InterfaceFactory
 from interface.application import RaspberryInterfaceFactory
 # from typing import List
 from unit.gitlab import GitLabAPI
+from unit.golden import GoldenCache
 from unit.gpio import RaspBerryPins
 from unit.mongodb import MongoDB
 
@@ -76,6 +77,25 @@ def pytest_addoption(parser):
         default="D:\\IO.dat",
         help="Defalt IO file"
     )
+    parser.addoption(
+        "--criteria_model",
+        action="store",
+        default="cfl",
+        choices=["cfl", "percentile", "median_mad", "trimmed", "ewma"],
+        help="Default acceptance band: cfl"
+    )
+    parser.addoption(
+        "--online",
+        action="store_true",
+        default=False,
+        help="Validate perf runs while running and stop them early"
+    )
+    parser.addoption(
+        "--pd_ids",
+        action="store",
+        default="1,2",
+        help="Comma separated PDs sampled by the SMART poller"
+    )
 
 
 @pytest.fixture(scope="session")
@@ -91,6 +111,10 @@ def cmdopt(request):
         {'workspace': request.config.getoption("--workspace")})
     cmdopt_dic.update({'os_type': request.config.getoption("--os_type")})
     cmdopt_dic.update({'io_file': request.config.getoption("--io_file")})
+    cmdopt_dic.update(
+        {'criteria_model': request.config.getoption("--criteria_model")})
+    cmdopt_dic.update({'online': request.config.getoption("--online")})
+    cmdopt_dic.update({'pd_ids': request.config.getoption("--pd_ids")})
     return cmdopt_dic
 
 
@@ -160,6 +184,18 @@ def amd64(network_api):
     return factory.create_platform(interface=network_api)
 
 
+@pytest.fixture
+def test_case(request):
+    '''The test vector of an indirect VectorRepository.cases parameter'''
+    return request.param.resolve()
+
+
+@pytest.fixture(scope="session")
+def golden_cache():
+    '''Verdicts of the golden CLI outputs, kept in memory across reruns'''
+    return GoldenCache()
+
+
 @pytest.fixture(scope="session")
 def target_ping(raspi_interface):
     '''docstring'''
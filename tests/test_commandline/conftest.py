@@ -14,10 +14,15 @@ from unit.mongodb import MongoDB as mdb
 
 @pytest.fixture(scope="module")
 def mnv_cli(network_api, amd64):
-    '''docstring'''
+    '''CLI running every command of the module in one persistent session'''
     console = CLIFactory(network_api)
     print('\n\033[32m================== Setup Command Test ===========\033[0m')
-    return console.initiate(platform=amd64)
+    cli = console.initiate(platform=amd64)
+    cli.set_session(True)
+    yield cli
+    # SESSION is a class setting, later CLIs of other modules spawn again
+    cli.set_session(False)
+    cli.close_session()
 
 
 @pytest.fixture(scope="function")
@@ -4,10 +4,10 @@ mnv_cli commands to verify commands and system responses
 
    Copyright (c) 2024 Jaron Cheng
 '''
-import json
 import logging
 import pytest
-from unit.json_handler import load_and_sort_json
+from unit.golden import compare_output
+from unit.json_handler import VectorRepository
 
 # Set up logger
 logger = logging.getLogger(__name__)
@@ -31,85 +31,97 @@ CONFIG_FILES = {
     "row": ("config/test_mnv_cli_row.json", "ID")
 }
 
-# Load and process file
-SORTED_DATA = {
-    name: load_and_sort_json(path, key) if key else json.load(open(
-        path,
-        'r',
-        encoding='utf-8'
-    ))
-    for name, (path, key) in CONFIG_FILES.items()
-}
+# Test vectors are loaded on first use
+SORTED_DATA = VectorRepository(CONFIG_FILES)
 
 
 @pytest.mark.skip(reason="Volatile")
 class TestCLIIdentify:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["identify"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("identify"),
+                             indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         identify_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('identify_result = %s', identify_result)
-        assert identify_result == test_case["Expected"]
+        diff = compare_output(identify_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
 
 
 @pytest.mark.skip(reason="Volatile")
 class TestCLIInfo:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["info"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("info"),
+                             indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         info_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('info_result = %s', info_result)
-        assert info_result == test_case["Expected"]
+        diff = compare_output(info_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
 
 
 @pytest.mark.skip(reason="Volatile")
 class TestCLIAdapter:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["adapter"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("adapter"),
+                             indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         adapter_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('adapter_result = %s', adapter_result)
-        assert adapter_result == test_case["Expected"]
+        diff = compare_output(adapter_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
 
 
 class TestCLIOEMData:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["oem_data"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("oem_data"),
+                             indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         oem_data_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('oem_data_result = %s', oem_data_result)
-        assert oem_data_result == test_case["Expected"]
+        diff = compare_output(oem_data_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
 
 
 class TestCLIVersion:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["version"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("version"),
+                             indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         version_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('version_result = %s', version_result)
-        assert version_result == test_case["Expected"]
+        diff = compare_output(version_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
 
 
 @pytest.mark.dependency(name="dump data")
 class TestCLIDumpHBA:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["dump_hba"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("dump_hba"),
+                             indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         dump_hba_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('dump_hba_result = %s', dump_hba_result)
-        assert dump_hba_result == test_case["Expected"]
+        diff = compare_output(dump_hba_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
 
 
 @pytest.mark.dependency(depends=["dump data"])
 class TestCLIExport:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["file_paths"])
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("file_paths"),
+                             indirect=True)
     def test_compare_file(self, mnv_cli, test_case):
         '''docstring'''
         logger.info('file_path = %s', test_case["Name"])
@@ -119,81 +131,105 @@ class TestCLIExport:
 
 class TestCLILog:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["log"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("log"),
+                             indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         log_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('log_result = %s', log_result)
-        assert log_result == test_case["Expected"]
+        diff = compare_output(log_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
 
 
 class TestCLIEvent:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["event"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("event"),
+                             indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         event_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('event_result = %s', event_result)
-        assert event_result == test_case["Expected"]
+        diff = compare_output(event_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
 
 
 class TestCLIDebugError:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["debug_error"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("debug_error"),
+                             indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         debug_error_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('debug_error_result = %s', debug_error_result)
-        assert debug_error_result == test_case["Expected"]
+        diff = compare_output(debug_error_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
 
 
 class TestCLIDebugNormal:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["debug_normal"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("debug_normal"),
+                             indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         debug_normal_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('debug_normal_result = %s', debug_normal_result)
-        assert debug_normal_result == test_case["Expected"]
+        diff = compare_output(debug_normal_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
 
 
 class TestCLILED:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["led"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("led"),
+                             indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         led_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('led_result = %s', led_result)
-        assert led_result == test_case["Expected"]
+        diff = compare_output(led_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
 
 
 class TestCLIPassthru:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["passthru"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("passthru"),
+                             indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         passthru_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('passthru_result = %s', passthru_result)
-        assert passthru_result == test_case["Expected"]
+        diff = compare_output(passthru_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
 
 
 class TestCLIImport:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["import"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("import"),
+                             indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         import_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('import_result = %s', import_result)
-        assert import_result == test_case["Expected"]
+        diff = compare_output(import_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
 
 
 @pytest.mark.STRESS
 @pytest.mark.xdist_group("group2")
 class TestCLIRow:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["row"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("row"),
+                             indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         row_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('row_result = %s', row_result)
-        assert row_result == test_case["Expected"]
+        diff = compare_output(row_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
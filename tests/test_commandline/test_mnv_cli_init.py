@@ -4,10 +4,10 @@
 
    Copyright (c) 2025 Jaron Cheng
 '''
-import json
 import logging
 import pytest
-from unit.json_handler import load_and_sort_json
+from unit.golden import compare_output
+from unit.json_handler import VectorRepository
 
 # Set up logger
 logger = logging.getLogger(__name__)
@@ -19,42 +19,44 @@ CONFIG_FILES = {
     "init_stop": ("config/test_mnv_cli_init_stop.json", "ID")
 }
 
-# Load and process file
-SORTED_DATA = {
-    name: load_and_sort_json(path, key) if key else json.load(open(
-        path,
-        'r',
-        encoding='utf-8'
-    ))
-    for name, (path, key) in CONFIG_FILES.items()
-}
+# Test vectors are loaded on first use
+SORTED_DATA = VectorRepository(CONFIG_FILES)
 
 
 class TestCLIInit:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["init"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("init"),
+                             indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         init_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('init_result = %s', init_result)
-        assert init_result == test_case["Expected"]
+        diff = compare_output(init_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
 
 
 class TestCLIInitStart:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["init_start"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("init_start"),
+                             indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         init_start_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('init_start_result = %s', init_start_result)
-        assert init_start_result == test_case["Expected"]
+        diff = compare_output(init_start_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
 
 
 class TestCLIInitStop:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["init_stop"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("init_stop"),
+                             indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         init_stop_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('init_stop_result = %s', init_stop_result)
-        assert init_stop_result == test_case["Expected"]
+        diff = compare_output(init_stop_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
@@ -4,14 +4,14 @@ mnv_cli commands to verify rebuild commands and system responses
 
    Copyright (c) 2024 Jaron Cheng
 '''
-import json
 import logging
 import pytest
 from tests.test_storage.test_partitioning import (
     TestDiskVolume as Partitioning)
 from tests.test_storage.test_stress import (
     TestOneShotReadWriteStress as Stress)
-from unit.json_handler import load_and_sort_json
+from unit.golden import compare_output
+from unit.json_handler import VectorRepository
 
 # Set up logger
 logger = logging.getLogger(__name__)
@@ -38,75 +38,86 @@ CONFIG_FILES = {
     "rebuild_pd2_stop0": ("config/test_mnv_cli_rebuild_pd2_stop0.json", "ID")
 }
 
-# Load and process file
-SORTED_DATA = {
-    name: load_and_sort_json(path, key) if key else json.load(open(
-        path,
-        'r',
-        encoding='utf-8'
-    ))
-    for name, (path, key) in CONFIG_FILES.items()
-}
+# Test vectors are loaded on first use
+SORTED_DATA = VectorRepository(CONFIG_FILES)
 
 
 class TestCLIBGAOff:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["bga_off"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("bga_off"),
+                             indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         bga_off_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('bga_off_result = %s', bga_off_result)
-        assert bga_off_result == test_case["Expected"]
+        diff = compare_output(bga_off_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
 
 
 class TestCLIBGAOn:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["bga_on"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("bga_on"),
+                             indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         bga_on_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('bga_on_result = %s', bga_on_result)
-        assert bga_on_result == test_case["Expected"]
+        diff = compare_output(bga_on_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
 
 
 class TestCLIBGAHigh:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["bga_high"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("bga_high"),
+                             indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         bga_high_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('bga_high_result = %s', bga_high_result)
-        assert bga_high_result == test_case["Expected"]
+        diff = compare_output(bga_high_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
 
 
 class TestCLIBGALow:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["bga_low"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("bga_low"),
+                             indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         bga_low_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('bga_low_result = %s', bga_low_result)
-        assert bga_low_result == test_case["Expected"]
+        diff = compare_output(bga_low_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
 
 
 class TestCLIBGAMedium:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["bga_medium"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("bga_medium"),
+                             indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         bga_medium_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('bga_medium_result = %s', bga_medium_result)
-        assert bga_medium_result == test_case["Expected"]
+        diff = compare_output(bga_medium_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
 
 
 class TestCLIBGAInvalid:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["bga_invalid"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("bga_invalid"),
+                             indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         bga_invalid_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('bga_invalid_result = %s', bga_invalid_result)
-        assert bga_invalid_result == test_case["Expected"]
+        diff = compare_output(bga_invalid_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
 
 
 class TestCLIPartitioningBeforehand(Partitioning):
@@ -116,12 +127,15 @@ class TestCLIPartitioningBeforehand(Partitioning):
 @pytest.mark.flaky(reruns=4, reruns_delay=5)
 class TestCLIResetPD1:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["reset_pd1"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("reset_pd1"),
+                             indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         reset_pd1_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('reset_pd1_result = %s', reset_pd1_result)
-        assert reset_pd1_result == test_case["Expected"]
+        diff = compare_output(reset_pd1_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
 
 
 class TestCLIStressAfterResetPD1(Stress):
@@ -130,55 +144,81 @@ class TestCLIStressAfterResetPD1(Stress):
 
 class TestCLIRebuildPD1:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["rebuild_pd1"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("rebuild_pd1"),
+                             indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         rebuild_pd1_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('rebuild_pd1_result = %s', rebuild_pd1_result)
-        assert rebuild_pd1_result == test_case["Expected"]
+        diff = compare_output(rebuild_pd1_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
+
+
+class TestCLIVerifyDuringRebuildPD1:
+    '''Data written while PD1 rebuilds must read back intact'''
+    def test_verify_during(self, mnv_cli, target_stress):
+        '''The rebuild state is read while the verification runs'''
+        vd_info, mismatches = target_stress.verify_during(
+            mnv_cli.interpret, 'info -o vd')
+        logger.info('vd_info = %s', vd_info)
+        logger.debug('mismatches = %s', mismatches)
+        assert not mismatches
 
 
 @pytest.mark.xfail
 class TestCLIRebuildPD1Stop:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["rebuild_pd1_stop0"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize(
+        'test_case', SORTED_DATA.cases("rebuild_pd1_stop0"), indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         rebuild_pd1_stop0_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('rebuild_pd1_stop0_result = %s', rebuild_pd1_stop0_result)
-        assert rebuild_pd1_stop0_result == test_case["Expected"]
+        diff = compare_output(rebuild_pd1_stop0_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
 
 
 @pytest.mark.xfail
 class TestCLIRebuildPD1StopAgain:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["rebuild_pd1_stop"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize(
+        'test_case', SORTED_DATA.cases("rebuild_pd1_stop"), indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         rebuild_pd1_stop_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('rebuild_pd1_stop_result = %s', rebuild_pd1_stop_result)
-        assert rebuild_pd1_stop_result == test_case["Expected"]
+        diff = compare_output(rebuild_pd1_stop_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
 
 
 @pytest.mark.flaky(reruns=2, reruns_delay=5)
 class TestCLIVDDelete:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["vd_delete"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("vd_delete"),
+                             indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         vd_delete_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('vd_delete_result = %s', vd_delete_result)
-        assert vd_delete_result == test_case["Expected"]
+        diff = compare_output(vd_delete_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
 
 
 class TestCLIVDCreateR1:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["vd_create_r1"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("vd_create_r1"),
+                             indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         vd_create_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('vd_create_result = %s', vd_create_result)
-        assert vd_create_result == test_case["Expected"]
+        diff = compare_output(vd_create_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
 
 
 class TestCLIPartitioning(Partitioning):
@@ -187,33 +227,42 @@ class TestCLIPartitioning(Partitioning):
 
 class TestCLIMPStart:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["mp_start"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("mp_start"),
+                             indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         mp_start_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('mp_start_result = %s', mp_start_result)
-        assert mp_start_result == test_case["Expected"]
+        diff = compare_output(mp_start_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
 
 
 class TestCLIMPStop:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["mp_stop"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("mp_stop"),
+                             indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         mp_stop_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('mp_stop_result = %s', mp_stop_result)
-        assert mp_stop_result == test_case["Expected"]
+        diff = compare_output(mp_stop_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
 
 
 @pytest.mark.flaky(reruns=4, reruns_delay=5)
 class TestCLIResetPD2:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["reset_pd2"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("reset_pd2"),
+                             indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         reset_pd2_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('reset_pd2_result = %s', reset_pd2_result)
-        assert reset_pd2_result == test_case["Expected"]
+        diff = compare_output(reset_pd2_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
 
 
 class TestCLIStressAfterResetPD2(Stress):
@@ -222,55 +271,81 @@ class TestCLIStressAfterResetPD2(Stress):
 
 class TestCLIRebuildPD2:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["rebuild_pd2"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("rebuild_pd2"),
+                             indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         rebuild_pd2_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('rebuild_pd2_result = %s', rebuild_pd2_result)
-        assert rebuild_pd2_result == test_case["Expected"]
+        diff = compare_output(rebuild_pd2_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
+
+
+class TestCLIVerifyDuringRebuildPD2:
+    '''Data written while PD2 rebuilds must read back intact'''
+    def test_verify_during(self, mnv_cli, target_stress):
+        '''The rebuild state is read while the verification runs'''
+        vd_info, mismatches = target_stress.verify_during(
+            mnv_cli.interpret, 'info -o vd')
+        logger.info('vd_info = %s', vd_info)
+        logger.debug('mismatches = %s', mismatches)
+        assert not mismatches
 
 
 @pytest.mark.xfail
 class TestCLIRebuildPD2Stop:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["rebuild_pd2_stop0"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize(
+        'test_case', SORTED_DATA.cases("rebuild_pd2_stop0"), indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         rebuild_pd2_stop0_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('rebuild_pd2_stop0_result = %s', rebuild_pd2_stop0_result)
-        assert rebuild_pd2_stop0_result == test_case["Expected"]
+        diff = compare_output(rebuild_pd2_stop0_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
 
 
 @pytest.mark.xfail
 class TestCLIRebuildPD2StopAgain:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["rebuild_pd2_stop"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize(
+        'test_case', SORTED_DATA.cases("rebuild_pd2_stop"), indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         rebuild_pd2_stop_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('rebuild_pd2_stop_result = %s', rebuild_pd2_stop_result)
-        assert rebuild_pd2_stop_result == test_case["Expected"]
+        diff = compare_output(rebuild_pd2_stop_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
 
 
 @pytest.mark.flaky(reruns=2, reruns_delay=5)
 class TestCLIVDDeleteAgain:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["vd_delete"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("vd_delete"),
+                             indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         vd_delete_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('vd_delete_result = %s', vd_delete_result)
-        assert vd_delete_result == test_case["Expected"]
+        diff = compare_output(vd_delete_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
 
 
 class TestCLIVDCreateR1Again:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["vd_create_r1"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("vd_create_r1"),
+                             indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         vd_create_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('vd_create_result = %s', vd_create_result)
-        assert vd_create_result == test_case["Expected"]
+        diff = compare_output(vd_create_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
 
 
 class TestCLIPartitioningLast(Partitioning):
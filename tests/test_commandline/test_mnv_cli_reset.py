@@ -4,10 +4,10 @@ mnv_cli commands to verify reset commands and system responses
 
    Copyright (c) 2025 Jaron Cheng
 '''
-import json
 import logging
 import pytest
-from unit.json_handler import load_and_sort_json
+from unit.golden import compare_output
+from unit.json_handler import VectorRepository
 
 # Set up logger
 logger = logging.getLogger(__name__)
@@ -19,43 +19,45 @@ CONFIG_FILES = {
     "reset_power": ("config/test_mnv_cli_reset_power.json", "ID"),
 }
 
-# Load and process file
-SORTED_DATA = {
-    name: load_and_sort_json(path, key) if key else json.load(open(
-        path,
-        'r',
-        encoding='utf-8'
-    ))
-    for name, (path, key) in CONFIG_FILES.items()
-}
+# Test vectors are loaded on first use
+SORTED_DATA = VectorRepository(CONFIG_FILES)
 
 
 class TestCLIResetDevice:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["reset_device"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("reset_device"),
+                             indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         reset_device_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('reset_device_result = %s', reset_device_result)
-        assert reset_device_result == test_case["Expected"]
+        diff = compare_output(reset_device_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
 
 
 @pytest.mark.skip(reason="Deprecated")
 class TestCLIResetPCIe:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["reset_pcie"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("reset_pcie"),
+                             indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         reset_pcie_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('reset_pcie_result = %s', reset_pcie_result)
-        assert reset_pcie_result == test_case["Expected"]
+        diff = compare_output(reset_pcie_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
 
 
 class TestCLIResetPower:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["reset_power"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("reset_power"),
+                             indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         reset_power_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('reset_power_result = %s', reset_power_result)
-        assert reset_power_result == test_case["Expected"]
+        diff = compare_output(reset_power_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
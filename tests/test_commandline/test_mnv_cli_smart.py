@@ -4,10 +4,11 @@ mnv_cli commands to verify smart commands and system responses
 
    Copyright (c) 2024 Jaron Cheng
 '''
-import json
 import logging
 import pytest
-from unit.json_handler import load_and_sort_json
+from commandline.smart_limits import SMARTLimits
+from unit.golden import compare_output
+from unit.json_handler import VectorRepository
 
 # Set up logger
 logger = logging.getLogger(__name__)
@@ -17,15 +18,10 @@ CONFIG_FILES = {
     "smart_invalid": ("config/test_mnv_cli_smart_invalid.json", "ID")
 }
 
-# Load and process file
-SORTED_DATA = {
-    name: load_and_sort_json(path, key) if key else json.load(open(
-        path,
-        'r',
-        encoding='utf-8'
-    ))
-    for name, (path, key) in CONFIG_FILES.items()
-}
+# Test vectors are loaded on first use
+SORTED_DATA = VectorRepository(CONFIG_FILES)
+
+SMART_LIMITS = 'config/test_smart_limits.json'
 
 
 class TestCLISMART:
@@ -94,12 +90,20 @@ class TestCLISMART:
         for key, value in smart_info.__dict__.items():
             logger.info("%s = %s", key, value)
 
-        limits = mnv_cli.import_limits(
-            'config/test_smart_limits.json')
+        violations = SMARTLimits.load(SMART_LIMITS).check([smart_info],
+                                                          ['PD 1'])
+        assert not violations, violations
 
-        for field, value in smart_info.__dict__.items():
-            assert limits[field](value), (f"{field.replace('_', ' ').title()}"
-                                          f" {value} is out of range!")
+    def test_get_all_backend_smart_info(self, mnv_cli):
+        '''The SMART of every PD is checked in one batch'''
+        smart_infos = mnv_cli.get_all_backend_smart_info()
+        logger.info('smart_infos = %s', smart_infos)
+        assert not mnv_cli.pd_errors, mnv_cli.pd_errors
+
+        violations = SMARTLimits.load(SMART_LIMITS).check(
+            list(smart_infos.values()),
+            [f'PD {pd_id}' for pd_id in smart_infos])
+        assert not violations, violations
 
     def test_get_controller_smart_info1(self, mnv_cli):
         '''docstring'''
@@ -107,12 +111,9 @@ class TestCLISMART:
         for key, value in smart_info.__dict__.items():
             logger.info("%s = %s", key, value)
 
-        limits = mnv_cli.import_limits(
-            'config/test_smart_limits.json')
-
-        for field, value in smart_info.__dict__.items():
-            assert limits[field](value), (f"{field.replace('_', ' ').title()}"
-                                          f" {value} is out of range!")
+        violations = SMARTLimits.load(SMART_LIMITS).check([smart_info],
+                                                          ['Controller'])
+        assert not violations, violations
 
     @pytest.mark.skip(reason="Only for case generation")
     def test_export_smart_limits(self, mnv_cli):
@@ -136,9 +137,12 @@ class TestCLISMART:
 
 class TestCLISMARTInvalid:
     '''docstring'''
-    @pytest.mark.parametrize('test_case', SORTED_DATA["smart_invalid"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("smart_invalid"),
+                             indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         smart_invalid_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('smart_invalid_result = %s', smart_invalid_result)
-        assert smart_invalid_result == test_case["Expected"]
+        diff = compare_output(smart_invalid_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
@@ -1,6 +1,5 @@
 # Contents of tests/test_device/test_beidou.py
 '''Copyright (c) 2025 Jaron Cheng'''
-import json
 import logging
 import pytest
 from tests.test_storage.test_stress import (
@@ -12,7 +11,8 @@ from tests.test_commandline.test_mnv_cli_rebuild import (
 from tests.test_commandline.test_mnv_cli_rebuild import (
     TestCLIResetPD1 as ResetPD1
 )
-from unit.json_handler import load_and_sort_json
+from unit.golden import compare_output
+from unit.json_handler import VectorRepository
 
 # Set up logger
 logger = logging.getLogger(__name__)
@@ -23,15 +23,8 @@ CONFIG_FILES = {
     "rebuild_pd1": ("config/test_mnv_cli_rebuild_pd1_changlong.json", "ID")
 }
 
-# Load and process file
-SORTED_DATA = {
-    name: load_and_sort_json(path, key) if key else json.load(open(
-        path,
-        'r',
-        encoding='utf-8'
-    ))
-    for name, (path, key) in CONFIG_FILES.items()
-}
+# Test vectors are loaded on first use
+SORTED_DATA = VectorRepository(CONFIG_FILES)
 
 
 @pytest.mark.order(1)
@@ -122,12 +115,28 @@ class TestRebuildChanglongPD1:
     """
     Test rebuilding backend PD1 of Changlong card
     """
-    @pytest.mark.parametrize('test_case', SORTED_DATA["rebuild_pd1"])
-    def test_commandline(self, mnv_cli, test_case):
+    @pytest.mark.parametrize('test_case', SORTED_DATA.cases("rebuild_pd1"),
+                             indirect=True)
+    def test_commandline(self, mnv_cli, test_case, golden_cache):
         '''docstring'''
         rebuild_pd1_result = mnv_cli.interpret(test_case["Command"])
         logger.debug('rebuild_pd1_result = %s', rebuild_pd1_result)
-        assert rebuild_pd1_result == test_case["Expected"]
+        diff = compare_output(rebuild_pd1_result, test_case["Expected"],
+                              cache=golden_cache)
+        assert not diff, diff
+
+
+@pytest.mark.order(5)
+class TestRebuildChanglongPD1Progress:
+    '''Benchmark the rebuild of Changlong PD1'''
+    def test_rebuild_progress(self, boot_device):
+        '''Benchmark the rebuild of VD1 until it completes'''
+        monitor = boot_device.rebuild_monitor(vd_id=1)
+        # Same budget as the reruns of TestRebuildChanglongPD1Complete
+        summary = monitor.run(timeout=330 * 60)
+        monitor.save('logs/rebuild_pd1_changlong.npz')
+        logger.info('rebuild summary = %s', summary)
+        assert summary['finished'], f"Rebuilding is {summary['progress']}%"
 
 
 @pytest.mark.order(5)
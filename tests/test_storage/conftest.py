@@ -10,11 +10,19 @@ from system.amd64 import BaseOS
 from event.logging import EventFactory
 from interface.application import BaseInterface
 # from interface.application_interface import ApplicationInterface as api
+from storage.affinity import AffinityPlanner
+from storage.affinity import CpuTopology
 from storage.partitioning import PartitionDisk
 from storage.partitioning import PartitionFactory
+from storage.performance import BasePerf
 from storage.performance import PerfFactory
 from storage.stress import StressFactory
+from storage.target_file import TargetFileFactory
+from storage.telemetry import TelemetryFactory
+from commandline.mnv_cli import CLIFactory
+from unit.criteria_model import CriteriaFactory
 from unit.mongodb import MongoDB as mdb
+from unit.perf_statistics import PerfStatistics
 from system.arm import RaspberryPi
 
 paramiko.util.log_to_file("paramiko.log", level=logging.CRITICAL)
@@ -43,6 +51,46 @@ def my_mdb():
     )
 
 
+def _criteria_model(cmdopt):
+    '''Criteria model factory selected by --criteria_model'''
+    model = cmdopt.get('criteria_model')
+    if model in (None, 'cfl'):
+        return None
+    if model == 'percentile':
+        return CriteriaFactory(model, metric_options=BasePerf.cfl_factors())
+    return CriteriaFactory(model)
+
+
+@pytest.fixture(scope="session")
+def random_stats(my_mdb, cmdopt):
+    """
+    Fixture to load the historical random performance samples once.
+
+    Pulls every random read/write sample from MongoDB in a single query and
+    serves the criteria of all write patterns and I/O depths from memory for
+    the whole session. The acceptance band follows --criteria_model.
+
+    Returns:
+        PerfStatistics: The statistics engine keyed by io_depth.
+    """
+    print("\n\033[32m================== Setup Random Criteria =======\033[0m")
+    return PerfStatistics.from_mongo(my_mdb, 'io_depth',
+                                     model=_criteria_model(cmdopt))
+
+
+@pytest.fixture(scope="session")
+def sequential_stats(my_mdb, cmdopt):
+    """
+    Fixture to load the historical sequential performance samples once.
+
+    Returns:
+        PerfStatistics: The statistics engine keyed by block_size.
+    """
+    print("\n\033[32m================== Setup Sequential Criteria ===\033[0m")
+    return PerfStatistics.from_mongo(my_mdb, 'block_size',
+                                     model=_criteria_model(cmdopt))
+
+
 @pytest.fixture(scope="session")
 def machine_learn():
     '''
@@ -109,8 +157,56 @@ def test_open_uart(drone):
     drone.close_uart()
 
 
+def _affinity_planner(amd64, cmdopt, network_api, target_count):
+    '''Affinity planner of the SUT for a number of targets'''
+    topology = CpuTopology.from_platform(
+        amd64, smt_adjacent=cmdopt.get('os_type') == 'Windows')
+    return AffinityPlanner(topology, target_count, network_api.remote_ip)
+
+
+@pytest.fixture(scope="session")
+def perf_affinity(amd64, cmdopt, network_api, target_files):
+    """
+    Fixture to pick the threads and CPU affinity of performance tests.
+
+    Reuses the plan stored for the SUT, or benchmarks every candidate plan
+    with a short random read once and stores the best one. The IO file is
+    created by the target file manager before the first candidate, so the
+    candidates do not recreate it.
+
+    Returns:
+        AffinityPlan: The plan applied to every performance test.
+    """
+    print("\n\033[32m================== Setup Perf Affinity =========\033[0m")
+    perf = PerfFactory(api=network_api).initiate(
+        platform=amd64, io_file=cmdopt.get('io_file'))
+    perf.use_target_files(target_files)
+
+    def benchmark(plan):
+        perf.apply_affinity(plan)
+        _, read_iops, _, _, _ = perf.run_io_operation(32, '4k', '4k', 0, 10)
+        return read_iops
+
+    return _affinity_planner(amd64, cmdopt, network_api, 1).plan(benchmark)
+
+
+@pytest.fixture(scope="session")
+def target_files(amd64, network_api):
+    """
+    Fixture to create, precondition and track the test files of the SUT.
+
+    Performance and stress tests reuse the prepared files and only
+    precondition them again when the workload family changes.
+
+    Returns:
+        BaseTargetFileManager: The manager shared by every target.
+    """
+    print("\n\033[32m================== Setup Target Files ==========\033[0m")
+    return TargetFileFactory(api=network_api).initiate(platform=amd64)
+
+
 @pytest.fixture(scope="function")
-def target_perf(amd64, cmdopt, network_api):
+def target_perf(amd64, cmdopt, network_api, perf_affinity, target_files):
     """
     Fixture to set up performance testing on the target system.
 
@@ -120,13 +216,18 @@ def target_perf(amd64, cmdopt, network_api):
 
     Args:
         amd64: The target system fixture.
+        perf_affinity: The affinity plan of the SUT.
+        target_files: The test file manager of the SUT.
 
     Returns:
         amd64perf: The performance testing object.
     """
     print("\n\033[32m================== Setup Performance Test ======\033[0m")
     perf = PerfFactory(api=network_api)
-    return perf.initiate(platform=amd64, io_file=cmdopt.get('io_file'))
+    target = perf.initiate(platform=amd64, io_file=cmdopt.get('io_file'))
+    target.apply_affinity(perf_affinity)
+    target.use_target_files(target_files)
+    return target
 
 
 @pytest.fixture(scope="module")
@@ -149,9 +250,15 @@ def disk_partition(amd64: BaseOS,
 
 
 @pytest.fixture(scope="function")
-def target_stress(amd64, network_api, disk_partition):
+def target_stress(amd64, cmdopt, network_api, disk_partition,
+                  target_files):
     """Fixture to set up an AMD64MultiPathStress instance for I/O stress tests
 
+    The CPU affinity of the I/O paths comes from the plan stored for the
+    SUT, which is benchmarked with a short random read if there is none.
+    The target files are attached first, so they are created once instead
+    of by every candidate.
+
     Args:
         amd64: The system instance to run stress tests on.
 
@@ -159,8 +266,56 @@ def target_stress(amd64, network_api, disk_partition):
         AMD64MultiPathStress: Instance for executing stress test operations.
     """
     print('\n\033[32m================== Setup Stress Test ===========\033[0m')
-    stress = StressFactory(network_api)
-    return stress.initiate(platform=amd64, diskpart=disk_partition)
+    stress = StressFactory(network_api).initiate(platform=amd64,
+                                                 diskpart=disk_partition)
+    stress.use_target_files(target_files)
+
+    def benchmark(plan):
+        threads = stress.apply_affinity(plan)
+        _, read_iops, _, _, _ = stress.run_io_operation(threads, 32, '4k',
+                                                        '4k', 0, 10)
+        return read_iops
+
+    planner = _affinity_planner(amd64, cmdopt, network_api,
+                                len(stress.io_paths))
+    stress.apply_affinity(planner.plan(benchmark))
+    return stress
+
+
+@pytest.fixture(scope="function")
+def stress_telemetry(amd64, network_api, target_stress):
+    """Fixture to sample per-second I/O, CPU and controller temperature
+    alongside a stress test.
+
+    Args:
+        amd64: The system instance running the stress test.
+        target_stress: The stress instance whose volumes are sampled.
+
+    Returns:
+        StressTelemetry: The sampler of the OS, typeperf on Windows and
+        /proc/diskstats on Linux, not yet started.
+    """
+    print('\n\033[32m================== Setup Stress Telemetry ======\033[0m')
+    cli = CLIFactory(network_api).initiate(platform=amd64)
+    return TelemetryFactory(network_api).initiate(
+        volumes=[path for path, *_ in target_stress.io_paths], cli=cli)
+
+
+@pytest.fixture(scope="function")
+def smart_poller(amd64, cmdopt, network_api):
+    """Fixture to sample the controller and per-PD SMART alongside a stress
+    test.
+
+    Args:
+        amd64: The system instance running the stress test.
+        cmdopt: The PDs to sample are given by --pd_ids.
+
+    Returns:
+        SMARTPoller: The poller, not yet started.
+    """
+    print('\n\033[32m================== Setup SMART Poller ==========\033[0m')
+    cli = CLIFactory(network_api).initiate(platform=amd64)
+    return cli.smart_poller(cmdopt.get('pd_ids').split(','))
 
 
 @pytest.fixture(scope="package")
@@ -8,6 +8,7 @@ Copyright (c) 2024 Jaron Cheng
 '''
 import logging
 import pytest
+from storage.perf_sweep import PerfStep
 
 # Mark entire module
 logger = logging.getLogger(__name__)
@@ -26,35 +27,53 @@ class TestRandomReadWrite:
     @pytest.mark.parametrize('io_depth', [2**power for power in range(6)])
     @pytest.mark.parametrize('write_pattern', [0, 100])
     def test_run_io_operation(self, target_perf, write_pattern, io_depth,
-                              my_mdb, machine_learn):
+                              random_stats, machine_learn, cmdopt):
         """Test random I/O operation performance.
 
         Args:
             target_perf (object): The performance target instance.
             write_pattern (int): Write pattern, 0 for full read, 100 for full
             write io_depth (int): The I/O depth, ranging from 1 to 32.
-            my_mdb (object): Database instance for aggregating metrics.
+            random_stats (object): Session statistics of random samples.
         """
         result = machine_learn.aggregate_best_ramp_time()
         best_ramp_time = result["percentile_best_ramp_time"][0]
         logger.debug('best_ramp_time = %s', best_ramp_time)
 
-        read_bw, read_iops, write_bw, write_iops, _ = \
-            target_perf.run_io_operation(io_depth, '4k', '4k', write_pattern,
-                                         int(best_ramp_time))
+        criteria = random_stats.criteria(write_pattern, io_depth)
+        if cmdopt.get('online'):
+            online = target_perf.run_io_online(io_depth, '4k', '4k',
+                                               write_pattern,
+                                               int(best_ramp_time), criteria)
+            logger.info('verdict = %s after %d intervals', online.verdict,
+                        online.intervals)
+            read_bw, read_iops, write_bw, write_iops = (
+                online.read_bw, online.read_iops, online.write_bw,
+                online.write_iops)
+        else:
+            online = None
+            read_bw, read_iops, write_bw, write_iops, _ = \
+                target_perf.run_io_operation(io_depth, '4k', '4k',
+                                             write_pattern,
+                                             int(best_ramp_time))
 
         logger.info('random_read_bw = %.2f MBps', read_bw)
         logger.info('random_read_iops = %d', read_iops)
         logger.info('random_write_bw = %.2f MBps', write_bw)
         logger.info('random_write_iops = %d', write_iops)
 
-        criteria = my_mdb.aggregate_random_metrics(write_pattern, io_depth)
         logger.info('write_pattern = %s', write_pattern)
         logger.info('io_depth = %s', io_depth)
         logger.debug('result = %s', criteria)
 
         target_perf.validate_metrics(read_bw, read_iops, write_bw, write_iops,
                                      criteria)
+        # Runs stopped early are not comparable with the full-length history
+        if online is None or online.verdict == 'complete':
+            random_stats.add_sample({
+                'write_pattern': write_pattern, 'io_depth': io_depth,
+                'read_bw': read_bw, 'read_iops': read_iops,
+                'write_bw': write_bw, 'write_iops': write_iops})
 
 
 @pytest.mark.PERFORMANCE
@@ -73,7 +92,7 @@ class TestSequentialReadWrite:
                              [f'{2**pwr}k' for pwr in range(2, 8)])
     @pytest.mark.parametrize('write_pattern', [0, 100])
     def test_run_io_operation(self, target_perf, write_pattern, block_size,
-                              my_mdb, machine_learn):
+                              sequential_stats, machine_learn, cmdopt):
         """Test sequential I/O operation performance.
 
         Args:
@@ -81,29 +100,81 @@ class TestSequentialReadWrite:
             write_pattern (int): Write pattern, 0 for full read, 100 for full
             write.
             block_size (str): Block size in kilobytes, ranging from 4k to 128k.
-            my_mdb (object): Database instance for aggregating metrics.
+            sequential_stats (object): Session statistics of sequential
+            samples.
         """
         result = machine_learn.aggregate_best_ramp_time()
         best_ramp_time = result["percentile_best_ramp_time"][0]
         logger.debug('best_ramp_time = %s', best_ramp_time)
 
-        read_bw, read_iops, write_bw, write_iops, _ = \
-            target_perf.run_io_operation(32, block_size, None, write_pattern,
-                                         int(best_ramp_time))
+        criteria = sequential_stats.criteria(write_pattern, block_size)
+        if cmdopt.get('online'):
+            online = target_perf.run_io_online(32, block_size, None,
+                                               write_pattern,
+                                               int(best_ramp_time), criteria)
+            logger.info('verdict = %s after %d intervals', online.verdict,
+                        online.intervals)
+            read_bw, read_iops, write_bw, write_iops = (
+                online.read_bw, online.read_iops, online.write_bw,
+                online.write_iops)
+        else:
+            online = None
+            read_bw, read_iops, write_bw, write_iops, _ = \
+                target_perf.run_io_operation(32, block_size, None,
+                                             write_pattern,
+                                             int(best_ramp_time))
 
         logger.info('sequential_read_bw = %.2f MBps', read_bw)
         logger.info('sequential_read_iops = %d', read_iops)
         logger.info('sequential_write_bw = %.2f MBps', write_bw)
         logger.info('sequential_write_iops = %d', write_iops)
 
-        criteria = my_mdb.aggregate_sequential_metrics(write_pattern,
-                                                       block_size)
         logger.info('write_pattern = %s', write_pattern)
         logger.info('block_size = %s', block_size)
         logger.debug('criteria = %s', criteria)
 
         target_perf.validate_metrics(read_bw, read_iops, write_bw, write_iops,
                                      criteria)
+        if online is None or online.verdict == 'complete':
+            sequential_stats.add_sample({
+                'write_pattern': write_pattern, 'block_size': block_size,
+                'read_bw': read_bw, 'read_iops': read_iops,
+                'write_bw': write_bw, 'write_iops': write_iops})
+
+
+@pytest.mark.PERFORMANCE
+class TestSweepReadWrite:
+    ''' Test AMD64 NVM Random and Sequential Read Write as one sweep
+        The IO file is prepared once and every step of the matrix reuses it
+        Attributes:
+            job_file: Run the matrix as one engine job file or step by step
+    '''
+    @pytest.mark.parametrize('job_file', [False, True])
+    def test_run_sweep(self, target_perf, job_file, machine_learn):
+        """Test the I/O performance of a whole parameter matrix.
+
+        Args:
+            target_perf (object): The performance target instance.
+            job_file (bool): Run the matrix as one engine job file.
+        """
+        result = machine_learn.aggregate_best_ramp_time()
+        duration = int(result["percentile_best_ramp_time"][0])
+        steps = [PerfStep(io_depth, '4k', '4k', write_pattern, duration)
+                 for write_pattern in (0, 100) for io_depth in (1, 32)]
+        steps += [PerfStep(32, '128k', None, write_pattern, duration)
+                  for write_pattern in (0, 100)]
+
+        results = list(target_perf.run_sweep(steps, job_file=job_file))
+
+        assert [step for step, _ in results] == steps
+        for step, (read_bw, read_iops, write_bw, write_iops, _) in results:
+            logger.info('%s: read = %.2f MBps %d IOPS, write = %.2f MBps '
+                        '%d IOPS', step, read_bw, read_iops, write_bw,
+                        write_iops)
+            if step.write_pattern < 100:
+                assert read_bw > 0 and read_iops > 0
+            if step.write_pattern > 0:
+                assert write_bw > 0 and write_iops > 0
 
 
 @pytest.mark.TRAINING
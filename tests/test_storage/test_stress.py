@@ -7,6 +7,7 @@
 '''
 import logging
 import pytest
+from storage.stress import SoakCheckpoint
 
 # Mark entire module
 logger = logging.getLogger(__name__)
@@ -20,6 +21,8 @@ FULL_WRITE = 100
 # Period
 OVER_NIGHT = 15
 ONE_SHOT = 15
+SOAK = 12 * 3600
+SOAK_SEGMENT = 3600
 
 # Threading
 SINGLE_THREAD = 1
@@ -45,7 +48,7 @@ class TestAMD64MultiPathStress:
     @pytest.mark.parametrize('iodepth', [2**power for power in range(6)])
     @pytest.mark.parametrize('write_pattern', [FULL_READ, FULL_WRITE])
     def test_run_io_operation(self, target_stress, write_pattern, iodepth,
-                              my_mdb):
+                              my_mdb, stress_telemetry):
         """Runs parameterized I/O operations to test system stress with varying
         I/O depths and write patterns.
 
@@ -55,14 +58,18 @@ class TestAMD64MultiPathStress:
             write_pattern (int): Write pattern defining the read/write ratio.
             iodepth (int): I/O depth level for stress testing.
             my_mdb: Mock database for storing and comparing test metrics.
+            stress_telemetry: Per-second sampler saved to logs/.
 
         Assertions:
             - read_bw, read_iops, write_bw, write_iops metrics meet target
             criteria.
         """
         read_bw, read_iops, write_bw, write_iops, cpu_usage = \
-            target_stress.run_io_operation(SINGLE_THREAD, iodepth, '4k', '4k',
-                                           write_pattern, OVER_NIGHT)
+            target_stress.run_with_telemetry(stress_telemetry, SINGLE_THREAD,
+                                             iodepth, '4k', '4k',
+                                             write_pattern, OVER_NIGHT)
+        stress_telemetry.save(
+            f'logs/telemetry_{write_pattern}_{iodepth}.npz')
 
         logger.info('stress_read_bw = %.2f MBps', read_bw)
         logger.info('stress_read_iops = %d', read_iops)
@@ -78,7 +85,7 @@ class TestAMD64MultiPathStress:
 @pytest.mark.STRESS
 class TestOneShotStress:
     ''' Oneshot I/O Stress Test'''
-    def test_read_write(self, target_stress, my_mdb):
+    def test_read_write(self, target_stress, my_mdb, smart_poller):
         """Runs oneshot I/O operations to test system stress with optimum
         I/O depths and write patterns.
 
@@ -88,19 +95,25 @@ class TestOneShotStress:
             write_pattern (int): Write and Read in half.
             iodepth (int): Optimum I/O depth level for stress testing is 7.
             my_mdb: Mock database for storing and comparing test metrics.
+            smart_poller: Per-PD SMART sampled during the run.
 
         Assertions:
             - read_bw, read_iops, write_bw, write_iops metrics meet target
             criteria.
         """
-        read_bw, read_iops, write_bw, write_iops, cpu_usage = \
-            target_stress.run_io_operation(SINGLE_THREAD, OPTIMUM_IODEPTH,
-                                           '4k', '4k', HALF_RW, ONE_SHOT)
+        result = target_stress.run_with_telemetry(
+            smart_poller, SINGLE_THREAD, OPTIMUM_IODEPTH, '4k', '4k',
+            HALF_RW, ONE_SHOT)
+        read_bw, read_iops, write_bw, write_iops, cpu_usage = result
+        smart = smart_poller.summary(result)
 
         logger.info('stress_read_bw = %.2f MBps', read_bw)
         logger.info('stress_read_iops = %d', read_iops)
         logger.info('stress_write_bw = %.2f MBps', write_bw)
         logger.info('stress_write_iops = %d', write_iops)
+        logger.info('backend_write_bw = %.2f MBps', smart['write_bw'])
+        logger.info('write_amplification = %.2f',
+                    smart['write_amplification'])
 
         criteria = my_mdb.aggregate_stress_metrics(HALF_RW, OPTIMUM_IODEPTH)
 
@@ -249,11 +262,48 @@ class TestOLAP:
         logger.info("cpu_usage = %.2f%%", cpu_usage[0]["Total"])
 
 
+@pytest.mark.STRESS
+class TestSoak:
+    ''' Soak I/O Stress Test resumed segment by segment'''
+    def test_run_soak(self, target_stress, my_mdb):
+        """Runs a long half read and write stress in one hour segments, so a
+        dropped session or a reboot of the SUT resumes after the completed
+        segments instead of starting over.
+
+        Args:
+            target_stress (AMD64MultiPathStress): Stress instance for I/O
+            tests.
+            my_mdb: MongoDB mirroring the checkpoint of the soak.
+
+        Assertions:
+            - read_bw, read_iops, write_bw, write_iops metrics meet target
+            criteria.
+        """
+        checkpoint = SoakCheckpoint(
+            'logs/soak_checkpoint.json',
+            {'write_pattern': HALF_RW, 'iodepth': OPTIMUM_IODEPTH,
+             'duration': SOAK, 'segment': SOAK_SEGMENT}, my_mdb)
+        read_bw, read_iops, write_bw, write_iops, cpu_usage = \
+            target_stress.run_soak(SINGLE_THREAD, OPTIMUM_IODEPTH, '4k',
+                                   '4k', HALF_RW, SOAK, segment=SOAK_SEGMENT,
+                                   checkpoint=checkpoint)
+
+        logger.info('soak_read_bw = %.2f MBps', read_bw)
+        logger.info('soak_read_iops = %d', read_iops)
+        logger.info('soak_write_bw = %.2f MBps', write_bw)
+        logger.info('soak_write_iops = %d', write_iops)
+
+        criteria = my_mdb.aggregate_stress_metrics(HALF_RW, OPTIMUM_IODEPTH)
+
+        logger.debug('criteria = %s', criteria)
+        logger.info("cpu_usage = %.2f%%", cpu_usage[0]["Total"])
+
+
 @pytest.mark.xdist_group("group1")
 # @pytest.mark.STRESS
 class TestOneShotReadWriteStress:
     ''' Oneshot I/O Stress Test'''
-    def test_read_write(self, target_stress, my_mdb):
+    def test_read_write(self, target_stress, my_mdb, smart_poller):
         """Runs oneshot I/O operations to test system stress with optimum
         I/O depths and write patterns.
 
@@ -263,19 +313,25 @@ class TestOneShotReadWriteStress:
             write_pattern (int): Write and Read in half.
             iodepth (int): Optimum I/O depth level for stress testing is 7.
             my_mdb: Mock database for storing and comparing test metrics.
+            smart_poller: Per-PD SMART sampled during the run.
 
         Assertions:
             - read_bw, read_iops, write_bw, write_iops metrics meet target
             criteria.
         """
-        read_bw, read_iops, write_bw, write_iops, cpu_usage = \
-            target_stress.run_io_operation(SINGLE_THREAD, OPTIMUM_IODEPTH,
-                                           '4k', '4k', HALF_RW, ONE_SHOT)
+        result = target_stress.run_with_telemetry(
+            smart_poller, SINGLE_THREAD, OPTIMUM_IODEPTH, '4k', '4k',
+            HALF_RW, ONE_SHOT)
+        read_bw, read_iops, write_bw, write_iops, cpu_usage = result
+        smart = smart_poller.summary(result)
 
         logger.info('stress_read_bw = %.2f MBps', read_bw)
         logger.info('stress_read_iops = %d', read_iops)
         logger.info('stress_write_bw = %.2f MBps', write_bw)
         logger.info('stress_write_iops = %d', write_iops)
+        logger.info('backend_write_bw = %.2f MBps', smart['write_bw'])
+        logger.info('write_amplification = %.2f',
+                    smart['write_amplification'])
 
         criteria = my_mdb.aggregate_stress_metrics(HALF_RW, OPTIMUM_IODEPTH)
 
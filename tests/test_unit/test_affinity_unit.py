@@ -0,0 +1,51 @@
+# Contents of tests/test_unit/test_affinity_unit.py
+'''Copyright (c) 2024 Jaron Cheng'''
+import pytest
+from storage.affinity import AffinityPlanner
+from storage.affinity import CpuTopology
+
+
+@pytest.fixture
+def planner(tmp_path):
+    '''Planner of an 8-core, 16-thread SUT with two volumes'''
+    return AffinityPlanner(CpuTopology(cores=8, logical=16), 2,
+                           '192.168.0.1', cache_dir=str(tmp_path))
+
+
+def test_candidates(planner):
+    '''Candidates split the physical cores evenly between the targets'''
+    plans = {plan.name: plan for plan in planner.candidates()}
+
+    assert plans['cpu0'].cpus == [[0], [0]]
+    assert plans['core_per_target'].cpus == [[0], [8]]
+    assert plans['physical_cores'].cpus == [[0, 2, 4, 6], [8, 10, 12, 14]]
+    assert plans['all_logical'].threads == 8
+    assert plans['all_logical'].cpus[1] == [8, 9, 10, 11, 12, 13, 14, 15]
+    assert plans['physical_cores'].cpu_group == '0,0,2,4,6,8,10,12,14'
+
+
+def test_numa_and_linux_siblings(tmp_path):
+    '''Targets stay on one NUMA node, Linux siblings are cores apart'''
+    topology = CpuTopology(cores=4, logical=8, numa_nodes=2,
+                           smt_adjacent=False)
+    planner = AffinityPlanner(topology, 2, 'sut', cache_dir=str(tmp_path))
+    plans = {plan.name: plan for plan in planner.candidates()}
+
+    assert plans['physical_cores'].cpus == [[0, 1], [2, 3]]
+    assert plans['all_logical'].cpus == [[0, 4, 1, 5], [2, 6, 3, 7]]
+
+
+def test_select_stores_best_plan(planner):
+    '''The best plan is stored and reused without benchmarking again'''
+    scores = {'cpu0': 1.0, 'core_per_target': 2.0,
+              'physical_cores': 4.0, 'all_logical': 3.0}
+    best = planner.select(lambda plan: scores[plan.name])
+    assert best.name == 'physical_cores'
+
+    def fail(plan):
+        raise AssertionError('benchmarked again')
+
+    assert planner.plan(fail) == best
+
+    planner.topology = CpuTopology(cores=16, logical=32)
+    assert planner.load() is None
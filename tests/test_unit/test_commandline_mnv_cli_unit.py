@@ -1,12 +1,18 @@
 # Content of tests/test_unit/test_event_unit.py
 '''Copyright (c) 2025 Jaron Cheng'''
+import json
+from types import SimpleNamespace
 from unittest.mock import MagicMock
 from unittest.mock import patch
+import numpy as np
 import pytest
 
+from commandline.mnv_cli import BackendSMARTInfo
 from commandline.mnv_cli import CLIFactory
+from commandline.mnv_cli import SMARTParser
 from commandline.mnv_cli import LinuxCLI
 from commandline.mnv_cli import WindowsCLI
+from commandline.smart_limits import SMARTLimits
 
 
 # Mocked BaseOS and API for testing
@@ -104,3 +110,238 @@ def test_windows_cli_error(logger_mock):
         'Error occurred in interpretation: %s',
         "Test exception"
     )
+
+
+# Recorded 'smart -i 1' output
+SMART_OUTPUT = [
+    'SMART/Health Information (NVMe Log 0x02)\r\n',
+    'Critical Warning                                 : 0x00\r\n',
+    'Composite Temperature                            : 41 C\r\n',
+    'Available Spare                                  : 100%\r\n',
+    'Available Spare Threshold                        : 10%\r\n',
+    'Percentage Used                                  : 2%\r\n',
+    'Data Units Read                                  : 24169053\r\n',
+    'Data Units Written                               : 31873530\r\n',
+    'Host Read Commands                               : 384526207\r\n',
+    'Host Write Commands                              : 620873254\r\n',
+    'Controller Busy Time                             : 1152\r\n',
+    'Power Cycles                                     : 415\r\n',
+    'Power On Hours                                   : 2297\r\n',
+    'Unsafe Shutdowns                                 : 73\r\n',
+    'Media and Data Integrity Errors                  : 0\r\n',
+    'Num Err Log Entries                              : 0\r\n',
+    'Warning Composite Temperature Time               : 0\r\n',
+    'Critical Composite Temperature Time              : 0\r\n',
+    'Temperature 1 Transition Count                   : 0\r\n',
+    'Temperature 2 Transition Count                   : 0\r\n',
+    'Total Time For Thermal Management Temperature 1  : 0\r\n',
+    'Total Time For Thermal Management Temperature 2  : 0\r\n',
+]
+
+
+def test_get_smart_info():
+    '''Controller and per-PD outputs share the one-pass parser'''
+    platform = MockBaseOS(os_type='Windows')
+    windows_cli = WindowsCLI(platform)
+    platform.api.command_line.original.return_value = SMART_OUTPUT
+
+    backend = windows_cli.get_backend_smart_info('1')
+    assert isinstance(backend, BackendSMARTInfo)
+    assert backend.critical_warning == '0x00'
+    assert backend.composite_temp == '41'
+    assert backend.available_spare_threshold == '10'
+    assert backend.data_units_written == 31873530
+    assert backend.unsafe_shutdowns == 73
+    assert backend.total_time_for_tmp2 == 0
+
+    controller = windows_cli.get_controller_smart_info()
+    assert controller.available_spare == '100'
+    assert not hasattr(controller, 'power_cycles')
+
+    platform.api.command_line.original.return_value = SMART_OUTPUT[:-1]
+    with pytest.raises(ValueError, match='total_time_for_tmp2'):
+        windows_cli.get_backend_smart_info('1')
+
+
+def test_import_limits(tmp_path):
+    '''Limits are compiled from declarations instead of eval'''
+    limits = WindowsCLI.import_limits('config/test_smart_limits.json')
+    assert len(limits) == 21 and all(map(callable, limits.values()))
+    assert limits['critical_warning']('0x05')
+    assert not limits['critical_warning']('0x06')
+    assert limits['composite_temp']('69') and not limits['composite_temp'](70)
+
+    legacy = tmp_path / 'legacy.json'
+    legacy.write_text('{"composite_temp": "lambda x: int(x) < 70"}')
+    with pytest.raises(ValueError, match='composite_temp'):
+        WindowsCLI.import_limits(str(legacy))
+
+
+def test_check_smart_limits():
+    '''A batch of PD samples is checked per field at once'''
+    platform = MockBaseOS(os_type='Windows')
+    platform.api.command_line.original.return_value = SMART_OUTPUT
+    sample = WindowsCLI(platform).get_backend_smart_info('1')
+    hot = BackendSMARTInfo(**dict(vars(sample), composite_temp='75',
+                                  num_err_log_entries=2))
+    limits = SMARTLimits.load('config/test_smart_limits.json')
+
+    violations = limits.check([sample, hot, sample],
+                              labels=['PD 1', 'PD 2', 'PD 3'])
+
+    assert [(v.index, v.label, v.field, v.value) for v in violations] == [
+        (1, 'PD 2', 'composite_temp', 75),
+        (1, 'PD 2', 'num_err_log_entries', 2)]
+    assert violations[0].limit == 'x < 70'
+    assert not limits.check([WindowsCLI(platform).get_controller_smart_info()])
+
+
+class FakeChannel:
+    '''Interactive cmd.exe echoing the typed line before its output'''
+    def __init__(self, outputs):
+        self.outputs = outputs
+        self.sent = []
+        self.pending = 'Microsoft Windows\r\nC:\\Users\\test>'
+        self.closed = False
+        self.variables = {}
+
+    def send(self, line):
+        self.sent.append(line)
+        if line.startswith('set '):
+            name, value = line[4:].strip().split('=')
+            self.variables[f'%{name}%'] = value
+            self.pending += line.replace('\n', '\r\n') + '\r\nC:\\>'
+            return
+        begin, command, end = line.strip().split(' & ')
+        for name, value in self.variables.items():
+            begin, end = begin.replace(name, value), end.replace(name, value)
+        output = self.outputs.get(command, [])
+        self.pending += (line.replace('\n', '\r\n') +
+                         f'{begin[5:]} \r\n\x1b[?25l' +
+                         ''.join(f'{out}\r\n' for out in output) +
+                         f'{end[5:]}\r\n\r\nC:\\AutoRAID>')
+
+    def recv_ready(self):
+        return bool(self.pending)
+
+    def recv(self, size):
+        data, self.pending = self.pending[:size], self.pending[size:]
+        return data.encode()
+
+    def exit_status_ready(self):
+        return False
+
+
+def test_cli_session(monkeypatch):
+    '''Commands share one shell and their output is framed by markers'''
+    channel = FakeChannel({'mnv_cli.exe info -o vd < nul': [
+        '', 'VD ID:   0', '', 'Name:     VD_0', '']})
+    client = MagicMock()
+    client.invoke_shell.return_value = channel
+    monkeypatch.setattr('commandline.cli_session.paramiko.SSHClient',
+                        MagicMock(return_value=client))
+    monkeypatch.setattr(WindowsCLI, 'SESSION', True)
+    platform = MockBaseOS(os_type='Windows')
+    platform.api.mode = 'remote'
+    platform.api.remote_ip = '192.168.0.128'
+    platform.api.account = platform.api.password = 'test'
+    platform.api.remote_dir = 'C:\\AutoRAID'
+    windows_cli = WindowsCLI(platform)
+
+    # Blank lines are kept like the CRLF output of command_line
+    expected = ['', 'VD ID: 0', '', 'Name: VD_0', '']
+    assert windows_cli.interpret('info -o vd') == expected
+    assert windows_cli.interpret('info -o vd') == expected
+    assert channel.sent[0] == 'set MNV_CLI_MARK=__MNV_CLI_\n'
+    assert channel.sent[1].split(' & ')[1] == 'cd /d C:\\AutoRAID'
+    # The typed lines never hold the markers the output is framed by
+    assert '__MNV_CLI_1B' not in ''.join(channel.sent)
+    client.connect.assert_called_once()
+    platform.api.command_line.original.assert_not_called()
+
+    # Without a usable shell every command is spawned on its own
+    windows_cli.close_session()
+    client.invoke_shell.side_effect = Exception('Channel open failed')
+    platform.api.command_line.original.return_value = ['spawned']
+    assert windows_cli.interpret('info -o vd') == ['spawned']
+    assert windows_cli.interpret('info -o vd') == ['spawned']
+    assert client.invoke_shell.call_count == 2
+
+
+def test_smart_poller(monkeypatch):
+    '''Counter samples become per-interval deltas, rates and a summary'''
+    platform = MockBaseOS(os_type='Windows')
+    windows_cli = WindowsCLI(platform)
+    sample = SMARTParser.parse(SMART_OUTPUT, BackendSMARTInfo)
+    # PD 2 fails to answer the last poll
+    written = {'1': iter([0, 2048, 6144]), '2': iter([0, 1024])}
+    monkeypatch.setattr(windows_cli, 'get_all_backend_smart_info',
+                        lambda pd_ids: {pd_id: BackendSMARTInfo(**dict(
+                            vars(sample), data_units_written=units,
+                            host_write_commands=0))
+                            for pd_id in pd_ids
+                            for units in [next(written[pd_id], None)]
+                            if units is not None})
+    monkeypatch.setattr(windows_cli, 'get_controller_smart_info',
+                        MagicMock(side_effect=ValueError('busy')))
+    clock = iter([0.0, 10.0, 20.0])
+    monkeypatch.setattr('commandline.smart_poller.time',
+                        SimpleNamespace(time=lambda: next(clock)))
+
+    poller = windows_cli.smart_poller(['1', '2'], interval=10)
+    for _ in range(3):
+        poller.sample()
+
+    deltas = poller.deltas()
+    assert list(deltas['interval']) == [10.0, 10.0]
+    assert list(deltas['1.data_units_written']) == [2048.0, 4096.0]
+    assert np.isnan(deltas['2.data_units_written'][1])
+    rates = poller.rates()
+    assert rates['1.write_bw'][1] == pytest.approx(4096 * 512000 / 2 ** 20
+                                                   / 10)
+    assert list(rates['1.write_iops']) == [0.0, 0.0]
+
+    summary = poller.summary((0.0, 0.0, 200.0, 51200.0, {}))
+    assert summary['1.write_bw'] == pytest.approx(
+        6144 * 512000 / 2 ** 20 / 20)
+    assert summary['2.write_bw'] == pytest.approx(
+        1024 * 512000 / 2 ** 20 / 10)
+    assert summary['write_amplification'] == pytest.approx(
+        (summary['1.write_bw'] + summary['2.write_bw']) / 200.0)
+
+
+def test_get_all_backend_smart_info():
+    '''All PDs are queried in one invocation with per-PD errors'''
+    platform = MockBaseOS(os_type='Windows')
+    platform.api.virtual_drive = [SimpleNamespace(pds=[2, 1]),
+                                  SimpleNamespace(pds=[3])]
+    windows_cli = WindowsCLI(platform)
+    marker = WindowsCLI.BATCH_MARKER
+    platform.api.command_line.original.return_value = (
+        SMART_OUTPUT + [marker] +
+        ["-i : invalid NVMe Controller id '2'", marker] + SMART_OUTPUT)
+
+    results = windows_cli.get_all_backend_smart_info()
+
+    composed_cmd = platform.api.command_line.original.call_args[0][1]
+    assert composed_cmd == (
+        '(mnv_cli.exe smart -i 1 & echo __MNV_CLI_NEXT__ & '
+        'mnv_cli.exe smart -i 2 & echo __MNV_CLI_NEXT__ & '
+        'mnv_cli.exe smart -i 3 & echo __MNV_CLI_NEXT__)')
+    assert sorted(results) == ['1', '3']
+    assert results['3'].data_units_read == 24169053
+    assert list(windows_cli.pd_errors) == ['2']
+
+
+def test_get_pd_info():
+    '''One 'info -o pd' is split into the fields of every PD'''
+    with open('config/test_mnv_cli_info.json', encoding='utf-8') as f:
+        recorded = {case['Command']: case['Expected'] for case in json.load(f)}
+    platform = MockBaseOS(os_type='Windows')
+    platform.api.command_line.original.return_value = recorded['info -o pd']
+
+    pds = WindowsCLI(platform).get_pd_info()
+
+    assert list(pds) == ['1', '2']
+    assert pds['2']['Serial'] == 'S4EWNMFN710227E'
+    assert 'Total # of PD' not in pds['2']
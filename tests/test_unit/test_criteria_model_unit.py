@@ -0,0 +1,93 @@
+# Contents of tests/test_unit/test_criteria_model_unit.py
+'''Copyright (c) 2024 Jaron Cheng'''
+import statistics
+from unittest.mock import MagicMock
+import pytest
+from storage.performance import BasePerf
+from unit.criteria_model import CriteriaFactory
+from unit.criteria_model import EWMAModel
+from unit.criteria_model import MedianMADModel
+from unit.criteria_model import PercentileModel
+from unit.criteria_model import TrimmedModel
+from unit.perf_statistics import PerfStatistics
+
+HISTORY = [100.0, 102.0, 98.0, 101.0, 99.0, 100.0, 5.0, 103.0, 97.0, 100.0]
+
+
+def test_percentile_model_matches_legacy_band():
+    '''Same band as percentile ± std_dev × CFL with the minimum fallback'''
+    model = PercentileModel(upper_factor=3, lower_factor=10)
+    model.extend(HISTORY)
+    std_dev = statistics.pstdev(HISTORY)
+
+    lower, upper = model.limits()
+    assert upper == pytest.approx(103.0 + 3 * std_dev)
+    assert lower == 5.0
+
+
+def test_robust_models_ignore_outlier():
+    '''A single bad run barely moves the median/MAD and trimmed bands'''
+    for model in (MedianMADModel(), TrimmedModel(trim=0.1)):
+        model.extend(HISTORY)
+        lower, upper = model.limits()
+        assert 90 < lower < 100 < upper < 110
+
+
+def test_ewma_model_tracks_drift():
+    '''The EWMA band follows a shift of the recent runs'''
+    model = EWMAModel(alpha=0.3)
+    model.extend([100.0] * 20 + [120.0] * 20)
+    lower, upper = model.limits()
+    assert lower < 120.0 < upper
+    assert lower > 100.0
+    with pytest.raises(ValueError):
+        EWMAModel().limits()
+
+
+def test_factory_and_incremental_engine():
+    '''Engine limits are kept up to date as new runs are added'''
+    with pytest.raises(ValueError):
+        CriteriaFactory('unknown')
+
+    mdb = MagicMock()
+    mdb.fetch_metric_samples.return_value = [
+        {'write_pattern': 0, 'io_depth': 1, 'read_iops': value}
+        for value in HISTORY
+    ]
+    engine = PerfStatistics.from_mongo(mdb, 'io_depth',
+                                       model=CriteriaFactory('median_mad'))
+    before = engine.criteria(0, 1)['limits']['read_iops']
+    assert 'write_iops' not in engine.criteria(0, 1)['limits']
+
+    engine.add_sample({'write_pattern': 0, 'io_depth': 1, 'read_iops': 130.0})
+    criteria = engine.criteria(0, 1)
+    assert criteria['limits']['read_iops'] != before
+    assert criteria['max_read_iops'] == 130.0
+    assert len(engine) == len(HISTORY) + 1
+
+
+def test_percentile_factors_per_metric():
+    '''Write metrics get the write CFL factors of BasePerf'''
+    factory = CriteriaFactory('percentile',
+                              metric_options=BasePerf.cfl_factors())
+    read, write = factory.initiate('read_iops'), factory.initiate('write_bw')
+    assert read.lower_factor == BasePerf.READ_L_CFL == 10
+    assert write.lower_factor == BasePerf.WRITE_L_CFL == 7
+    assert factory.initiate().lower_factor == 10
+
+
+def test_sorted_model_caches_band(monkeypatch):
+    '''The band is computed once per update however often it is read'''
+    model = MedianMADModel()
+    model.extend(HISTORY)
+    calls = []
+    band = model._band
+    monkeypatch.setattr(model, '_band', lambda: calls.append(1) or band())
+    first = model.limits()
+    assert model.limits() == first
+    assert len(calls) == 1
+
+    model.update(100.0)
+    model.limits()
+    assert len(calls) == 2
+    assert model._sorted == sorted(HISTORY + [100.0])
@@ -0,0 +1,129 @@
+# Content of tests/test_unit/test_device_changlong_unit.py
+'''Copyright (c) 2025 Jaron Cheng'''
+import json
+from types import SimpleNamespace
+import pytest
+from device.changlong import Changlong
+from device.changlong import ControllerInfoParser
+from device.changlong import VirtualDriveInfoParser
+from device.rebuild_monitor import RebuildMonitor
+from interface.application import EndPoint
+from interface.application import RootComplex
+
+with open('config/test_mnv_cli_info.json', 'r', encoding='utf-8') as f:
+    INFO = {case['Command']: case['Expected'] for case in json.load(f)}
+
+
+class MockCLI:
+    """Mock mnv_cli returning the recorded outputs."""
+    def __init__(self, outputs):
+        self.outputs = outputs
+        self.commands = []
+
+    def interpret(self, command):
+        self.commands.append(command)
+        return list(self.outputs[command])
+
+
+def test_controller_info_parser():
+    """The hba output is parsed into typed fields and PCIe devices."""
+    controller = ControllerInfoParser.parse(INFO['info -o hba'])
+    assert controller.bus_device_func == '04:00.00'
+    assert controller.revision_id == 'B0B'
+    assert controller.max_pd_of_per_vd == 2
+    assert controller.supported_raid_mode == ['RAID0', 'RAID1', 'JBOD']
+    assert controller.root_complexes == [
+        RootComplex(id=0, link_width='4x', pcie_speed='8Gb/s'),
+        RootComplex(id=1, link_width='4x', pcie_speed='8Gb/s')]
+    assert controller.end_points == [
+        EndPoint(id=0, link_width='4x', pcie_speed='8Gb/s')]
+    assert ControllerInfoParser.parse([]).max_vd == 0
+
+
+def test_controller_info_memo():
+    """An unchanged output returns the parsed controller again."""
+    cli = MockCLI(dict(INFO))
+    changlong = Changlong(cli)
+    first = changlong.controller_info
+    assert changlong.controller_info is first
+    cli.outputs['info -o hba'] = [
+        'Firmware Version: 1.0.0.1054' if line.startswith('Firmware')
+        else line for line in INFO['info -o hba']]
+    changed = changlong.controller_info
+    assert changed is not first
+    assert changed.firmware_version == '1.0.0.1054'
+    assert cli.commands == ['info -o hba'] * 3
+
+
+def test_virtual_drive_info():
+    """Every VD block is parsed, and only changed VDs are reported."""
+    two_vds = (INFO['info -o vd'][:-3] + [
+        'BGA progress: Rebuilding is running in 5%', '', 'VD ID: 2',
+        'Name: VD_1', 'Status: Degrade', 'PDs: ? 2', '',
+        'Total # of VD: 2', ''])
+    cli = MockCLI({'info -o vd': two_vds})
+    changlong = Changlong(cli)
+    drives = changlong.virtual_drive_info
+    assert [drive.vd_id for drive in drives] == [1, 2]
+    assert drives[0].pds == [1, 2]
+    assert drives[0].bga_progress == 'Rebuilding is running in 5%'
+    assert drives[1].pds == [2]
+    assert drives[1].pd_count == 0
+    assert {drive.total_of_vd for drive in drives} == {2}
+    assert changlong.poll_virtual_drives() == {}
+
+    cli.outputs['info -o vd'] = [
+        line.replace('5%', '6%') for line in two_vds]
+    changed = changlong.poll_virtual_drives()
+    assert list(changed) == [1]
+    assert changed[1].bga_progress == 'Rebuilding is running in 6%'
+
+    cli.outputs['info -o vd'] = INFO['info -o vd']
+    changed = changlong.poll_virtual_drives()
+    assert changed[2] is None
+    assert changed[1].bga_progress == ''
+    assert len(changlong.virtual_drive_info) == 1
+
+
+class MockSwitch:
+    """Mock device whose VD reports the given BGA progress in turn."""
+    def __init__(self, progress):
+        self.drive = VirtualDriveInfoParser.parse(INFO['info -o vd'])[1]
+        self.progress = iter(progress)
+
+    @property
+    def virtual_drive_info(self):
+        self.drive.bga_progress = next(self.progress)
+        return [self.drive]
+
+
+def test_rebuild_monitor(monkeypatch):
+    """The rate is fitted to the progress and the polls adapt to the ETA."""
+    clock = iter(range(0, 1000, 10))
+    monkeypatch.setattr('device.rebuild_monitor.time', SimpleNamespace(
+        time=lambda: next(clock), monotonic=lambda: 0))
+    switch = MockSwitch([f'Rebuilding is running in {percent}%'
+                         for percent in (0, 10, 20)] + [''])
+    monitor = RebuildMonitor(switch, vd_id=1, min_interval=1,
+                             max_interval=30)
+    assert monitor.next_interval() == 1
+    for _ in range(3):
+        monitor.sample()
+    assert monitor.activity == 'Rebuilding'
+    assert monitor.rate() == pytest.approx(1.0)
+    assert monitor.eta() == pytest.approx(80)
+    assert monitor.throughput() == pytest.approx(931 * 1024 / 100)
+    assert monitor.next_interval() == pytest.approx(8)
+
+    assert monitor.sample() is None
+    summary = monitor.summary()
+    assert summary['finished']
+    assert summary['progress'] == 100
+    assert summary['duration'] == 30
+    assert summary['eta'] == 0
+
+    monitor = RebuildMonitor(MockSwitch(['Media Patrol is running in 50%',
+                                         '']), min_interval=0)
+    summary = monitor.run(timeout=60)
+    assert summary['activity'] == 'Media Patrol'
+    assert summary['finished']
@@ -0,0 +1,58 @@
+'''Unit tests for golden.py'''
+from unit.golden import GoldenCache
+from unit.golden import GoldenOutput
+from unit.golden import compare_output
+
+EXPECTED = [
+    "",
+    "VD ID: 1",
+    "Status: Rebuilding",
+    "re:size: \\d+ GB",
+    "BGA progress: Rebuilding is running in 0%",
+    "",
+    "Total # of VD: 1",
+    ""
+]
+
+
+def test_compare_output_match():
+    """Regex and volatile lines match, blank lines are compared."""
+    actual = ["", "VD ID: 1", "Status: Rebuilding", "size: 931 GB",
+              "BGA progress: Rebuilding is running in 37%", "",
+              "Total # of VD: 1", ""]
+    assert compare_output(actual, EXPECTED) is None
+    assert compare_output([line for line in actual if line], EXPECTED)
+    # Only the exact volatile fields are masked
+    assert compare_output(["Date: 2024-01-02"], ["Date: 2024-01-01"])
+
+
+def test_compare_output_diff():
+    """Only the real difference is reported."""
+    actual = ["", "VD ID: 1", "Status: Degrade", "size: 931 GB",
+              "BGA progress: Rebuilding is running in 37%", "",
+              "Total # of VD: 1", ""]
+    diff = compare_output(actual, EXPECTED)
+    assert diff.startswith('First mismatch at line 2')
+    changed = [line for line in diff.splitlines()[3:]
+               if line[:1] in '+-']
+    assert changed == ['-Status: Rebuilding', '+Status: Degrade']
+    # A volatile key still compares its text
+    assert compare_output(
+        ["BGA progress: Initializing is running in 0%"],
+        ["BGA progress: Rebuilding is running in 0%"])
+    assert compare_output(["VD ID: 1"], ["VD ID: 1", "Name: VD_0"])
+
+
+def test_golden_cache():
+    """Outputs differing only in volatile numbers share the verdict."""
+    golden = GoldenOutput(EXPECTED)
+    actual = ["", "VD ID: 1", "Status: Rebuilding", "size: 931 GB",
+              "BGA progress: Rebuilding is running in 5%", "",
+              "Total # of VD: 1", ""]
+    cache = GoldenCache()
+    assert cache.compare(golden, actual) is None
+    assert golden.fingerprint(actual) == golden.fingerprint(
+        actual[:4] + ["BGA progress: Rebuilding is running in 6%"] +
+        actual[5:])
+    assert golden.fingerprint(actual) in cache.verdicts
+    assert cache.compare(golden, actual) is None
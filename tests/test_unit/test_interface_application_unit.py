@@ -169,6 +169,34 @@ def test_ftp_command_windows(mock_base_interface_config):
         mock_sftp.put.assert_called_once_with("test_file.txt", expected_path)
 
 
+# 測試 io_stream 方法
+def test_io_stream_windows(mock_base_interface_config):
+    mock_config_content = json.dumps(mock_base_interface_config)
+
+    with patch("builtins.open", mock_open(read_data=mock_config_content)), \
+         patch("paramiko.SSHClient") as mock_ssh_client, \
+         patch("interface.application.BaseInterface._get_local_ip",
+               return_value="192.168.0.100"):
+
+        client = mock_ssh_client.return_value
+        stdout = MagicMock()
+        stdout.readline.side_effect = ["line 1\r\n", "line 2\r\n", ""]
+        client.exec_command.return_value = (None, stdout, None)
+
+        interface = WindowsInterface(
+            mode="remote",
+            if_name="eth0",
+            ssh_port="22",
+            config_file="test_config.json"
+        )
+
+        stream = interface.io_stream("typeperf")
+        assert next(stream) == "line 1"
+        stream.close()
+        client.close.assert_called_once()
+        assert client.connect.call_args.kwargs["port"] == 22
+
+
 # 測試 command_line 方法
 def test_command_line_windows(mock_base_interface_config):
     mock_config_content = json.dumps(mock_base_interface_config)
@@ -1,8 +1,10 @@
 # Contents of tests/test_json_handler.py
 '''Unit tests for json_handler.py'''
 import json
+import os
 from unittest.mock import mock_open
 from unittest.mock import patch
+from unit.json_handler import VectorRepository
 from unit.json_handler import load_and_sort_json
 
 
@@ -62,3 +64,44 @@ def test_load_and_sort_json_empty_array():
     with patch("builtins.open", mock_open(read_data=mock_data)):
         result = load_and_sort_json("empty_array.json", "age")
         assert result == []
+
+
+def test_vector_repository(tmp_path):
+    """Collection needs only the stored order, vectors load on use."""
+    vector_file = tmp_path / "vectors.json"
+    vector_file.write_text(json.dumps([{"ID": 1}, {"ID": 0}]))
+    config_files = {"sorted": (str(vector_file), "ID"),
+                    "unsorted": (str(vector_file), None),
+                    "missing": (str(tmp_path / "missing.json"), "ID")}
+    cache_dir = str(tmp_path / "cache")
+    repository = VectorRepository(config_files, cache_dir)
+    assert list(repository) == ["sorted", "unsorted", "missing"]
+    cases = repository.cases("sorted")
+    assert [case.position for case in cases] == [0, 1]
+    assert not repository._data
+    assert cases[0].resolve() == {"ID": 0}
+    assert repository["unsorted"] == [{"ID": 1}, {"ID": 0}]
+    assert repository["missing"] == []
+    assert repository.cases("missing") == []
+
+    # The index holds the order only and is stored once
+    VectorRepository._save()
+    with open(repository.cache_path, encoding="utf-8") as f:
+        index = json.load(f)
+    assert index[f"{vector_file}:ID"]["order"] == [1, 0]
+    assert "data" not in index[f"{vector_file}:ID"]
+
+    # A new process collects without reading the unchanged file
+    VectorRepository._indexes.clear()
+    with patch.object(VectorRepository, "_read") as read:
+        again = VectorRepository(config_files, cache_dir)
+        assert len(again.cases("sorted")) == 2
+        read.assert_not_called()
+
+    stat = vector_file.stat()
+    vector_file.write_text(json.dumps([{"ID": 3}, {"ID": 2}, {"ID": 4}]))
+    os.utime(vector_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert VectorRepository(config_files, cache_dir)["sorted"] == [
+        {"ID": 2}, {"ID": 3}, {"ID": 4}]
+    VectorRepository._indexes.clear()
+    VectorRepository._dirty.clear()
@@ -134,6 +134,19 @@ class TestMongoDB:
         mock_collection.update_one.assert_called_once_with(
             filter_query, {'$set': update_values})
 
+    def test_upsert_document(self, mongo_db):
+        """Test the upsert_document method to confirm that the matching
+        document is replaced, or inserted if there is none.
+        """
+        mongo_db_instance, mock_collection = mongo_db
+        filter_query = {"soak": {"id": 1}}
+        document = {"soak": {"id": 1}, "segments": []}
+
+        mongo_db_instance.upsert_document(filter_query, document)
+
+        mock_collection.replace_one.assert_called_once_with(
+            filter_query, document, upsert=True)
+
     def test_delete_document(self, mongo_db):
         """Test the delete_document method to confirm that specified documents
         are deleted in MongoDB.
@@ -185,3 +198,23 @@ class TestMongoDB:
 
         if result:
             logger.debug('metrics = %s', json.dumps(result, indent=4))
+
+    def test_fetch_metric_samples(self, mongo_db):
+        """Test the fetch_metric_samples method to verify the per-key filter
+        and grouping are dropped and the samples are sorted by creation time.
+        """
+        mongo_db_instance, mock_collection = mongo_db
+        mock_collection.aggregate.reset_mock()
+        mock_collection.aggregate.return_value = [
+            {"write_pattern": 0, "io_depth": 1, "read_iops": 100.0}]
+
+        result = mongo_db_instance.fetch_metric_samples(
+            'config/pipeline_rdn_perf.json')
+
+        pipeline = mock_collection.aggregate.call_args[0][0]
+        assert not any("$group" in stage for stage in pipeline)
+        assert not any("$match" in stage and "io_depth" in stage["$match"]
+                       for stage in pipeline)
+        assert pipeline[0]["$project"]["report.created"] == 1
+        assert pipeline[-1] == {"$sort": {"created": 1}}
+        assert result == mock_collection.aggregate.return_value
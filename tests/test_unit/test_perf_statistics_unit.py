@@ -0,0 +1,66 @@
+# Contents of tests/test_unit/test_perf_statistics_unit.py
+'''Copyright (c) 2024 Jaron Cheng'''
+import statistics
+from unittest.mock import MagicMock
+import pytest
+from unit.perf_statistics import PerfStatistics
+
+SAMPLES = [
+    {"write_pattern": 0, "io_depth": 1, "read_iops": 100.0,
+     "read_bw": 0.4, "write_iops": None, "write_bw": None},
+    {"write_pattern": 0, "io_depth": 1, "read_iops": 120.0,
+     "read_bw": 0.5, "write_iops": None, "write_bw": None},
+    {"write_pattern": 100, "io_depth": 1, "read_iops": None,
+     "read_bw": None, "write_iops": 300.0, "write_bw": 1.2},
+    {"write_pattern": 0, "io_depth": 1, "read_iops": 110.0,
+     "read_bw": 0.45, "write_iops": None, "write_bw": None},
+    {"write_pattern": 100, "io_depth": 1, "read_iops": None,
+     "read_bw": None, "write_iops": 280.0, "write_bw": 1.1},
+    {"write_pattern": None, "io_depth": 1, "read_iops": 999.0},
+]
+
+
+class TestPerfStatistics:
+    '''Test cases for the vectorized statistics engine'''
+
+    @pytest.fixture(scope="function")
+    def engine(self):
+        '''Engine loaded with a mocked MongoDB sample query'''
+        mdb = MagicMock()
+        mdb.fetch_metric_samples.return_value = SAMPLES
+        engine = PerfStatistics.from_mongo(mdb, 'io_depth')
+        mdb.fetch_metric_samples.assert_called_once_with(
+            'config/pipeline_rdn_perf.json')
+        return engine
+
+    def test_criteria_match_reference(self, engine):
+        '''The grouped statistics match a per-key reference computation'''
+        criteria = engine.criteria(0, 1)
+        reference = [100.0, 120.0, 110.0]
+
+        assert criteria['_id'] == {'write_pattern': 0, 'io_depth': 1}
+        assert criteria['percentile_read_iops'] == [120.0]
+        assert criteria['avg_read_iops'] == pytest.approx(110.0)
+        assert criteria['min_read_iops'] == 100.0
+        assert criteria['max_read_iops'] == 120.0
+        assert criteria['std_dev_read_iops'] == pytest.approx(
+            statistics.pstdev(reference))
+        assert criteria['percentile_write_iops'] == [None]
+        assert criteria['min_write_iops'] is None
+
+        write = engine.criteria(100, 1)
+        assert write['min_write_bw'] == pytest.approx(1.1)
+        assert write['std_dev_write_iops'] == pytest.approx(10.0)
+
+    def test_samples_and_missing_key(self, engine):
+        '''Samples keep the load order and unknown keys return nothing'''
+        assert len(engine) == 5
+        assert list(engine.samples(0, 1, 'read_iops')) == [100.0, 120.0,
+                                                          110.0]
+        assert engine.criteria(0, 32) is None
+        assert engine.samples(0, 32, 'read_iops').size == 0
+
+    def test_unsupported_key(self):
+        '''Only io_depth and block_size are backed by a pipeline'''
+        with pytest.raises(ValueError):
+            PerfStatistics.from_mongo(MagicMock(), 'ramp_times')
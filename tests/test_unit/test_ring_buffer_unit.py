@@ -0,0 +1,34 @@
+# Contents of tests/test_unit/test_ring_buffer_unit.py
+'''Copyright (c) 2024 Jaron Cheng'''
+import math
+import pytest
+from unit.ring_buffer import ColumnarRingBuffer
+
+
+def test_ring_buffer_wraps_in_time_order():
+    '''The oldest rows are overwritten and columns stay time ordered'''
+    ring = ColumnarRingBuffer(('timestamp', 'iops'), capacity=3)
+    for second in range(5):
+        ring.append(timestamp=second, iops=second * 10)
+
+    assert len(ring) == 3
+    assert list(ring.column('timestamp')) == [2, 3, 4]
+    assert list(ring.column('iops')) == [20, 30, 40]
+
+    ring.append(timestamp=5)
+    assert math.isnan(ring.column('iops')[-1])
+    with pytest.raises(KeyError):
+        ring.append(unknown=1)
+
+
+def test_ring_buffer_save_and_load(tmp_path):
+    '''A persisted buffer is loaded back with the same columns'''
+    ring = ColumnarRingBuffer(('timestamp', 'iops'), capacity=4)
+    for second in range(6):
+        ring.append(timestamp=second, iops=second)
+    path = str(tmp_path / 'ring.npz')
+    ring.save(path)
+
+    loaded = ColumnarRingBuffer.load(path)
+    assert len(loaded) == 4
+    assert list(loaded.column('timestamp')) == [2, 3, 4, 5]
@@ -1,16 +1,26 @@
 # Content of tests/test_unit/test_storage_partitioning_unit.py
 '''Copyright (c) 2025 Jaron Cheng'''
+import base64
+import json
 from unittest.mock import MagicMock
+from unittest.mock import mock_open
 from unittest.mock import patch
 import pytest
+from storage.partitioning import LinuxVolume
 from storage.partitioning import WindowsVolume
+from storage.volume_cache import VolumeMapCache
 # from amd64.nvme import AMD64NVMe
+from system.amd64 import AMD64Linux
 from system.amd64 import AMD64Windows
 
 
 @pytest.fixture
-def mock_windows_platform():
+def mock_windows_platform(tmp_path, monkeypatch):
     """Fixture to create a mocked AMD64NVMe platform for Windows tests."""
+    # Keep scripts and the volume map cache out of the working tree
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(VolumeMapCache, 'CACHE_DIR',
+                        str(tmp_path / '.volume_map'))
     mock_platform = MagicMock(spec=AMD64Windows)
     mock_platform.api = MagicMock()
     mock_platform.api.remote_dir = "/remote/dir"
@@ -19,10 +29,15 @@ def mock_windows_platform():
     mock_platform.api.password = "password"
     mock_platform.api.script_name = "diskpart_script.txt"
 
-    # Mock command_line to return a valid dictionary
+    # Mock command_line to return the layout of a partitioned disk
     mock_platform.api.command_line.return_value = {
-        0: "0 Marvell_NVMe_Controller 1234567890"
+        0: json.dumps({"Number": 0, "SerialNumber": "1234567890 ",
+                       "Size": 1024 * 2**30,
+                       "Partitions": [{"PartitionNumber": 1,
+                                       "DriveLetter": "D",
+                                       "Size": 1024 * 2**30}]})
     }
+    mock_platform.api.nvme_controller.vid = '0x1b4b'
 
     mock_platform.disk_num = 0
     mock_platform.memory_size = 512
@@ -126,3 +141,192 @@ def test_create_partition_failure(mock_windows_platform):
     with pytest.raises(Exception,
                        match="Error during creation of diskpart script"):
         windows_volume.create_partition()
+
+
+def test_query_layout(mock_windows_platform):
+    """Disk number, serial number and capacity come from one query."""
+    windows_volume = WindowsVolume(mock_windows_platform, 'gpt', 'ntfs')
+
+    command = mock_windows_platform.api.command_line.call_args_list[0][0][0]
+    encoded = command.split('-EncodedCommand ')[1]
+    query = base64.b64decode(encoded).decode('utf-16-le')
+    assert "FriendlyName -match 'Marvell'" in query
+    assert mock_windows_platform.api.command_line.call_count == 1
+
+    assert windows_volume.disk_num == 0
+    assert windows_volume.serial_num == "1234567890"
+    assert windows_volume.disk_capacity == 1024
+    assert windows_volume.partition_num == 1
+
+
+def test_create_partition_volume_map(mock_windows_platform):
+    """The volume map is read from the diskpart execution itself."""
+    mock_windows_platform.api.ftp_command = MagicMock()
+    layout = {"Number": 0, "SerialNumber": "1234567890", "Size": 2**40,
+              "Partitions": [
+                  {"PartitionNumber": 1, "DriveLetter": "\u0000",
+                   "Size": 16 * 2**20},
+                  {"PartitionNumber": 2, "DriveLetter": "D",
+                   "Size": 1024 * 2**30}]}
+    mock_windows_platform.api.command_line.original.return_value = [
+        "DiskPart successfully assigned the drive letter or mount point.",
+        json.dumps(layout)]
+
+    windows_volume = WindowsVolume(mock_windows_platform, 'gpt', 'ntfs')
+    assert windows_volume.disk_info == [("D", "1 TB")]
+    assert windows_volume.create_partition() is True
+
+    command = mock_windows_platform.api.command_line.original.call_args[0][1]
+    assert command.startswith("diskpart /s diskpart_script.txt & powershell")
+    assert windows_volume.disk_info == [("No Drive Letter", "16 MB"),
+                                        ("D", "1 TB")]
+    assert mock_windows_platform.api.command_line.call_count == 1
+
+
+def test_parse_layout_single_partition():
+    """A lone partition is not wrapped in an array by ConvertTo-Json."""
+    layout = WindowsVolume.parse_layout(
+        '{"Number": 2, "Partitions": {"DriveLetter": "E", "Size": 1}}')
+    assert layout["Partitions"] == [{"DriveLetter": "E", "Size": 1}]
+    assert WindowsVolume.parse_layout("No disks found.") is None
+
+
+def test_create_partition_parallel_format(mock_windows_platform):
+    """Partitions are created unformatted, then formatted in timed jobs."""
+    mock_windows_platform.api.ftp_command = MagicMock()
+    mock_windows_platform.api.command_line.original.return_value = [
+        "DiskPart successfully assigned the drive letter or mount point.",
+        '[{"DriveLetter":"D","Seconds":1.5},'
+        '{"DriveLetter":"E","Seconds":2.25}]',
+        '{"Number": 0, "Size": 137438953472, "Partitions": ['
+        '{"DriveLetter": "D", "Size": 68719476736},'
+        '{"DriveLetter": "E", "Size": 68719476736}]}']
+    windows_volume = WindowsVolume(mock_windows_platform, 'gpt', 'ntfs')
+
+    with patch("builtins.open", mock_open()) as script:
+        assert windows_volume.create_partition(parallel_format=True)
+    written = script().write.call_args_list[0][0][0]
+    assert "assign" in written
+    assert "format" not in written
+
+    command = mock_windows_platform.api.command_line.original.call_args[0][1]
+    assert command.count("-EncodedCommand") == 2
+    assert windows_volume.format_times == {"D": 1.5, "E": 2.25}
+    assert windows_volume.disk_info == [("D", "64 GB"), ("E", "64 GB")]
+
+
+SYSFS_EMPTY = [
+    "/sys/block/nvme0n1/device/device/vendor:0x144d",
+    "/sys/block/nvme0n1/size:1000215216",
+    "/sys/block/nvme1n1/device/device/vendor:0x1b4b",
+    "/sys/block/nvme1n1/device/serial:0050_43C5_0E00_0001.   ",
+    "/sys/block/nvme1n1/size:268435456",
+    "/dev/nvme0n1p2 / ext4 rw,relatime 0 0",
+]
+SYSFS_PARTITIONED = SYSFS_EMPTY[:-1] + [
+    "/sys/block/nvme1n1/nvme1n1p2/size:134217728",
+    "/sys/block/nvme1n1/nvme1n1p1/size:134217728",
+    "/dev/nvme1n1p1 /mnt/nvme1n1p1 ext4 rw,relatime 0 0",
+    "/dev/nvme1n1p2 /mnt/nvme1n1p2 ext4 rw,relatime 0 0",
+]
+
+
+@pytest.fixture
+def mock_linux_platform(tmp_path, monkeypatch):
+    """Fixture to create a mocked Linux platform with 32 GB of memory."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(VolumeMapCache, 'CACHE_DIR',
+                        str(tmp_path / '.volume_map'))
+    mock_platform = MagicMock(spec=AMD64Linux)
+    mock_platform.api = MagicMock()
+    mock_platform.api.nvme_controller.vid = '0x1b4b'
+    mock_platform.memory_size = 32
+    return mock_platform
+
+
+def test_linux_volume_create_partition(mock_linux_platform, tmp_path):
+    """An unpartitioned namespace is partitioned, formatted and mounted."""
+    mock_linux_platform.api.command_line.original.side_effect = [
+        SYSFS_EMPTY, ["Script done."] + SYSFS_PARTITIONED]
+
+    linux_volume = LinuxVolume(mock_linux_platform, 'gpt', 'ntfs')
+
+    assert linux_volume.disk_num == 'nvme1n1'
+    assert linux_volume.serial_num == '0050_43C5_0E00_0001.'
+    assert linux_volume.file_system == 'ext4'
+    assert linux_volume.partition_num == 2
+    assert linux_volume.disk_info == [('/mnt/nvme1n1p1', '64 GB'),
+                                      ('/mnt/nvme1n1p2', '64 GB')]
+
+    script = (tmp_path / LinuxVolume.SCRIPT_NAME).read_text()
+    assert script.count('size=64GiB, type=linux') == 2
+    assert 'mkfs -t ext4 -F -q "$part" &' in script
+    mock_linux_platform.api.ftp_command.assert_called_once_with(
+        LinuxVolume.SCRIPT_NAME, LinuxVolume.SCRIPT_NAME)
+    command = mock_linux_platform.api.command_line.original.call_args[0][1]
+    assert command.startswith(f'sudo sh {LinuxVolume.SCRIPT_NAME}; ')
+
+
+def test_linux_volume_existing_partitions(mock_linux_platform):
+    """Mounted partitions are reused without partitioning again."""
+    mock_linux_platform.api.command_line.original.return_value = \
+        SYSFS_PARTITIONED
+
+    linux_volume = LinuxVolume(mock_linux_platform)
+
+    assert [path for path, _ in linux_volume.disk_info] == \
+        ['/mnt/nvme1n1p1', '/mnt/nvme1n1p2']
+    mock_linux_platform.api.ftp_command.assert_not_called()
+
+
+def test_linux_volume_remounts_partitions(mock_linux_platform):
+    """Partitions unmounted by a reboot are mounted, not wiped."""
+    mock_linux_platform.api.command_line.original.side_effect = [
+        SYSFS_PARTITIONED[:-2], SYSFS_PARTITIONED]
+
+    linux_volume = LinuxVolume(mock_linux_platform)
+
+    assert [path for path, _ in linux_volume.disk_info] == \
+        ['/mnt/nvme1n1p1', '/mnt/nvme1n1p2']
+    command = mock_linux_platform.api.command_line.original.call_args[0][1]
+    assert command.startswith("sudo sh -c 'mkdir -p /mnt/nvme1n1p1 && "
+                              "mount /dev/nvme1n1p1 /mnt/nvme1n1p1; ")
+    assert 'sfdisk' not in command
+    mock_linux_platform.api.ftp_command.assert_not_called()
+
+
+def test_volume_map_cache(mock_windows_platform):
+    """A second setup reuses the stored volume map until invalidated."""
+    first = WindowsVolume(mock_windows_platform, 'gpt', 'ntfs')
+    calls = mock_windows_platform.api.command_line.call_count
+
+    # Only the serial of the stored disk is probed
+    second = WindowsVolume(mock_windows_platform, 'gpt', 'ntfs')
+    assert mock_windows_platform.api.command_line.call_count == calls + 1
+    assert (second.disk_num, second.serial_num, second.disk_info) == \
+        (first.disk_num, first.serial_num, first.disk_info)
+
+    assert VolumeMapCache.changes_topology('vd -a delete -i 1')
+    assert VolumeMapCache.changes_topology('rebuild -a start -i 0 -d 1')
+    assert not VolumeMapCache.changes_topology('info -o vd')
+    assert not VolumeMapCache.changes_topology('reset -i 1 -t perstn -a on')
+    VolumeMapCache(mock_windows_platform.api.remote_ip).invalidate()
+    WindowsVolume(mock_windows_platform, 'gpt', 'ntfs')
+    assert mock_windows_platform.api.command_line.call_count == calls + 2
+
+
+def test_volume_map_cache_serial(mock_windows_platform, tmp_path):
+    """A stored entry is rejected once its disk reports another serial."""
+    WindowsVolume(mock_windows_platform, 'gpt', 'ntfs')
+    cache = VolumeMapCache(mock_windows_platform.api.remote_ip)
+    assert cache.cache_path.startswith(str(tmp_path / '.volume_map'))
+
+    mock_windows_platform.api.command_line.return_value = {
+        0: json.dumps({"Number": 0, "SerialNumber": "SWAPPED",
+                       "Size": 1024 * 2**30, "Partitions": []})
+    }
+    calls = mock_windows_platform.api.command_line.call_count
+    swapped = WindowsVolume(mock_windows_platform, 'gpt', 'ntfs')
+    assert swapped.serial_num == "SWAPPED"
+    # The probe, then the full enumeration
+    assert mock_windows_platform.api.command_line.call_count >= calls + 2
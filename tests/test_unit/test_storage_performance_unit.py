@@ -1,7 +1,12 @@
 # Content of tests/test_unit/test_storage_performance_unit.py
 '''Copyright (c) 2025 Jaron Cheng'''
+import json
 import pytest
+from storage.affinity import AffinityPlan
+from storage.perf_sweep import PerfStep
+from storage.performance import LinuxPerf
 from storage.performance import WindowsPerf
+from storage.target_file import WindowsTargetFileManager
 
 
 class MockPlatform:
@@ -146,6 +151,36 @@ Total latency distribution:
         """
 
 
+class RecordingAPI(MockAPI):
+    """Mock API recording every issued command and uploaded file."""
+    remote_dir = "C:\\AutoRAID"
+
+    def __init__(self):
+        self.commands = []
+        self.uploads = []
+
+    def io_command(self, command):
+        self.commands.append(command)
+        output = super().io_command(command)
+        if command.startswith('diskspd -X'):
+            return output + output.replace('timespan 1', 'timespan 2')
+        return output
+
+    def ftp_command(self, str_target_file, remote_name=None):
+        self.uploads.append((str_target_file, remote_name))
+        return True
+
+    def io_stream(self, command):
+        self.commands.append(command)
+        yield 'DISKSPD_PID=4242'
+        yield '"(PDH-CSV 4.0)","\\\\HOST\\LogicalDisk(D:)\\Disk Reads/sec"'
+        yield '"10/19/2024 10:00:00.000"," "," "," "," "'
+        for second in range(60):
+            self.streamed = second + 1
+            yield (f'"10/19/2024 10:00:{second:02d}.000",'
+                   f'"{1000 + second % 3}","4096000","0","0"')
+
+
 @pytest.fixture
 def platform():
     """Fixture for creating a mock platform object."""
@@ -185,3 +220,314 @@ def test_run_io_operation(amd64_perf):
     assert read_iops == 72908.34
     assert write_bw == 0.0
     assert write_iops == 0.0
+
+
+@pytest.fixture
+def sweep_perf(tmp_path, monkeypatch):
+    """Fixture for an AMD64Perf object recording the issued commands."""
+    monkeypatch.chdir(tmp_path)
+    mock_platform = MockPlatform()
+    mock_platform.api = RecordingAPI()
+    return WindowsPerf(mock_platform, "D:\\IO.dat")
+
+
+def test_run_sweep_prepares_once(sweep_perf):
+    """Test that a sweep creates the IO file once and reuses it."""
+    steps = [PerfStep(depth, '4k', '4k', 0, 30) for depth in (1, 2, 4)]
+
+    results = list(sweep_perf.run_sweep(steps, precondition=10))
+
+    commands = sweep_perf._api.commands
+    assert len(commands) == 4
+    assert '-c32G' in commands[0] and '-d10' in commands[0]
+    assert all('-c' not in command for command in commands[1:])
+    assert [step for step, _ in results] == steps
+    assert results[0][1][:2] == (284.80, 72908.34)
+
+
+def test_run_sweep_job_file(sweep_perf):
+    """Test that a job file sweep runs all steps in one invocation."""
+    steps = [PerfStep(32, '128k', None, 0, 30),
+             PerfStep(1, '4k', '4k', 100, 30)]
+
+    results = list(sweep_perf.run_sweep(steps, job_file=True))
+
+    commands = sweep_perf._api.commands
+    assert commands[1] == 'diskspd -XC:\\AutoRAID\\diskspd_profile.xml'
+    assert sweep_perf._api.uploads == [('diskspd_profile.xml',
+                                        'diskspd_profile.xml')]
+    assert len(results) == 2
+    assert all(result[:2] == (284.80, 72908.34) for _, result in results)
+
+    profile = sweep_perf.compose_job_file(steps)
+    assert profile.count('<TimeSpan>') == 2
+    assert '<StrideSize>131072</StrideSize>' in profile
+    assert '<Random>4096</Random>' in profile
+    assert '<WriteRatio>100</WriteRatio>' in profile
+
+
+MULTI_TARGET_OUTPUT = r"""
+Read IO
+thread |       bytes     |     I/Os     |    MiB/s   |  I/O per s |  AvgLat  | IopsStdDev | LatStdDev |  file
+------------------------------------------------------------------------------------------------------------------
+     0 |      1048576000 |       256000 |     100.00 |   25600.00 |    0.094 |     127.09 |     0.311 | E:\IO.dat (32GiB)
+     1 |      1048576000 |       256000 |     100.00 |   25600.00 |    0.094 |     127.09 |     0.311 | E:\IO.dat (32GiB)
+     2 |       524288000 |       128000 |      50.00 |   12800.00 |    0.094 |     127.09 |     0.311 | F:\IO.dat (32GiB)
+     3 |       524288000 |       128000 |      50.00 |   12800.00 |    0.094 |     127.09 |     0.311 | F:\IO.dat (32GiB)
+------------------------------------------------------------------------------------------------------------------
+total:        3145728000 |       768000 |     300.00 |   76800.00 |    0.094 |     127.09 |     0.311
+
+Write IO
+thread |       bytes     |     I/Os     |    MiB/s   |  I/O per s |  AvgLat  | IopsStdDev | LatStdDev |  file
+------------------------------------------------------------------------------------------------------------------
+     0 |               0 |            0 |       0.00 |       0.00 |    0.000 |       0.00 |       N/A | E:\IO.dat (32GiB)
+------------------------------------------------------------------------------------------------------------------
+total:                 0 |            0 |       0.00 |       0.00 |    0.000 |       0.00 |       N/A
+"""
+
+
+def test_run_multi_target(sweep_perf, monkeypatch):
+    """Test per-target breakdown and affinity of a multi-volume run."""
+    monkeypatch.setattr(sweep_perf._api, 'io_command',
+                        lambda command: MULTI_TARGET_OUTPUT)
+    targets = sweep_perf.volume_targets([('E', '32 GB'), ('F', '32 GB'),
+                                         ('No Drive Letter', '16 MB')])
+
+    result = sweep_perf.run_multi_target(targets, 32, '4k', '4k', 0, 30)
+
+    assert targets == ['E:\\IO.dat', 'F:\\IO.dat']
+    assert result['targets']['E:\\IO.dat'] == (200.0, 51200.0, 0.0, 0.0)
+    assert result['targets']['F:\\IO.dat'] == (100.0, 25600.0, 0.0, 0.0)
+    assert result['aggregate'] == (300.0, 76800.0, 0.0, 0.0)
+    assert result['affinity']['E:\\IO.dat'] == list(range(12))
+    assert result['affinity']['F:\\IO.dat'] == list(range(12, 24))
+
+
+CRITERIA = {
+    'percentile_read_iops': [1000.0], 'min_read_iops': 900.0,
+    'std_dev_read_iops': 50.0,
+    'percentile_read_bw': [4.0], 'min_read_bw': 3.5, 'std_dev_read_bw': 1.0,
+}
+
+
+def test_validate_metrics(amd64_perf):
+    '''Legacy confidence factors, overridden by a criteria model band'''
+    assert amd64_perf.metric_limits(CRITERIA, 'read_iops') == (500.0, 1150.0)
+    # 4 - 1 * 10 < 0 falls back to the minimum
+    assert amd64_perf.metric_limits(CRITERIA, 'read_bw') == (3.5, 7.0)
+    amd64_perf.validate_metrics(5.0, 1100.0, 0, 0, CRITERIA)
+
+    banded = dict(CRITERIA, limits={'read_iops': [1050.0, 1200.0]})
+    with pytest.raises(AssertionError):
+        amd64_perf.validate_metrics(5.0, 1000.0, 0, 0, banded)
+
+
+def test_watch_intervals(amd64_perf):
+    '''Verdicts once the confidence interval leaves or enters the band'''
+    samples = [{'read_iops': 1000.0 + index % 3} for index in range(30)]
+    band = {'read_iops': (900.0, 1100.0)}
+    result = amd64_perf.watch_intervals(iter(samples), band)
+    assert result.verdict == 'pass'
+    assert result.intervals == amd64_perf.MIN_INTERVALS
+    assert result.read_iops == pytest.approx(1000.9)
+
+    result = amd64_perf.watch_intervals(iter(samples),
+                                        {'read_iops': (1200.0, 1500.0)})
+    assert result.verdict == 'fail'
+
+    result = amd64_perf.watch_intervals(iter(samples[:5]), band)
+    assert result.verdict == 'complete'
+
+
+def test_run_io_online(sweep_perf):
+    '''An in-band run is stopped early and only its DISKSPD is killed'''
+    sweep_perf._io_file = 'D:\\IO.dat'
+    result = sweep_perf.run_io_online(4, '4k', '4k', 0, 60, CRITERIA)
+
+    assert result.verdict == 'pass'
+    assert result.read_bw == pytest.approx(4096000 / 1024 ** 2)
+    assert sweep_perf._api.streamed < 60
+    stream_command, kill_command = sweep_perf._api.commands
+    assert stream_command.startswith(
+        'powershell -Command "$p = Start-Process diskspd -ArgumentList \'-c')
+    assert '-RedirectStandardOutput diskspd_online.txt' in stream_command
+    assert '"\\LogicalDisk(D:)\\Disk Reads/sec"' in stream_command
+    assert '-sc 65' in stream_command
+    assert kill_command == 'taskkill /F /PID 4242'
+
+
+def test_apply_affinity(sweep_perf):
+    '''An applied plan sets the thread count and the -a affinity'''
+    plan = AffinityPlan('physical_cores', 2, [[0, 2]])
+    sweep_perf.apply_affinity(plan)
+    sweep_perf.run_io_operation(4, '4k', '4k', 0, 30)
+
+    assert ' -t2 ' in sweep_perf._api.commands[-1]
+    assert ' -a0,2 ' in sweep_perf._api.commands[-1]
+    assert sweep_perf.plan_affinity(1) == [[0, 2]]
+
+
+class ProbedAPI(RecordingAPI):
+    """Recording API where the probed IO files exist once filled."""
+    remote_ip = '192.168.0.128'
+
+    def __init__(self):
+        super().__init__()
+        self.created = set()
+
+    def io_command(self, command):
+        if command.startswith('powershell -Command "Get-Item'):
+            self.commands.append(command)
+            return '\n'.join(f'{path}|{32 * 1024 ** 3}'
+                             for path in sorted(self.created))
+        if '-c32G' in command:
+            self.created.add(command.split()[-1])
+        return super().io_command(command)
+
+
+def test_target_files(sweep_perf):
+    '''Files are filled once and preconditioned per workload family'''
+    sweep_perf._api = sweep_perf._platform.api = ProbedAPI()
+    sweep_perf.use_target_files(
+        WindowsTargetFileManager(sweep_perf._platform))
+
+    def preconditions():
+        commands = [command for command in sweep_perf._api.commands
+                    if command.startswith('diskspd -t1 -o32')]
+        sweep_perf._api.commands.clear()
+        return commands
+
+    sweep_perf.run_io_operation(32, '4k', '4k', 0, 30)
+    assert '-c' not in sweep_perf._api.commands[-1]
+    fill, steady = preconditions()
+    assert '-b128k' in fill and '-c32G' in fill
+    assert '-r4k -w100' in steady and '-c' not in steady
+
+    sweep_perf.run_io_operation(32, '4k', '4k', 100, 30)
+    assert not preconditions()
+    sweep_perf.run_io_operation(32, '128k', None, 0, 30)
+    refill, = preconditions()
+    assert '-b128k' in refill and '-c32G' not in refill
+
+    # The metadata survives the session
+    manager = WindowsTargetFileManager(sweep_perf._platform)
+    target = manager.files['D:\\IO.dat']
+    assert (target.fill_state, target.workload,
+            target.last_write_pattern) == ('sequential', 'sequential', 0)
+    sweep_perf._api.created.clear()
+    assert manager.prepare(['D:\\IO.dat', '#1'], 32, None, 0) is False
+    assert '-c32G' in preconditions()[0]
+
+
+def fio_job(name, runtime=30000, read_bytes=0, read_ios=0):
+    """One job of a fio JSON report reading 4k blocks."""
+    seconds = runtime / 1000
+    return {'jobname': name, 'error': 0, 'job_runtime': runtime,
+            'usr_cpu': 1.5, 'sys_cpu': 2.5,
+            'read': {'bw': read_bytes / 1024 / seconds,
+                     'iops': read_ios / seconds, 'io_bytes': read_bytes,
+                     'total_ios': read_ios},
+            'write': {'bw': 0, 'iops': 0, 'io_bytes': 0, 'total_ios': 0}}
+
+
+class FioAPI(RecordingAPI):
+    """Recording API answering like fio."""
+    remote_dir = '/home/test'
+
+    def io_command(self, command):
+        self.commands.append(command)
+        if command.startswith('fio --output-format=json /'):
+            names = ['step0', 'step1']
+        elif command.startswith('fio --output-format=json'):
+            names = [option[7:] for option in command.split()
+                     if option.startswith('--name=')]
+        else:
+            return 'prepare: (groupid=0, jobs=1)'
+        return 'note: both iodepth >= 1 and synchronous I/O engine\n' + \
+            json.dumps({'jobs': [fio_job(name, read_bytes=4096 * 30000,
+                                         read_ios=30000)
+                                 for name in names]}, indent=2)
+
+    def io_stream(self, command):
+        self.commands.append(command)
+        yield 'FIO_PID=4242'
+        for second in range(1, 61):
+            self.streamed = second
+            report = {'jobs': [fio_job('perf', second * 1000,
+                                       second * 4096000,
+                                       second * (1000 + second % 3))]}
+            yield from json.dumps(report, indent=2).splitlines()
+
+
+@pytest.fixture
+def linux_perf(tmp_path, monkeypatch):
+    """Fixture for a LinuxPerf object answering like fio."""
+    monkeypatch.chdir(tmp_path)
+    mock_platform = MockPlatform(cpu_num=4)
+    mock_platform.api = FioAPI()
+    return LinuxPerf(mock_platform, '/mnt/nvme/IO.dat')
+
+
+def test_linux_run_sweep(linux_perf):
+    """A fio sweep lays out the file once and runs every step."""
+    steps = [PerfStep(depth, '4k', '4k', 0, 30) for depth in (1, 32)]
+
+    results = list(linux_perf.run_sweep(steps, precondition=10))
+
+    prepare, *runs = linux_perf._api.commands
+    assert prepare.startswith('fio --name=prepare')
+    assert '--runtime=10' in prepare and '--size=32G' in prepare
+    assert len(runs) == 2
+    assert '--numjobs=4 --group_reporting' in runs[0]
+    assert '--rw=randrw --rwmixwrite=0 --bs=4k --iodepth=32' in runs[1]
+    assert runs[1].endswith('--filename=/mnt/nvme/IO.dat --size=32G')
+    read_bw, read_iops, write_bw, write_iops, cpu_usage = results[0][1]
+    assert read_bw == pytest.approx(4000 / 1024)
+    assert read_iops == pytest.approx(1000)
+    assert (write_bw, write_iops) == (0.0, 0.0)
+    assert cpu_usage[0]['Total'] == 4.0
+
+
+def test_linux_run_job_file(linux_perf):
+    """A fio job file sweep runs the steps as stonewalled jobs."""
+    steps = [PerfStep(32, '128k', None, 100, 30),
+             PerfStep(1, '4k', '4k', 0, 30)]
+
+    results = list(linux_perf.run_sweep(steps, job_file=True))
+
+    assert linux_perf._api.commands[-1] == \
+        'fio --output-format=json /home/test/fio_profile.fio'
+    assert linux_perf._api.uploads == [('fio_profile.fio',
+                                        'fio_profile.fio')]
+    assert [step for step, _ in results] == steps
+    job_file = linux_perf.compose_job_file(steps)
+    assert job_file.count('stonewall') == 2
+    assert 'rw=rw\nrwmixwrite=100\nbs=128k' in job_file
+    assert 'blockalign=4k' in job_file
+
+
+def test_linux_run_multi_target(linux_perf):
+    """Every target is a reporting group pinned to its own CPUs."""
+    targets = ['/dev/nvme0n1', '/dev/nvme1n1']
+    result = linux_perf.run_multi_target(targets, 32, '4k', '4k', 0, 30)
+
+    command = linux_perf._api.commands[-1]
+    assert command.count('--new_group') == 2
+    assert '--name=/dev/nvme1n1 --new_group --filename=/dev/nvme1n1 ' \
+        '--cpus_allowed=2,3' in command
+    assert '--size' not in command
+    assert result['aggregate'][1] == pytest.approx(2000)
+    assert result['targets']['/dev/nvme0n1'][1] == pytest.approx(1000)
+
+
+def test_linux_run_io_online(linux_perf):
+    """An in-band fio run is stopped early through its PID."""
+    result = linux_perf.run_io_online(4, '4k', '4k', 0, 60, CRITERIA)
+
+    assert result.verdict == 'pass'
+    assert result.read_bw == pytest.approx(4096000 / 1024 ** 2)
+    assert linux_perf._api.streamed < 60
+    stream_command, kill_command = linux_perf._api.commands
+    assert '--status-interval=1 & echo "FIO_PID=$!"; wait' in \
+        stream_command
+    assert kill_command == 'kill 4242'
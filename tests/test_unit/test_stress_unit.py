@@ -1,7 +1,14 @@
 # Content of tests/test_unit/test_stress_unit.py
 '''Copyright (c) 2025 Jaron Cheng'''
+from types import SimpleNamespace
 import pytest
+from storage.stress import LinuxStress
+from storage.stress import SoakCheckpoint
 from storage.stress import WindowsStress
+from storage.telemetry import LinuxTelemetry
+from storage.telemetry import TelemetryFactory
+from storage.telemetry import WindowsTelemetry
+from unit.ring_buffer import ColumnarRingBuffer
 
 
 class MockPlatform:
@@ -14,6 +21,14 @@ class MockPlatform:
 
 class MockAPI:
     """Mock implementation of an API for executing commands."""
+    def io_stream(self, command):
+        self.stream_command = command
+        yield '"(PDH-CSV 4.0)","\\\\HOST\\LogicalDisk(C:)\\Disk Reads/sec"'
+        for second in range(3):
+            yield (f'"10/19/2024 10:00:0{second}.000",'
+                   '"100","409600","50","204800",'
+                   '"200","819200","0","0","12.5"')
+
     def io_command(self, command):
         return r"""
         Command Line: diskspd -c12 -t1 -o7 -b4k -r4k -Sh -D -L -w0 -d30 -c1G M:\IO.dat
@@ -83,3 +98,244 @@ def test_run_io_operation(windows_stress):
     assert cpu_usage[1]["User"] == pytest.approx(0.0)
     assert cpu_usage[1]["Kernel"] == pytest.approx(2.65)
     assert cpu_usage[1]["Idle"] == pytest.approx(97.35)
+
+
+class MockCLI:
+    """Mock controller CLI reporting a fixed temperature."""
+    def get_controller_smart_info(self):
+        return SimpleNamespace(composite_temp='45')
+
+
+def test_run_with_telemetry(windows_stress, tmp_path):
+    """Telemetry rows sum all volumes and are saved in columns."""
+    telemetry = WindowsTelemetry(windows_stress._api, ['C', 'D'],
+                                 cli=MockCLI(), temp_interval=0.01)
+    result = windows_stress.run_with_telemetry(telemetry, 1, 7, '4k', '4k',
+                                               0, 30)
+    assert result[1] == pytest.approx(72908.34)
+
+    telemetry.ring = ColumnarRingBuffer(telemetry.COLUMNS, 60)
+    telemetry.start(30)
+    telemetry.stop(grace=5)
+    assert '"\\LogicalDisk(D:)\\Disk Write Bytes/sec"' in \
+        windows_stress._api.stream_command
+    assert windows_stress._api.stream_command.endswith('-si 1 -sc 30')
+
+    ring = telemetry.ring
+    assert len(ring) == 3
+    assert list(ring.column('read_iops')) == [300.0] * 3
+    assert ring.column('write_bw')[0] == pytest.approx(0.1953125)
+    assert ring.column('cpu_usage')[0] == pytest.approx(12.5)
+
+    telemetry.save(tmp_path / 'telemetry.npz')
+    assert (tmp_path / 'telemetry.npz').exists()
+
+
+class DiskstatsAPI:
+    """Mock Linux API streaming the /proc/diskstats sampling loop."""
+    os_type = 'Linux'
+
+    def io_stream(self, command):
+        self.stream_command = command
+        for second in range(3):
+            yield (f'DISKSTATS {100 * second} {800 * second} '
+                   f'{50 * second} {400 * second} '
+                   f'cpu {30 * second} 0 {10 * second} {60 * second} 0 0 0 0')
+
+
+def test_linux_telemetry():
+    """Linux rows are the per-second deltas of diskstats and the CPU."""
+    api = DiskstatsAPI()
+    telemetry = TelemetryFactory(api).initiate(volumes=['/mnt/vd0',
+                                                        '/dev/sdc'])
+    assert isinstance(telemetry, LinuxTelemetry)
+    telemetry.start(2)
+    telemetry.stop(grace=5)
+    assert 'findmnt -no SOURCE --target /mnt/vd0' in api.stream_command
+    assert ' sdc"' in api.stream_command
+    assert 'seq 3' in api.stream_command
+
+    ring = telemetry.ring
+    assert len(ring) == 2
+    assert list(ring.column('read_iops')) == [100.0] * 2
+    assert ring.column('write_bw')[0] == pytest.approx(400 * 512 / 1024 ** 2)
+    assert ring.column('cpu_usage')[0] == pytest.approx(40.0)
+
+
+
+def test_run_soak_resumes(windows_stress, tmp_path, monkeypatch):
+    """A soak resumes after the last checkpointed segment."""
+    durations = []
+    original = windows_stress.run_io_operation
+
+    def segment_run(*args):
+        durations.append(args[-1])
+        if len(durations) == 2:
+            raise ConnectionError("SUT rebooted")
+        return original(*args)
+
+    monkeypatch.setattr(windows_stress, 'run_io_operation', segment_run)
+    path = str(tmp_path / 'soak.json')
+    with pytest.raises(ConnectionError):
+        windows_stress.run_soak(1, 7, '4k', '4k', 0, 250, segment=100,
+                                checkpoint=SoakCheckpoint(path, {'id': 1}),
+                                retries=1)
+
+    result = windows_stress.run_soak(
+        1, 7, '4k', '4k', 0, 250, segment=100,
+        checkpoint=SoakCheckpoint(path, {'id': 1}), retries=2,
+        retry_delay=0)
+    assert durations == [100, 100, 100, 50]
+    assert result[1] == pytest.approx(72908.34)
+    assert result[4][1]["Idle"] == pytest.approx(97.35)
+    assert len(SoakCheckpoint(path, {'id': 1}).load()) == 3
+    assert SoakCheckpoint(path, {'id': 2}).load() == []
+
+
+def test_aggregate_segments():
+    """Segment metrics are weighted by their duration."""
+    segments = [
+        {'duration': 300, 'read_bw': 100.0, 'read_iops': 1000.0,
+         'write_bw': 0.0, 'write_iops': 0.0,
+         'cpu_usage': {'0': {'Total': 10.0}}},
+        {'duration': 100, 'read_bw': 200.0, 'read_iops': 3000.0,
+         'write_bw': 40.0, 'write_iops': 400.0,
+         'cpu_usage': {'0': {'Total': 50.0}}},
+    ]
+    read_bw, read_iops, write_bw, write_iops, cpu_usage = \
+        WindowsStress.aggregate_segments(segments)
+    assert read_bw == pytest.approx(125.0)
+    assert read_iops == pytest.approx(1500.0)
+    assert write_bw == pytest.approx(10.0)
+    assert write_iops == pytest.approx(100.0)
+    assert cpu_usage == {0: {'Total': pytest.approx(20.0)}}
+
+VERIFY_OUTPUT = """crc32c: verify failed at file C\\:\\IO.dat offset 1048576, length 65536 (requested block: offset=1048576, length=65536, flags=88)
+crc32c: verify failed at file C\\:\\IO.dat offset 1048576, length 65536 (requested block: offset=1048576, length=65536, flags=88)
+verify: bad magic header 0, wanted acca at file D\\:\\IO.dat offset 0, length 65536 (requested block: offset=0, length=65536)
+{
+  "jobs" : [
+    {"jobname" : "C", "error" : 84},
+    {"jobname" : "D", "error" : 84}
+  ]
+}
+"""
+
+
+class MockVerifyAPI:
+    """Mock API returning the output of a failed fio verification."""
+    def __init__(self, output):
+        self.output = output
+        self.commands = []
+
+    def io_command(self, command):
+        self.commands.append(command)
+        return self.output
+
+
+def test_run_verification(platform):
+    """Mismatching blocks are reported once each with their LBA."""
+    platform.api = MockVerifyAPI(VERIFY_OUTPUT)
+    platform.disk_info.append(('No Drive Letter', '16 MB'))
+    stress = WindowsStress(platform, platform)
+    mismatches = stress.run_verification(seed=7)
+
+    command = platform.api.commands[0]
+    assert '--ioengine=windowsaio' in command
+    assert '--randseed=7' in command
+    assert '--name=D --filename=D\\:\\IO.dat' in command
+    assert 'No Drive Letter' not in command
+    assert [(mismatch.path, mismatch.lba) for mismatch in mismatches] == \
+        [('C\\:\\IO.dat', 2048), ('D\\:\\IO.dat', 0)]
+
+    platform.api.output = '{"jobs": [{"jobname": "C", "error": 5}]}'
+    with pytest.raises(RuntimeError):
+        stress.run_verification()
+
+    # The overwritten target files are preconditioned again
+    manager = SimpleNamespace(invalidated=[])
+    manager.invalidate = manager.invalidated.append
+    stress.use_target_files(manager)
+    platform.api.output = VERIFY_OUTPUT
+    stress.run_verification()
+    assert manager.invalidated == ['C:\\IO.dat', 'D:\\IO.dat']
+
+
+def test_verify_during(platform):
+    """Verification runs while the action runs."""
+    platform.api = MockVerifyAPI('{"jobs": [{"jobname": "C", "error": 0}]}')
+    stress = WindowsStress(platform, platform)
+    result, mismatches = stress.verify_during(lambda value: value * 2, 21)
+    assert result == 42
+    assert mismatches == []
+
+FIO_OUTPUT = """fio: verification read phase will never start
+{
+  "fio version" : "fio-3.36",
+  "jobs" : [
+    {"jobname" : "/dev/nvme0n1", "error" : 0, "usr_cpu" : 2.5,
+     "sys_cpu" : 10.0,
+     "read" : {"bw" : 102400, "iops" : 25600.0},
+     "write" : {"bw" : 51200, "iops" : 12800.0}},
+    {"jobname" : "/mnt/vd1", "error" : 0, "usr_cpu" : 1.0, "sys_cpu" : 4.0,
+     "read" : {"bw" : 204800, "iops" : 51200.0},
+     "write" : {"bw" : 0, "iops" : 0.0}}
+  ]
+}
+"""
+
+
+class MockLinuxAPI:
+    """Mock Linux API returning a fio JSON report."""
+    def __init__(self):
+        self.commands = []
+
+    def io_command(self, command):
+        self.commands.append(command)
+        return FIO_OUTPUT
+
+
+def test_linux_run_io_operation(platform, monkeypatch):
+    """One pinned fio job per path, totals and per-path results parsed."""
+    platform.api = MockLinuxAPI()
+    platform.disk_info = [('/dev/nvme0n1', 1024), ('/mnt/vd1', 2048)]
+    monkeypatch.setattr(LinuxStress, 'CPU_GROUP', '0,2,3')
+    stress = LinuxStress(platform, platform)
+
+    read_bw, read_iops, write_bw, write_iops, cpu_usage = \
+        stress.run_io_operation(1, 7, '4k', '4k', 30, 60)
+
+    command = platform.api.commands[0]
+    assert '--ioengine=io_uring' in command
+    assert '--verify=crc32c' in command
+    assert ('--name=/dev/nvme0n1 --filename=/dev/nvme0n1 '
+            '--cpus_allowed=2') in command
+    assert ('--name=/mnt/vd1 --filename=/mnt/vd1/IO.dat --size=32G '
+            '--cpus_allowed=3') in command
+
+    assert read_bw == pytest.approx(300.0)
+    assert read_iops == pytest.approx(76800.0)
+    assert write_bw == pytest.approx(50.0)
+    assert write_iops == pytest.approx(12800.0)
+    assert stress.path_results['/mnt/vd1'] == (200.0, 51200.0, 0.0, 0.0)
+    assert cpu_usage[2]["Total"] == pytest.approx(12.5)
+    assert cpu_usage[3]["Idle"] == pytest.approx(95.0)
+
+    with pytest.raises(ValueError):
+        LinuxStress.set_io_engine('posixaio')
+
+
+def test_linux_verify_jobs_split(platform):
+    """Verifying jobs of one path each get their own region."""
+    platform.disk_info = [('/dev/nvme0n1', 1024), ('/mnt/vd1', 2048)]
+    stress = LinuxStress(platform, platform)
+
+    command = stress.compose_command(4, 7, '4k', '4k', 30, 60)
+    assert ('--filename=/dev/nvme0n1 --size=25% '
+            '--offset_increment=25%') in command
+    assert ('--filename=/mnt/vd1/IO.dat --filesize=32G --size=8192M '
+            '--offset_increment=8192M') in command
+
+    command = stress.compose_command(4, 7, '4k', '4k', 0, 60)
+    assert '--offset_increment' not in command
+    assert '--verify' not in command
@@ -0,0 +1,255 @@
+# Contents of unit/criteria_model.py
+'''Copyright (c) 2024 Jaron Cheng'''
+import bisect
+import logging
+import math
+from abc import ABC
+from abc import abstractmethod
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from unit.log_handler import get_logger
+
+logger = get_logger(__name__, logging.INFO)
+
+# Scale factor that makes the MAD a consistent estimator of the standard
+# deviation for normally distributed samples
+MAD_SCALE = 1.4826
+
+
+class BaseCriteriaModel(ABC):
+    """
+    Abstract acceptance band of one metric, e.g. random 4k read IOPS.
+
+    A model is fed the time-ordered history one sample at a time, so the band
+    can be kept up to date as each new run is stored without recomputing it
+    from the whole dataset.
+
+    Attributes:
+        count (int): The number of samples seen so far.
+    """
+    def __init__(self):
+        self.count = 0
+
+    def extend(self, values: Iterable[float]) -> None:
+        '''Feed the samples in time order'''
+        for value in values:
+            self.update(value)
+
+    @abstractmethod
+    def update(self, value: float) -> None:
+        pass
+
+    @abstractmethod
+    def limits(self) -> Tuple[float, float]:
+        """
+        Returns the acceptance band.
+
+        Returns:
+            Tuple[float, float]: The lower and upper limits.
+
+        Raises:
+            ValueError: If no sample has been seen.
+        """
+        pass
+
+    def _check_count(self):
+        if not self.count:
+            raise ValueError(f"{type(self).__name__} has no sample")
+
+
+class _SortedModel(BaseCriteriaModel):
+    """
+    Keep the history sorted so order statistics stay cheap to read.
+
+    An update is a binary search plus an O(n) list insert, which is a
+    memmove of a few KB for the history of one metric. The band is computed
+    from the sorted history at most once per update and cached, so repeated
+    reads between two runs cost nothing.
+    """
+    def __init__(self):
+        super().__init__()
+        self._sorted: List[float] = []
+        self._limits: Optional[Tuple[float, float]] = None
+
+    def update(self, value: float) -> None:
+        bisect.insort(self._sorted, float(value))
+        self.count += 1
+        self._limits = None
+
+    def limits(self) -> Tuple[float, float]:
+        self._check_count()
+        if self._limits is None:
+            self._limits = self._band()
+        return self._limits
+
+    @abstractmethod
+    def _band(self) -> Tuple[float, float]:
+        '''Compute the band from the sorted history'''
+        pass
+
+
+class PercentileModel(_SortedModel):
+    """
+    The legacy band: percentile ± std_dev × confidence factor.
+
+    A negative lower limit falls back to the minimum sample, as in
+    `validate_metrics`. The factors differ between read and write metrics,
+    see `BasePerf.cfl_factors` and `CriteriaFactory.metric_options`.
+
+    Attributes:
+        upper_factor (float): The factor applied above the percentile.
+        lower_factor (float): The factor applied below the percentile.
+        percentile (float): The nearest-rank percentile, e.g. 0.99.
+    """
+    def __init__(self, upper_factor: float = 3, lower_factor: float = 10,
+                 percentile: float = 0.99):
+        super().__init__()
+        self.upper_factor = upper_factor
+        self.lower_factor = lower_factor
+        self.percentile = percentile
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, value: float) -> None:
+        super().update(value)
+        # Welford's online mean and variance
+        delta = value - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (value - self._mean)
+
+    def _band(self) -> Tuple[float, float]:
+        rank = max(math.ceil(self.percentile * self.count) - 1, 0)
+        center = self._sorted[rank]
+        std_dev = math.sqrt(self._m2 / self.count)
+        lower = center - std_dev * self.lower_factor
+        if lower < 0:
+            lower = self._sorted[0]
+        return lower, center + std_dev * self.upper_factor
+
+
+class MedianMADModel(_SortedModel):
+    """
+    Band of median ± factor × scaled median absolute deviation.
+
+    The median and MAD ignore up to half of the history being outliers, so a
+    handful of bad runs stored in MongoDB cannot widen the band.
+
+    Attributes:
+        factor (float): The number of scaled MADs on each side.
+    """
+    def __init__(self, factor: float = 3.5):
+        super().__init__()
+        self.factor = factor
+
+    def _band(self) -> Tuple[float, float]:
+        samples = np.asarray(self._sorted)
+        median = float(np.median(samples))
+        mad = float(np.median(np.abs(samples - median))) * MAD_SCALE
+        return (max(median - self.factor * mad, 0.0),
+                median + self.factor * mad)
+
+
+class TrimmedModel(_SortedModel):
+    """
+    Band of trimmed mean ± factor × trimmed standard deviation.
+
+    Attributes:
+        trim (float): The fraction cut from each end, e.g. 0.1.
+        factor (float): The number of standard deviations on each side.
+    """
+    def __init__(self, trim: float = 0.1, factor: float = 3):
+        super().__init__()
+        if not 0 <= trim < 0.5:
+            raise ValueError(f"Invalid trim fraction: {trim}")
+        self.trim = trim
+        self.factor = factor
+
+    def _band(self) -> Tuple[float, float]:
+        cut = int(self.count * self.trim)
+        samples = np.asarray(self._sorted[cut:self.count - cut])
+        mean = float(samples.mean())
+        std_dev = float(samples.std())
+        return (max(mean - self.factor * std_dev, 0.0),
+                mean + self.factor * std_dev)
+
+
+class EWMAModel(BaseCriteriaModel):
+    """
+    Band tracking the drift of the exponentially weighted mean and variance.
+
+    Recent runs weigh more than old ones, so the band follows gradual changes
+    of the firmware or platform instead of the whole history. Each update is
+    O(1).
+
+    Attributes:
+        alpha (float): The smoothing factor in (0, 1].
+        factor (float): The number of standard deviations on each side.
+    """
+    def __init__(self, alpha: float = 0.1, factor: float = 3):
+        super().__init__()
+        if not 0 < alpha <= 1:
+            raise ValueError(f"Invalid smoothing factor: {alpha}")
+        self.alpha = alpha
+        self.factor = factor
+        self._mean = 0.0
+        self._variance = 0.0
+
+    def update(self, value: float) -> None:
+        self.count += 1
+        if self.count == 1:
+            self._mean = float(value)
+            return
+        diff = value - self._mean
+        increment = self.alpha * diff
+        self._mean += increment
+        self._variance = (1 - self.alpha) * (self._variance +
+                                             diff * increment)
+
+    def limits(self) -> Tuple[float, float]:
+        self._check_count()
+        std_dev = math.sqrt(self._variance)
+        return (max(self._mean - self.factor * std_dev, 0.0),
+                self._mean + self.factor * std_dev)
+
+
+class CriteriaFactory(object):
+    """
+    Factory of criteria models by name.
+
+    Attributes:
+        model (str): One of MODELS, e.g. 'median_mad'.
+        options (dict): Keyword arguments passed to every model created.
+        metric_options (dict): Keyword arguments by metric overriding
+        options, e.g. {'write_iops': {'lower_factor': 7}}.
+    """
+    MODELS = {
+        'percentile': PercentileModel,
+        'median_mad': MedianMADModel,
+        'trimmed': TrimmedModel,
+        'ewma': EWMAModel,
+    }
+
+    def __init__(self, model: str,
+                 metric_options: Optional[Dict[str, dict]] = None,
+                 **options):
+        if model not in self.MODELS:
+            raise ValueError(f"Unsupported criteria model: {model}")
+        self.model = model
+        self.options = options
+        self.metric_options = metric_options or {}
+
+    def initiate(self, metric: str = None) -> BaseCriteriaModel:
+        """
+        Creates a model.
+
+        Args:
+            metric (str, optional): The metric the model is fed with, e.g.
+            'write_iops', to apply its metric_options.
+
+        Returns:
+            BaseCriteriaModel: The new model.
+        """
+        options = {**self.options, **self.metric_options.get(metric, {})}
+        return self.MODELS[self.model](**options)
@@ -0,0 +1,174 @@
+'''Copyright (c) 2024 Jaron Cheng'''
+import difflib
+import hashlib
+import json
+import logging
+import re
+from functools import lru_cache
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+
+from unit.log_handler import get_logger
+
+logger = get_logger(__name__, logging.INFO)
+
+
+class GoldenOutput(object):
+    """
+    Expected CLI output compiled into one matcher per line.
+
+    An expected line is matched exactly, as a full regular expression when
+    it starts with 're:', e.g. 're:Firmware Version: 1\\.0\\.\\d+', or with
+    its numbers masked when its key is volatile, so 'BGA progress:
+    Rebuilding is running in 0%' matches any percentage but not
+    'Initializing'. Blank lines are compared like any other line, as
+    interpret returns them the same with or without a CLI session.
+
+    Attributes:
+        expected (Tuple[str]): The expected lines.
+        volatile (Tuple[str]): Lowercase keys whose numbers are masked.
+    """
+    REGEX_PREFIX = 're:'
+    # Exact names of the fields varying from run to run
+    VOLATILE = ('bga progress', 'composite temperature', 'power on hours')
+    NUMBER = re.compile(r'\d+(?:\.\d+)?')
+
+    def __init__(self, expected: Sequence[str],
+                 volatile: Optional[Sequence[str]] = None):
+        self.expected = tuple(expected)
+        self.volatile = tuple(key.lower() for key in
+                              (self.VOLATILE if volatile is None
+                               else volatile))
+        self._matchers = [self._compile(line) for line in self.expected]
+
+    def _key(self, line: str) -> str:
+        return line.partition(':')[0].strip().lower()
+
+    def mask(self, line: str) -> str:
+        '''Mask the numbers of a volatile line, others are kept'''
+        if ':' in line and self._key(line) in self.volatile:
+            return self.NUMBER.sub('#', line)
+        return line
+
+    def _compile(self, line: str) -> Callable[[str], bool]:
+        if line.startswith(self.REGEX_PREFIX):
+            pattern = re.compile(line[len(self.REGEX_PREFIX):])
+            return lambda actual: pattern.fullmatch(actual) is not None
+        masked = self.mask(line)
+        if masked != line:
+            return lambda actual: self.mask(actual) == masked
+        return line.__eq__
+
+    def _mismatch(self, lines: List[str]) -> Optional[int]:
+        '''Index of the first mismatching line, None if all lines match'''
+        for index, (line, matcher) in enumerate(zip(lines, self._matchers)):
+            if not matcher(line):
+                return index
+        if len(lines) != len(self._matchers):
+            return min(len(lines), len(self._matchers))
+        return None
+
+    def compare(self, actual: Iterable[str]) -> Optional[str]:
+        """
+        Compares an output line by line, stopping at the first mismatch.
+
+        Args:
+            actual (Iterable[str]): The output lines, e.g. of interpret.
+
+        Returns:
+            str or None: None if the output matches, otherwise a unified
+            diff of the mismatching lines. Lines matched by a regex or a
+            volatile key are shown as expected, so only real differences
+            are reported.
+        """
+        lines = list(actual)
+        index = self._mismatch(lines)
+        if index is None:
+            return None
+        shown = [expected if matcher(line) else line
+                 for line, expected, matcher
+                 in zip(lines, self.expected, self._matchers)]
+        shown += lines[len(shown):]
+        diff = '\n'.join(difflib.unified_diff(
+            self.expected, shown, 'expected', 'actual', n=1, lineterm=''))
+        return f'First mismatch at line {index}\n{diff}'
+
+    def fingerprint(self, actual: Iterable[str]) -> str:
+        """
+        Hashes the expected lines with an output whose volatile numbers are
+        masked, so outputs differing only in them share the verdict.
+
+        Args:
+            actual (Iterable[str]): The output lines.
+
+        Returns:
+            str: The SHA-1 hex digest.
+        """
+        encoded = json.dumps([self.expected, self.volatile,
+                              [self.mask(line) for line in actual]])
+        return hashlib.sha1(encoded.encode()).hexdigest()
+
+
+class GoldenCache(object):
+    """
+    Verdicts of golden comparisons kept in memory for one test session.
+
+    The verdict of an output is kept by its fingerprint, so a rerun of a
+    test, e.g. by the flaky plugin, reuses it instead of comparing again,
+    and an output changing only in volatile fields is not judged anew.
+
+    Attributes:
+        verdicts (dict): The diff or None of each fingerprint.
+    """
+    def __init__(self):
+        self.verdicts = {}
+
+    def compare(self, golden: GoldenOutput,
+                actual: Sequence[str]) -> Optional[str]:
+        """
+        Compares an output, reusing the stored verdict of its fingerprint.
+
+        Args:
+            golden (GoldenOutput): The compiled expected output.
+            actual (Sequence[str]): The output lines.
+
+        Returns:
+            str or None: See GoldenOutput.compare.
+        """
+        key = golden.fingerprint(actual)
+        if key in self.verdicts:
+            logger.debug('Verdict of %s reused', key)
+            return self.verdicts[key]
+        diff = self.verdicts[key] = golden.compare(actual)
+        return diff
+
+
+@lru_cache(maxsize=None)
+def _compiled(expected: Tuple[str], volatile: Optional[Tuple[str]]
+              ) -> GoldenOutput:
+    return GoldenOutput(expected, volatile)
+
+
+def compare_output(actual: Sequence[str], expected: Sequence[str],
+                   volatile: Optional[Sequence[str]] = None,
+                   cache: Optional[GoldenCache] = None) -> Optional[str]:
+    """
+    Compares a CLI output against its golden output.
+
+    The expected output is compiled once per process however many tests
+    share it.
+
+    Args:
+        actual (Sequence[str]): The output lines, e.g. of interpret.
+        expected (Sequence[str]): The expected lines of the test case.
+        volatile (Sequence[str], optional): Volatile keys, see
+        GoldenOutput.VOLATILE by default.
+        cache (GoldenCache, optional): Verdicts reused across reruns.
+
+    Returns:
+        str or None: None if the output matches, otherwise the diff.
+    """
+    golden = _compiled(tuple(expected),
+                       None if volatile is None else tuple(volatile))
+    if cache is not None:
+        return cache.compare(golden, actual)
+    return golden.compare(actual)
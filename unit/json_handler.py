@@ -1,8 +1,12 @@
 # Contents of unit/json_handler.py
 '''Copyright (c) 2024 Jaron Cheng'''
+import atexit
 import json
 import logging
+import os
 import re
+from collections.abc import Mapping
+from typing import Dict, List, Optional, Tuple
 from unit.log_handler import get_logger
 
 # Set up logger
@@ -20,6 +24,155 @@ def load_and_sort_json(file_path, key):
         return []
 
 
+class VectorCase(object):
+    """
+    Reference to one test vector, resolved when its test runs.
+
+    Used as an indirect parameter, so collecting a suite only needs the
+    number of vectors of a set and never holds their content.
+
+    Attributes:
+        repository (VectorRepository): The repository of the vector.
+        name (str): The vector set, e.g. 'bga_off'.
+        position (int): The position of the vector in the sorted set.
+    """
+    def __init__(self, repository: 'VectorRepository', name: str,
+                 position: int):
+        self.repository = repository
+        self.name = name
+        self.position = position
+
+    def resolve(self) -> dict:
+        '''Load the vector, reading its file on first use'''
+        return self.repository[self.name][self.position]
+
+    def __repr__(self) -> str:
+        return f'VectorCase({self.name!r}, {self.position})'
+
+
+class VectorRepository(Mapping):
+    """
+    Test vectors of the CLI suites, loaded and sorted on first use.
+
+    A suite parametrizes its tests with `cases`, which only needs the sort
+    order of a vector set. The order is kept in a small index stored on
+    disk, keyed by the path, sort key and modification time of the file, so
+    collecting an unchanged suite reads no vector file. The vectors
+    themselves are only parsed when a selected test resolves its
+    VectorCase, and are kept in memory for the rest of the process.
+
+    Attributes:
+        config_files (Dict[str, Tuple[str, Optional[str]]]): Path and sort
+            key of every vector set by name, no sort key keeps the order.
+        cache_dir (str): Directory of the stored index.
+    """
+    CACHE_DIR = '.json_cache'
+    # Index of every cache path, shared within the process
+    _indexes: Dict[str, dict] = {}
+    # Cache paths whose index changed and is stored at exit
+    _dirty: set = set()
+
+    def __init__(self, config_files: Dict[str, Tuple[str, Optional[str]]],
+                 cache_dir: str = None):
+        self.config_files = dict(config_files)
+        self.cache_dir = cache_dir or self.CACHE_DIR
+        self._data = {}
+
+    @property
+    def cache_path(self) -> str:
+        return os.path.join(self.cache_dir, 'vector_index.json')
+
+    @property
+    def index(self) -> dict:
+        if self.cache_path not in self._indexes:
+            try:
+                with open(self.cache_path, 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+            except FileNotFoundError:
+                index = {}
+            except json.JSONDecodeError as e:
+                logger.error("Error decoding %s: %s", self.cache_path, e)
+                index = {}
+            self._indexes[self.cache_path] = index
+        return self._indexes[self.cache_path]
+
+    def cases(self, name: str) -> List[VectorCase]:
+        """
+        References the vectors of a set for an indirect parametrize.
+
+        Args:
+            name (str): The vector set, e.g. 'bga_off'.
+
+        Returns:
+            List[VectorCase]: One reference per vector in sorted order.
+        """
+        return [VectorCase(self, name, position)
+                for position in range(len(self._order(name)))]
+
+    def __getitem__(self, name: str) -> list:
+        if name not in self._data:
+            file_path, _ = self.config_files[name]
+            data = self._read(file_path)
+            self._data[name] = [data[row] for row in self._order(name, data)]
+        return self._data[name]
+
+    def __iter__(self):
+        return iter(self.config_files)
+
+    def __len__(self) -> int:
+        return len(self.config_files)
+
+    @staticmethod
+    def _read(file_path: str) -> list:
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error("Error loading file %s: %s", file_path, e)
+            return []
+
+    def _order(self, name: str, data: Optional[list] = None) -> List[int]:
+        '''Rows of a vector set in sort order, from the index if current'''
+        file_path, key = self.config_files[name]
+        try:
+            mtime = os.stat(file_path).st_mtime_ns
+        except OSError as e:
+            logger.error("Error loading or sorting file %s: %s", file_path,
+                         e)
+            return []
+        entry_name = f'{file_path}:{key}'
+        entry = self.index.get(entry_name)
+        if entry and entry['mtime'] == mtime:
+            return entry['order']
+        if data is None:
+            data = self._read(file_path)
+        rows = range(len(data))
+        try:
+            order = sorted(rows, key=lambda row: data[row][key]) if key \
+                else list(rows)
+        except (KeyError, TypeError) as e:
+            logger.error("Error loading or sorting file %s: %s", file_path,
+                         e)
+            return []
+        self.index[entry_name] = {'mtime': mtime, 'order': order}
+        if not self._dirty:
+            atexit.register(VectorRepository._save)
+        self._dirty.add(self.cache_path)
+        return order
+
+    @classmethod
+    def _save(cls) -> None:
+        '''Store the changed indexes once, atomically for parallel
+           sessions sharing them'''
+        for cache_path in cls._dirty:
+            os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+            temp_path = f'{cache_path}.{os.getpid()}'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(cls._indexes[cache_path], f)
+            os.replace(temp_path, cache_path)
+        cls._dirty.clear()
+
+
 def convert_size(callback):
     ''' Convert string that includes a number and unit in a dictionary
         e.g. convert 19.6k to 19.6 * 1024 = 20070.4
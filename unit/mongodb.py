@@ -124,6 +124,27 @@ class MongoDB(object):
         except IOError as e:
             logger.critical(f"Error writing to {result_path}: {e}")
 
+    def upsert_document(self, filter_query, document):
+        """
+        Replaces the document matching the filter query, or inserts it if
+        there is none.
+
+        Args:
+            filter_query (dict): The query to filter the document that needs to
+            be replaced.
+            document (dict): The whole new document.
+
+        Raises:
+            PyMongoError: If there is an error writing the document to
+            MongoDB.
+        """
+        try:
+            self.collection.replace_one(filter_query, document, upsert=True)
+            logger.debug("Document upserted: %s", filter_query)
+        except errors.PyMongoError as e:
+            logger.error("Error upserting document: %s", e)
+            raise
+
     def update_document(self, filter_query, update_values):
         """
         Updates a document in the MongoDB collection based on the given filter
@@ -298,6 +319,64 @@ class MongoDB(object):
             logger.critical(f"Error performing aggregation: {e}")
             return None
 
+    def fetch_metric_samples(self, pipeline_path):
+        """
+        Fetches every historical metric sample behind an aggregation pipeline.
+
+        The pipeline is reused up to the per-key filter: the `$eq` match and
+        the `$group` stages are dropped, so a single query returns the raw
+        samples of all write patterns and I/O depths/block sizes. The report
+        creation time is carried through the projections and the samples are
+        sorted by it in ascending order.
+
+        Args:
+            pipeline_path (str): The path of the aggregation pipeline JSON,
+            e.g. 'config/pipeline_rdn_perf.json'.
+
+        Returns:
+            list: A list of sample documents, or an empty list if the
+            pipeline cannot be loaded or nothing matches.
+
+        Raises:
+            PyMongoError: If there is an error performing the aggregation in
+            MongoDB.
+        """
+        try:
+            with open(pipeline_path, 'r', encoding='utf-8') as file:
+                pipeline = json.load(file)
+        except FileNotFoundError:
+            logger.error("Pipeline configuration file not found.")
+            return []
+        except json.JSONDecodeError as e:
+            logger.critical("Error decoding JSON from pipeline "
+                            "configuration: %s", e)
+            return []
+
+        sample_pipeline = []
+        for index, stage in enumerate(pipeline):
+            if "$group" in stage:
+                continue
+            if "$match" in stage and any(
+                    isinstance(value, dict) and "$eq" in value
+                    for value in stage["$match"].values()):
+                continue
+            if "$project" in stage:
+                if index == 0:
+                    stage["$project"]["report.created"] = 1
+                elif '"$report.' in json.dumps(stage):
+                    stage["$project"]["created"] = "$report.created"
+                else:
+                    stage["$project"]["created"] = 1
+            sample_pipeline.append(stage)
+        sample_pipeline.append({"$sort": {"created": 1}})
+
+        try:
+            return list(self.collection.aggregate(sample_pipeline,
+                                                  allowDiskUse=True))
+        except errors.PyMongoError as e:
+            logger.error("Error fetching metric samples: %s", e)
+            raise
+
     def aggregate_ramp_metrics(self, write_pattern, ramp_times):
         """
         Aggregates ramp I/O metrics from the MongoDB collection.
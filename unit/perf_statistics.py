@@ -0,0 +1,257 @@
+# Contents of unit/perf_statistics.py
+'''Copyright (c) 2024 Jaron Cheng'''
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from unit.criteria_model import BaseCriteriaModel
+from unit.criteria_model import CriteriaFactory
+from unit.log_handler import get_logger
+
+logger = get_logger(__name__, logging.INFO)
+
+
+class PerfStatistics(object):
+    """
+    In-memory statistics engine for historical performance samples.
+
+    The samples of every (write_pattern, io_depth/block_size) key are loaded
+    once into NumPy arrays, and the percentile, average, minimum, maximum and
+    population standard deviation of every key are computed in one vectorized
+    pass. The criteria are then served from memory in the same shape as the
+    MongoDB `$group` result, so `validate_metrics` can consume them unchanged.
+
+    With a criteria model, every group and metric also keeps a model fed with
+    the time-ordered samples, and its band is served under the 'limits' key.
+    New runs are added incrementally through `add_sample`.
+
+    Attributes:
+        key (str): The second grouping field, 'io_depth' or 'block_size'.
+        percentile (float): The percentile used for `percentile_*`.
+        groups (List[Tuple]): The (write_pattern, key) of every group.
+        model (CriteriaFactory): The criteria model factory, or None to leave
+        the band to the confidence factors of `validate_metrics`.
+    """
+    METRICS = ('read_iops', 'read_bw', 'write_iops', 'write_bw')
+    PIPELINES = {
+        'io_depth': 'config/pipeline_rdn_perf.json',
+        'block_size': 'config/pipeline_seq_perf.json',
+    }
+
+    def __init__(self, key: str, percentile: float = 0.99,
+                 model: Optional[CriteriaFactory] = None):
+        self.key = key
+        self.percentile = percentile
+        self.model = model
+        self.groups: List[Tuple] = []
+        self._group_ids = np.empty(0, dtype=np.intp)
+        self._values: Dict[str, np.ndarray] = {}
+        self._criteria: Dict[Tuple, dict] = {}
+        self._models: Dict[Tuple, Dict[str, BaseCriteriaModel]] = {}
+        self._stale = False
+
+    @classmethod
+    def from_mongo(cls, mdb, key: str, percentile: float = 0.99,
+                   model: Optional[CriteriaFactory] = None
+                   ) -> 'PerfStatistics':
+        """
+        Builds the engine from the samples of a MongoDB collection.
+
+        Args:
+            mdb (MongoDB): The MongoDB connection object.
+            key (str): 'io_depth' for random or 'block_size' for sequential
+            performance.
+            percentile (float): The percentile used for `percentile_*`.
+            model (CriteriaFactory): The criteria model factory, optional.
+
+        Returns:
+            PerfStatistics: The engine loaded with every sample.
+
+        Raises:
+            ValueError: If the key is not supported.
+        """
+        if key not in cls.PIPELINES:
+            raise ValueError(f"Unsupported key: {key}")
+        engine = cls(key, percentile, model)
+        engine.load(mdb.fetch_metric_samples(cls.PIPELINES[key]))
+        return engine
+
+    def load(self, documents: Iterable[dict]) -> None:
+        """
+        Loads sample documents and computes the criteria of every group.
+
+        Documents without a write pattern or key are skipped, and a missing
+        metric is stored as NaN so it is excluded from its statistics.
+
+        Args:
+            documents (Iterable[dict]): Sample documents with write_pattern,
+            the key field and any of the metrics.
+        """
+        index: Dict[Tuple, int] = {}
+        group_ids = []
+        values = {metric: [] for metric in self.METRICS}
+        for document in documents:
+            group = (document.get('write_pattern'), document.get(self.key))
+            if None in group:
+                continue
+            group_ids.append(index.setdefault(group, len(index)))
+            for metric in self.METRICS:
+                value = document.get(metric)
+                values[metric].append(np.nan if value is None else value)
+
+        self.groups = list(index)
+        self._group_ids = np.asarray(group_ids, dtype=np.intp)
+        self._values = {metric: np.asarray(value, dtype=np.float64)
+                        for metric, value in values.items()}
+        self._models = {}
+        if self.model:
+            for group in self.groups:
+                for metric in self.METRICS:
+                    self._group_model(group, metric).extend(
+                        self.samples(group[0], group[1], metric))
+        self._criteria = self._compute()
+        self._stale = False
+        logger.debug('Loaded %d samples in %d groups', len(group_ids),
+                     len(self.groups))
+
+    def add_sample(self, document: dict) -> None:
+        """
+        Adds the result of a new run.
+
+        The criteria models are updated in place; the vectorized statistics
+        are recomputed on the next `criteria` call.
+
+        Args:
+            document (dict): A sample document in the shape used by `load`.
+        """
+        group = (document.get('write_pattern'), document.get(self.key))
+        if None in group:
+            logger.error("Invalid sample document: %s", document)
+            return
+        if group not in self.groups:
+            self.groups.append(group)
+        group_id = self.groups.index(group)
+        self._group_ids = np.append(self._group_ids, group_id)
+        for metric in self.METRICS:
+            value = document.get(metric)
+            value = np.nan if value is None else float(value)
+            self._values[metric] = np.append(
+                self._values.get(metric, np.empty(0)), value)
+            if self.model and not np.isnan(value):
+                self._group_model(group, metric).update(value)
+        self._stale = True
+
+    def _group_model(self, group: Tuple, metric: str) -> BaseCriteriaModel:
+        '''Return the criteria model of a group and metric'''
+        models = self._models.setdefault(group, {})
+        if metric not in models:
+            models[metric] = self.model.initiate(metric)
+        return models[metric]
+
+    def _compute(self) -> Dict[Tuple, dict]:
+        '''Compute the statistics of every group and metric at once'''
+        group_count = len(self.groups)
+        criteria = {
+            group: {'_id': {'write_pattern': group[0], self.key: group[1]}}
+            for group in self.groups
+        }
+        for metric in self.METRICS:
+            values = self._values[metric]
+            valid = ~np.isnan(values)
+            group_ids = self._group_ids[valid]
+            samples = values[valid]
+
+            counts = np.bincount(group_ids, minlength=group_count)
+            present = counts > 0
+            safe_counts = np.where(present, counts, 1)
+            means = np.bincount(group_ids, weights=samples,
+                                minlength=group_count) / safe_counts
+            deviation = samples - means[group_ids]
+            std_devs = np.sqrt(np.bincount(group_ids, weights=deviation ** 2,
+                                           minlength=group_count)
+                               / safe_counts)
+
+            # Sort by group, then by value, so each group is a sorted slice
+            order = np.lexsort((samples, group_ids))
+            ordered = samples[order]
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            last = np.maximum(starts + counts - 1, 0)
+            ranks = np.maximum(
+                np.ceil(self.percentile * counts).astype(np.intp) - 1, 0)
+            if ordered.size:
+                mins = ordered[np.minimum(starts, ordered.size - 1)]
+                maxs = ordered[np.minimum(last, ordered.size - 1)]
+                percentiles = ordered[np.minimum(starts + ranks,
+                                                 ordered.size - 1)]
+            else:
+                mins = maxs = percentiles = np.zeros(group_count)
+
+            for group_id, group in enumerate(self.groups):
+                stats = criteria[group]
+                if present[group_id]:
+                    stats[f'percentile_{metric}'] = [
+                        float(percentiles[group_id])]
+                    stats[f'avg_{metric}'] = float(means[group_id])
+                    stats[f'max_{metric}'] = float(maxs[group_id])
+                    stats[f'min_{metric}'] = float(mins[group_id])
+                    stats[f'std_dev_{metric}'] = float(std_devs[group_id])
+                else:
+                    stats[f'percentile_{metric}'] = [None]
+                    stats[f'avg_{metric}'] = None
+                    stats[f'max_{metric}'] = None
+                    stats[f'min_{metric}'] = None
+                    stats[f'std_dev_{metric}'] = None
+
+        for group, models in self._models.items():
+            criteria[group]['limits'] = {
+                metric: list(model.limits())
+                for metric, model in models.items() if model.count
+            }
+        return criteria
+
+    def criteria(self, write_pattern: int, key_value) -> Optional[dict]:
+        """
+        Returns the criteria of a write pattern and I/O depth/block size.
+
+        Args:
+            write_pattern (int): The write pattern, e.g. 0 or 100.
+            key_value (int or str): The I/O depth or block size, e.g. 32 or
+            '4k'.
+
+        Returns:
+            dict or None: The criteria in the MongoDB `$group` shape, plus
+            the 'limits' of each metric if a criteria model is set, or None
+            if there is no sample for the key.
+        """
+        if self._stale:
+            self._criteria = self._compute()
+            self._stale = False
+        result = self._criteria.get((write_pattern, key_value))
+        if result is None:
+            logger.error("No data found for %s = %s, write_pattern = %s",
+                         self.key, key_value, write_pattern)
+        return result
+
+    def samples(self, write_pattern: int, key_value,
+                metric: str) -> np.ndarray:
+        """
+        Returns the samples of one metric in the order they were loaded.
+
+        Args:
+            write_pattern (int): The write pattern, e.g. 0 or 100.
+            key_value (int or str): The I/O depth or block size.
+            metric (str): One of METRICS.
+
+        Returns:
+            np.ndarray: The non-NaN samples, empty if the key is unknown.
+        """
+        try:
+            group_id = self.groups.index((write_pattern, key_value))
+        except ValueError:
+            return np.empty(0)
+        values = self._values[metric][self._group_ids == group_id]
+        return values[~np.isnan(values)]
+
+    def __len__(self) -> int:
+        return len(self._group_ids)
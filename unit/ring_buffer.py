@@ -0,0 +1,94 @@
+# Contents of unit/ring_buffer.py
+'''Copyright (c) 2024 Jaron Cheng'''
+import logging
+from typing import Dict, Sequence
+
+import numpy as np
+
+from unit.log_handler import get_logger
+
+logger = get_logger(__name__, logging.INFO)
+
+
+class ColumnarRingBuffer(object):
+    """
+    Fixed-capacity time series stored as one float64 array per column.
+
+    Once the capacity is reached the oldest rows are overwritten, so memory
+    stays bounded however long the run is. Missing values are stored as NaN.
+
+    Attributes:
+        columns (Tuple[str]): The column names.
+        capacity (int): The maximum number of rows kept.
+    """
+    def __init__(self, columns: Sequence[str], capacity: int):
+        if capacity <= 0:
+            raise ValueError(f"Invalid capacity: {capacity}")
+        self.columns = tuple(columns)
+        self.capacity = capacity
+        self._data = {column: np.full(capacity, np.nan)
+                      for column in self.columns}
+        self._next = 0
+        self._size = 0
+
+    def append(self, **values: float) -> None:
+        """
+        Appends one row.
+
+        Args:
+            **values: The value of each column, missing columns are NaN.
+
+        Raises:
+            KeyError: If a column is unknown.
+        """
+        unknown = set(values) - set(self.columns)
+        if unknown:
+            raise KeyError(f"Unknown columns: {sorted(unknown)}")
+        for column in self.columns:
+            value = values.get(column)
+            self._data[column][self._next] = (np.nan if value is None
+                                              else value)
+        self._next = (self._next + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def column(self, name: str) -> np.ndarray:
+        '''Return the rows of a column from the oldest to the newest'''
+        data = self._data[name]
+        if self._size < self.capacity:
+            return data[:self._size].copy()
+        return np.concatenate((data[self._next:], data[:self._next]))
+
+    def to_dict(self) -> Dict[str, np.ndarray]:
+        '''Return every column in time order'''
+        return {column: self.column(column) for column in self.columns}
+
+    def save(self, path: str) -> None:
+        """
+        Persists the buffer as a compressed NumPy archive, one array per
+        column.
+
+        Args:
+            path (str): The target file path, e.g. 'logs/telemetry.npz'.
+        """
+        try:
+            np.savez_compressed(path, **self.to_dict())
+            logger.debug('Saved %d rows to %s', self._size, path)
+        except OSError as e:
+            logger.error("Error writing %s: %s", path, e)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> 'ColumnarRingBuffer':
+        '''Load a buffer persisted by save'''
+        with np.load(path) as archive:
+            columns = list(archive.files)
+            size = len(archive[columns[0]]) if columns else 0
+            ring = cls(columns, max(size, 1))
+            for column in columns:
+                ring._data[column][:size] = archive[column]
+        ring._size = size
+        ring._next = size % ring.capacity
+        return ring